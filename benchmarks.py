@@ -0,0 +1,279 @@
+"""
+Microbenchmarks of the allocation and parsing functions that run without a browser.
+
+Every case builds its input with a seeded generator, so runs are comparable, and is
+timed at several sizes from tens to tens of thousands of demand lines. Results can be
+saved as a baseline; later runs compare against it and exit with status 1 if a case
+got slower than the tolerance allows. Baselines only compare on the machine that
+recorded them.
+
+    python benchmarks.py --save-baseline
+    python benchmarks.py --tolerance 0.25
+"""
+
+from contextlib import redirect_stdout
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from calculations import Calculations
+from solution_cache import SolutionCache
+from webactions import WebActions
+
+FINISH_PROCESSES = ["TAPEREEL", "LEADSCAN", "PACKLABEL", "BDPACK-TR"]
+FINISH_TYPES = ["STD", "STD", "STD", "CUST"]
+REEL_SIZES = [250, 500, 1000, 2500, 3000, 5000]
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+
+def week_keys(rng, count):
+    """Returns BSD week keys such as "W07'25" in random order."""
+    return [f"W{rng.randint(1, 52):02}'{rng.randint(23, 26):02}" for _ in range(count)]
+
+
+def lot_quantities(rng, count):
+    """Returns WIP lot quantities between one and a few dozen reels."""
+    return [rng.randint(1, 40) * rng.choice(REEL_SIZES) + rng.randint(0, 999) for _ in range(count)]
+
+
+def std_qty(rng):
+    """Returns a STD_QTY reel size."""
+    return rng.choice(REEL_SIZES)
+
+
+def demand_tokens(rng, num_lines, lines_per_part=5):
+    """
+    Returns the cell texts of a demand table with num_lines weekly demand lines.
+
+    The layout is the one parse_demand_data_new reads: a header row per finish part
+    starting with "-" and ending with " ", followed by four cells per demand week.
+    """
+    tokens = []
+    part = 0
+    while num_lines > 0:
+        lines = min(lines_per_part, num_lines)
+        num_lines -= lines
+        process = rng.choice(FINISH_PROCESSES)
+        finish_type = rng.choice(FINISH_TYPES)
+        suffix = "+T" if process in ("TAPEREEL", "BDPACK-TR") else "+"
+        tokens += ["-", "1", f"MAX{part:05}{suffix}", "2", process, f"{std_qty(rng):,}"]
+        tokens += ["3", "4", "5", "6", finish_type, " "]
+        for week in week_keys(rng, lines):
+            tokens += [week, "7", "8", f"{rng.randint(0, 20000):,}"]
+        part += 1
+    return tokens
+
+
+def demands(rng, count):
+    """Returns parsed demand records, as parse_demand_data_new returns them."""
+    web_actions = WebActions.__new__(WebActions)
+    return web_actions.parse_demand_data_new(demand_tokens(rng, count))
+
+
+def split_score_args(rng, count):
+    reel = std_qty(rng)
+    num_tr = max(1, count // 2)
+    num_ls = max(1, count - num_tr)
+    return (
+        reel,
+        reel * rng.randint(1, 2 * count) + rng.randint(0, reel - 1),
+        [rng.randint(0, 20) for _ in range(num_tr)],
+        [rng.randint(0, 20) for _ in range(num_ls)],
+        [rng.randint(0, 20000) for _ in range(num_tr)],
+        [],
+        [rng.randint(0, 20000) for _ in range(num_ls)],
+        [],
+        0,
+        "COMETS",
+    )
+
+
+def benchmark_cases():
+    """
+    Returns the cases as (name, sizes, setup) tuples.
+
+    setup(rng, size) builds the input once and returns the callable to time. sizes is
+    None for cases that run at every requested size, or the largest size they support.
+    """
+    web_actions = WebActions.__new__(WebActions)
+    # ~ AN EMPTY CACHE KEEPS EVERY split_score CALL A REAL SOLVE
+    calculations = Calculations(cache=SolutionCache(max_entries=0))
+
+    def parse_demand_data_new(rng, size):
+        tokens = demand_tokens(rng, size)
+        return lambda: web_actions.parse_demand_data_new(tokens)
+
+    def sort_week_keys(rng, size):
+        keys = week_keys(rng, size)
+        return lambda: web_actions.sort_week_keys(keys)
+
+    def sort_demands(rng, size):
+        records = demands(rng, size)
+        return lambda: web_actions.sort_demands(records)
+
+    def allocate_supply(rng, size):
+        records = web_actions.sort_demands(demands(rng, size))
+        lot_qty = sum(record.remaining_balance for record in records) // 2
+        return lambda: web_actions.allocate_supply(lot_qty, records, "COMETS")
+
+    def evaluate_allocation(rng, size):
+        records = demands(rng, size)
+        sums_by_part = {
+            record.finish_part_num: [record.remaining_balance, record.finish_process, record.finish_type]
+            for record in records
+        }
+        return lambda: web_actions.evaluate_allocation(sums_by_part)
+
+    def evaluate_demands(rng, size):
+        records = demands(rng, size)
+        return lambda: web_actions.evaluate_demands(records)
+
+    def allocate_full(rng, size):
+        demand_items = [(rng.randint(0, 5000), week) for week in week_keys(rng, size)]
+        total = sum(lot_quantities(rng, max(1, size // 10)))
+        return lambda: calculations.allocate_full(demand_items, total)
+
+    def calculate_Z(rng, size):
+        args = split_score_args(rng, size)
+        Ti_TR, Ti_LS, D_TR, D_LS = args[2], args[3], args[4], args[6]
+        u_TR = [1.0] * len(D_TR)
+        u_LS = [1.0] * len(D_LS)
+        return lambda: calculations.calculate_Z(Ti_TR, Ti_LS, D_TR, u_TR, D_LS, u_LS, 1, 1, 0.5)
+
+    def calculate_Z_batch(rng, size):
+        args = split_score_args(rng, size)
+        Ti_TR, Ti_LS, D_TR, D_LS = args[2], args[3], args[4], args[6]
+        u_TR = [1.0] * len(D_TR)
+        u_LS = [1.0] * len(D_LS)
+        ratios = [0.1, 0.3, 0.5, 0.7, 0.9]
+        return lambda: calculations.calculate_Z_batch(
+            Ti_TR, Ti_LS, D_TR, u_TR, D_LS, u_LS, 1, 1, ratios
+        )
+
+    def split_score(rng, size):
+        args = split_score_args(rng, size)
+        return lambda: calculations.split_score(*args)
+
+    return [
+        ("parse_demand_data_new", None, parse_demand_data_new),
+        ("sort_week_keys", None, sort_week_keys),
+        ("sort_demands", None, sort_demands),
+        ("allocate_supply", None, allocate_supply),
+        ("evaluate_allocation", None, evaluate_allocation),
+        ("evaluate_demands", None, evaluate_demands),
+        ("allocate_full", None, allocate_full),
+        ("calculate_Z", None, calculate_Z),
+        ("calculate_Z_batch", None, calculate_Z_batch),
+        # ~ EVERY DEMAND WEEK IS A MILP VARIABLE, LARGER SIZES TAKE MINUTES PER SOLVE
+        ("split_score", 100, split_score),
+    ]
+
+
+def time_call(function, repeat, min_seconds=0.05):
+    """
+    Returns the best seconds per call over repeat rounds.
+
+    Each round calls the function often enough to run for at least min_seconds.
+    """
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds or number >= 1 << 20:
+                break
+            number *= 2
+
+        best = elapsed / number
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_benchmarks(sizes, repeat, seed, name_filter=None):
+    """
+    Times every case at every size.
+
+    Returns:
+        dict: Seconds per call by "name[size]".
+    """
+    results = {}
+    for name, max_size, setup in benchmark_cases():
+        if name_filter and name_filter not in name:
+            continue
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            function = setup(random.Random(f"{seed}-{name}-{size}"), size)
+            key = f"{name}[{size}]"
+            results[key] = time_call(function, repeat)
+            print(f"{key:<32} {results[key] * 1e6:>14.1f} us")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change of every case against the baseline.
+
+    Returns:
+        list: Keys of the cases that are slower than the baseline by more than tolerance.
+    """
+    regressions = []
+    for key, seconds in results.items():
+        if key not in baseline:
+            continue
+        ratio = seconds / baseline[key]
+        status = ""
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+            status = "REGRESSION"
+        print(f"{key:<32} {ratio:>8.2f}x {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 is 20%%"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed, args.filter)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Saved baseline of {len(results)} cases to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline first.")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
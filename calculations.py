@@ -1,159 +1,296 @@
-from datetime import datetime
-from pulp import (
-    LpProblem,
-    LpMinimize,
-    LpVariable,
-    lpSum,
-    value,
-    LpContinuous,
-    LpInteger,
-    LpStatus,
-)
-import math
-
-# decrease_ratio_list = [0.2, 0.5, 0.9]
-
-
-class Calculations:
-    def allocate_full(self, demand_items: list, total_num_units: int) -> list:
-        demands = sorted(demand_items, key=lambda x: x[-1])
-        allocated = []
-        for beginning_demand, weekly_bsd in demand_items:
-            if max((beginning_demand - total_num_units), 0) == 0:
-                total_num_units -= beginning_demand
-
-                allocated.append(beginning_demand)
-            else:
-                beginning_demand -= total_num_units
-                allocated.append(total_num_units)
-                total_num_units = 0
-        return allocated
-
-    def calculate_Z(
-        self,
-        Ti_TR: list,
-        Ti_LS: list,
-        D_TR: list,
-        u_TR: list,
-        D_LS: list,
-        u_LS: list,
-        Z_TR: int,
-        Z_LS: int,
-        decrease_ratio: float,
-    ):
-        of_TR = 0
-        of_LS = 0
-        # min_Z = 0
-        prev_Z = math.inf
-        # for decrease_ratio in decrease_ratio_list:
-        for i in range(len(Ti_TR)):
-            term1_TR = math.e ** (
-                math.log(decrease_ratio) * Ti_TR[i]
-            )  # 1 / max((Ti_TR[i]), 1 / (10 + abs(Ti_TR[i])))
-            term2_TR = max((D_TR[i] - (u_TR[i]) * (Z_TR)), 0)
-            of_TR += term1_TR * term2_TR
-        for i in range(len(Ti_LS)):
-            term1_LS = math.e ** (
-                math.log(decrease_ratio) * Ti_LS[i]
-            )  # 1 / max((Ti_LS[i]), 1 / (10 + abs(Ti_LS[i])))
-            term2_LS = max((D_LS[i] - (u_LS[i]) * (Z_LS)), 0)
-            of_LS += term1_LS * term2_LS
-        # print(of_TR + of_LS)
-        # # min_Z = math.log(of_LS + of_TR)
-        # if prev_Z > math.log(of_LS + of_TR):
-        #     prev_Z = math.log(of_LS + of_TR)
-        #     # prev_Z =
-
-        return math.log(of_LS + of_TR)
-
-    def split_score(
-        self,
-        STD_QTY: int,
-        N: int,
-        Ti_TR: list,
-        Ti_LS: list,
-        D_TR: list,
-        u_TR: list,
-        D_LS: list,
-        u_LS: list,
-        output: int,
-        product_type: str,
-    ):
-        # Initialize the problem
-        decrease_ratio_list = [0.1, 0.3, 0.5, 0.7, 0.9]
-        prob = LpProblem("Minimize_of_with_constraints", LpMinimize)
-        if product_type == "MAXCIM":
-            STD_QTY = STD_QTY * (1.002)
-        STD_QTY_TR = [STD_QTY for i in range(len(D_TR))]
-        # Create the decision variables for u_TR and u_LS
-        # Here, n_TR are integer decision variables representing the multiples of STD_QTY_TR
-        n_TR = [
-            LpVariable(f"n_TR_{i}", cat="Integer", lowBound=0) for i in range(len(D_TR))
-        ]
-        u_LS = [LpVariable(f"u_LS_{i}", lowBound=0) for i in range(len(D_LS))]
-
-        # Define u_TR as multiples of STD_QTY_TR
-        u_TR = [n_TR[i] * STD_QTY_TR[i] for i in range(len(STD_QTY_TR))]
-
-        # Auxiliary variables for the max function
-        w_TR = [LpVariable(f"w_TR_{i}", lowBound=0) for i in range(len(D_TR))]
-        w_LS = [LpVariable(f"w_LS_{i}", lowBound=0) for i in range(len(D_LS))]
-
-        # Adding the max function constraints
-        for i in range(len(D_TR)):
-            prob += w_TR[i] >= D_TR[i] - u_TR[i]
-            prob += w_TR[i] >= 0
-
-        for i in range(len(D_LS)):
-            prob += w_LS[i] >= D_LS[i] - u_LS[i]
-            prob += w_LS[i] >= 0
-
-        # Supply constraint
-        prob += lpSum(u_TR) + lpSum(u_LS) == N, "Supply_Constraint"
-
-        # Defining the objective function
-        # 1 / max(Ti_TR[i], 1 / (10 + abs(Ti_TR[i]))) * w_TR[i]
-        # 1 / max(Ti_LS[i], 1 / (10 + abs(Ti_LS[i]))) * w_LS[i]
-        prev_Z = math.inf
-        for decrease_ratio in decrease_ratio_list:
-            objective = lpSum(
-                [
-                    (math.e ** (math.log(decrease_ratio) * Ti_TR[i])) * w_TR[i]
-                    for i in range(len(Ti_TR))
-                ]
-            ) + lpSum(
-                [
-                    (math.e ** (math.log(decrease_ratio) * Ti_LS[i])) * w_LS[i]
-                    for i in range(len(Ti_LS))
-                ]
-            )
-
-            # Set the objective
-            prob.setObjective(objective)
-
-            # Solve the problem
-            prob.solve()
-
-            if prev_Z > math.log(value(prob.objective)):
-                prev_Z = math.log(value(prob.objective))
-                final_decrease_ratio = decrease_ratio
-
-                # Results
-                n_TR_solution = [n_TR[i].varValue for i in range(len(n_TR))]
-                u_LS_solution = [u_LS[i].varValue for i in range(len(u_LS))]
-
-                # Calculate the actual u_TR based on the n_TR_solution and STD_QTY_TR
-                u_TR_solution = [
-                    n_TR_solution[i] * STD_QTY_TR[i] for i in range(len(STD_QTY_TR))
-                ]
-            # if prev_Z > math.log(value(prob.objective)):
-            #     prev_Z = math.log(value(prob.objective))
-
-        if output == 0:
-            # print(prob.objective)
-            # print(type(prob.objective))
-            # print(value(prob.objective))
-            print(prev_Z, final_decrease_ratio)
-            return (prev_Z, final_decrease_ratio)
-        elif output == 1:
-            return (n_TR_solution, u_TR_solution, u_LS_solution)
+from datetime import datetime
+from pulp import (
+    LpProblem,
+    LpMinimize,
+    LpVariable,
+    lpSum,
+    value,
+    LpContinuous,
+    LpInteger,
+    LpStatus,
+    getSolver,
+    listSolvers,
+)
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import math
+
+import numpy as np
+
+import config
+from solution_cache import default_cache, solution_key
+
+# decrease_ratio_list = [0.2, 0.5, 0.9]
+
+# Solvers tried in order when config.SOLVER is "auto".
+PREFERRED_SOLVERS = ["HiGHS", "HiGHS_CMD", "PULP_CBC_CMD"]
+
+
+def resolve_solver_name(name=None):
+    """
+    Returns the PuLP solver name to use, looking up the installed solvers for "auto".
+
+    Args:
+        name (str): A PuLP solver name such as "PULP_CBC_CMD" or "HiGHS", or "auto" for
+            the first installed solver of PREFERRED_SOLVERS. Defaults to config.SOLVER.
+
+    Raises:
+        RuntimeError: If name is "auto" and none of PREFERRED_SOLVERS is installed.
+    """
+    name = name or config.SOLVER
+    if name == "auto":
+        # ~ listSolvers PROBES THE SOLVER BINARIES, RESOLVE ONCE PER PROBLEM
+        available = listSolvers(onlyAvailable=True)
+        name = next((solver for solver in PREFERRED_SOLVERS if solver in available), None)
+        if name is None:
+            raise RuntimeError(f"No solver of {PREFERRED_SOLVERS} is available")
+    return name
+
+
+def make_solver(name=None):
+    """
+    Returns a quiet PuLP solver instance.
+
+    Args:
+        name (str): A solver name as taken by resolve_solver_name.
+    """
+    return getSolver(resolve_solver_name(name), msg=False)
+
+
+class Calculations:
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache (SolutionCache): Cache of split_score solutions. Defaults to the
+                process-wide cache configured by config.SOLUTION_CACHE_SIZE.
+        """
+        self.cache = cache if cache is not None else default_cache()
+
+    def allocate_full(self, demand_items: list, total_num_units: int) -> list:
+        demands = sorted(demand_items, key=lambda x: x[-1])
+        allocated = []
+        for beginning_demand, weekly_bsd in demand_items:
+            if max((beginning_demand - total_num_units), 0) == 0:
+                total_num_units -= beginning_demand
+
+                allocated.append(beginning_demand)
+            else:
+                beginning_demand -= total_num_units
+                allocated.append(total_num_units)
+                total_num_units = 0
+        return allocated
+
+    def calculate_Z_batch(
+        self,
+        Ti_TR: list,
+        Ti_LS: list,
+        D_TR: list,
+        u_TR: list,
+        D_LS: list,
+        u_LS: list,
+        Z_TR: int,
+        Z_LS: int,
+        decrease_ratios: list,
+    ) -> np.ndarray:
+        """
+        Evaluates the objective of calculate_Z for every decrease ratio in one broadcast.
+
+        Each week's shortfall max(D - u * Z, 0) is weighted by decrease_ratio ** Ti, so
+        the weights form a (ratios x weeks) matrix and the objectives are its products
+        with the TR and LS shortfall vectors.
+
+        Args:
+            Ti_TR, Ti_LS (list): Week offsets of the TR and LS demands.
+            D_TR, D_LS (list): Demand quantities.
+            u_TR, u_LS (list): Allocation per unit of Z_TR and Z_LS.
+            Z_TR, Z_LS (int): Allocation multipliers.
+            decrease_ratios (list): Candidate ratios, each in (0, 1].
+
+        Returns:
+            np.ndarray: log(of_TR + of_LS) for each ratio, in the order given.
+        """
+        log_ratios = np.log(np.asarray(decrease_ratios, dtype=float))[:, np.newaxis]
+        of_TR = np.exp(log_ratios * np.asarray(Ti_TR, dtype=float)) @ np.maximum(
+            np.asarray(D_TR, dtype=float) - np.asarray(u_TR, dtype=float) * Z_TR, 0
+        )
+        of_LS = np.exp(log_ratios * np.asarray(Ti_LS, dtype=float)) @ np.maximum(
+            np.asarray(D_LS, dtype=float) - np.asarray(u_LS, dtype=float) * Z_LS, 0
+        )
+        with np.errstate(divide="ignore"):
+            return np.log(of_TR + of_LS)
+
+    def calculate_Z(
+        self,
+        Ti_TR: list,
+        Ti_LS: list,
+        D_TR: list,
+        u_TR: list,
+        D_LS: list,
+        u_LS: list,
+        Z_TR: int,
+        Z_LS: int,
+        decrease_ratio: float,
+    ):
+        Z = self.calculate_Z_batch(
+            Ti_TR, Ti_LS, D_TR, u_TR, D_LS, u_LS, Z_TR, Z_LS, [decrease_ratio]
+        )[0]
+        if not np.isfinite(Z):
+            # ~ SAME ERROR AS math.log WHEN NOTHING IS LEFT UNALLOCATED
+            raise ValueError("math domain error")
+        return float(Z)
+
+    def solve_objective(self, problem: dict, objective: dict, solver_name: str = None):
+        """
+        Solves a copy of a problem under the given objective.
+
+        Every call rebuilds its own variables from the problem dict, so calls can run
+        in parallel threads without sharing solver results.
+
+        Args:
+            problem (dict): The problem as returned by LpProblem.to_dict.
+            objective (dict): Objective coefficient by variable name.
+            solver_name (str): Solver passed to make_solver.
+
+        Returns:
+            tuple: The objective value and the value of every variable by name.
+        """
+        variables, prob = LpProblem.from_dict(problem)
+        prob.setObjective(
+            lpSum(coefficient * variables[name] for name, coefficient in objective.items())
+        )
+        prob.solve(make_solver(solver_name))
+        return value(prob.objective), {
+            name: variable.varValue for name, variable in variables.items()
+        }
+
+    def split_score(
+        self,
+        STD_QTY: int,
+        N: int,
+        Ti_TR: list,
+        Ti_LS: list,
+        D_TR: list,
+        u_TR: list,
+        D_LS: list,
+        u_LS: list,
+        output: int,
+        product_type: str,
+    ):
+        # Initialize the problem
+        decrease_ratio_list = [0.1, 0.3, 0.5, 0.7, 0.9]
+        key = None
+        if self.cache is not None:
+            # ~ u_TR AND u_LS ARE DECISION VARIABLES BELOW, SO THEY ARE NOT PART OF THE KEY
+            key = solution_key(
+                STD_QTY=STD_QTY,
+                N=N,
+                Ti_TR=Ti_TR,
+                Ti_LS=Ti_LS,
+                D_TR=D_TR,
+                D_LS=D_LS,
+                product_type=product_type,
+                decrease_ratios=decrease_ratio_list,
+                solver=config.SOLVER,
+            )
+            solution = self.cache.get(key)
+            if solution is not None:
+                return self.split_score_result(solution, output)
+
+        prob = LpProblem("Minimize_of_with_constraints", LpMinimize)
+        if product_type == "MAXCIM":
+            STD_QTY = STD_QTY * (1.002)
+        STD_QTY_TR = [STD_QTY for i in range(len(D_TR))]
+        # Create the decision variables for u_TR and u_LS
+        # Here, n_TR are integer decision variables representing the multiples of STD_QTY_TR
+        n_TR = [
+            LpVariable(f"n_TR_{i}", cat="Integer", lowBound=0) for i in range(len(D_TR))
+        ]
+        u_LS = [LpVariable(f"u_LS_{i}", lowBound=0) for i in range(len(D_LS))]
+
+        # Define u_TR as multiples of STD_QTY_TR
+        u_TR = [n_TR[i] * STD_QTY_TR[i] for i in range(len(STD_QTY_TR))]
+
+        # Auxiliary variables for the max function
+        w_TR = [LpVariable(f"w_TR_{i}", lowBound=0) for i in range(len(D_TR))]
+        w_LS = [LpVariable(f"w_LS_{i}", lowBound=0) for i in range(len(D_LS))]
+
+        # Adding the max function constraints
+        for i in range(len(D_TR)):
+            prob += w_TR[i] >= D_TR[i] - u_TR[i]
+            prob += w_TR[i] >= 0
+
+        for i in range(len(D_LS)):
+            prob += w_LS[i] >= D_LS[i] - u_LS[i]
+            prob += w_LS[i] >= 0
+
+        # Supply constraint
+        prob += lpSum(u_TR) + lpSum(u_LS) == N, "Supply_Constraint"
+
+        # Defining the objective function
+        # 1 / max(Ti_TR[i], 1 / (10 + abs(Ti_TR[i]))) * w_TR[i]
+        # 1 / max(Ti_LS[i], 1 / (10 + abs(Ti_LS[i]))) * w_LS[i]
+        # ~ THE CONSTRAINTS ARE SHARED, EVERY RATIO ONLY CHANGES THE OBJECTIVE WEIGHTS
+        problem = prob.to_dict()
+        objectives = [
+            {
+                **{
+                    w_TR[i].name: math.e ** (math.log(decrease_ratio) * Ti_TR[i])
+                    for i in range(len(Ti_TR))
+                },
+                **{
+                    w_LS[i].name: math.e ** (math.log(decrease_ratio) * Ti_LS[i])
+                    for i in range(len(Ti_LS))
+                },
+            }
+            for decrease_ratio in decrease_ratio_list
+        ]
+        solver_name = resolve_solver_name(config.SOLVER)
+        workers = max(1, min(config.SOLVER_WORKERS, len(decrease_ratio_list)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    lambda objective: self.solve_objective(problem, objective, solver_name),
+                    objectives,
+                )
+            )
+
+        prev_Z = math.inf
+        for decrease_ratio, (objective_value, solution) in zip(decrease_ratio_list, results):
+            if prev_Z > math.log(objective_value):
+                prev_Z = math.log(objective_value)
+                final_decrease_ratio = decrease_ratio
+
+                # Results
+                n_TR_solution = [solution[n_TR[i].name] for i in range(len(n_TR))]
+                u_LS_solution = [solution[u_LS[i].name] for i in range(len(u_LS))]
+
+                # Calculate the actual u_TR based on the n_TR_solution and STD_QTY_TR
+                u_TR_solution = [
+                    n_TR_solution[i] * STD_QTY_TR[i] for i in range(len(STD_QTY_TR))
+                ]
+
+        solution = {
+            "prev_Z": prev_Z,
+            "decrease_ratio": final_decrease_ratio,
+            "n_TR": n_TR_solution,
+            "u_TR": u_TR_solution,
+            "u_LS": u_LS_solution,
+        }
+        if key is not None:
+            self.cache.put(key, solution)
+        return self.split_score_result(solution, output)
+
+    def split_score_result(self, solution: dict, output: int):
+        """
+        Returns the part of a split_score solution selected by output.
+
+        Args:
+            solution (dict): The best "prev_Z", "decrease_ratio", "n_TR", "u_TR" and "u_LS".
+            output (int): 0 for (prev_Z, decrease ratio), 1 for the allocation vectors.
+        """
+        if output == 0:
+            logging.debug(f"prev_Z {solution['prev_Z']}, decrease ratio {solution['decrease_ratio']}")
+            return (solution["prev_Z"], solution["decrease_ratio"])
+        elif output == 1:
+            # ~ COPIES, THE SOLUTION MAY BE THE CACHED ONE
+            return (list(solution["n_TR"]), list(solution["u_TR"]), list(solution["u_LS"]))
@@ -0,0 +1,335 @@
+"""
+Record-and-replay cassettes of the LotTracks pages for offline end-to-end runs.
+
+The cassette server sits between Chrome and LotTracks. In record mode it forwards every
+request to the real server and stores the responses: pages, posted forms, scripts and
+stylesheets. In replay mode it answers from the cassette alone, so WebActions runs
+unchanged against a reproducible copy of the site:
+
+    python cassette.py record cassettes/monday
+    python cassette.py replay cassettes/monday
+
+Responses are replayed per method and path in the order they were recorded, which
+reproduces a run as long as the bot visits the pages in the same order. Every run
+reports its duration, WebDriver commands, seconds per base part and page load times, to
+compare versions or browser settings:
+
+    python cassette.py replay cassettes/monday --full-browser
+"""
+
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+
+import config
+
+# Headers that describe the forwarded connection, not the response body.
+HOP_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "transfer-encoding",
+}
+TEXT_TYPES = ("text/", "javascript", "json", "xml")
+
+
+def origin_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def local_cookie(header):
+    """Strips the Domain and Secure attributes so Chrome keeps the cookie for the cassette server."""
+    return re.sub(r";\s*(domain=[^;]*|secure)(?=;|$)", "", header, flags=re.IGNORECASE)
+
+
+class Cassette:
+    """
+    Recorded responses of a LotTracks session, stored in a directory.
+
+    The directory holds index.json, listing every response in recording order, and
+    one body file per response. Absolute links to the recorded server are stored as
+    root-relative paths, so the pages work on whatever port the replay server uses.
+
+    Attributes:
+        directory (str): Directory of the cassette.
+        upstream (str): Origin of the recorded server, e.g. "https://lottracks.example".
+        entries (list): Dicts with "method", "path", "status", "headers" and "body".
+        misses (int): Replayed requests the cassette had no response for.
+    """
+
+    def __init__(self, directory, upstream=None):
+        self.directory = directory
+        self.upstream = upstream
+        self.entries = []
+        self.misses = 0
+        self.local_origin = None
+        self.cursors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "index.json")) as index_file:
+            index = json.load(index_file)
+        cassette = cls(directory, index["upstream"])
+        cassette.entries = index["entries"]
+        return cassette
+
+    def save(self):
+        with open(os.path.join(self.directory, "index.json"), "w") as index_file:
+            json.dump({"upstream": self.upstream, "entries": self.entries}, index_file, indent=2)
+        logging.info(f"Saved {len(self.entries)} responses to cassette {self.directory}.")
+
+    def body_path(self, name):
+        return os.path.join(self.directory, "bodies", name)
+
+    def record(self, method, path, headers, body):
+        """
+        Forwards a request to the upstream server and stores its response.
+
+        Returns:
+            tuple: The status, headers and body to send to the browser.
+        """
+        upstream_headers = {
+            name: value.replace(self.local_origin, self.upstream)
+            for name, value in headers.items()
+            if name.lower() not in ("host", "accept-encoding", "content-length")
+        }
+        response = requests.request(
+            method,
+            self.upstream + path,
+            headers=upstream_headers,
+            data=body,
+            allow_redirects=False,
+            timeout=config.HTTP_TIMEOUT,
+        )
+
+        response_headers = []
+        for name, value in response.raw.headers.items():
+            if name.lower() in HOP_HEADERS:
+                continue
+            if name.lower() == "set-cookie":
+                value = local_cookie(value)
+            elif name.lower() == "location":
+                value = value.replace(self.upstream, "")
+            response_headers.append((name, value))
+
+        content = response.content
+        if any(text in response.headers.get("Content-Type", "") for text in TEXT_TYPES):
+            content = content.replace(self.upstream.encode(), b"")
+
+        with self.lock:
+            name = f"{len(self.entries):05}"
+            with open(self.body_path(name), "wb") as body_file:
+                body_file.write(content)
+            self.entries.append(
+                {
+                    "method": method,
+                    "path": path,
+                    "status": response.status_code,
+                    "headers": response_headers,
+                    "body": name,
+                }
+            )
+        return response.status_code, response_headers, content
+
+    def replay(self, method, path):
+        """
+        Returns the next recorded response of a method and path.
+
+        Once every response of a path was served, the last one is served again.
+        """
+        with self.lock:
+            matches = [
+                entry
+                for entry in self.entries
+                if entry["method"] == method and entry["path"] == path
+            ]
+            if not matches:
+                self.misses += 1
+                logging.info(f"Cassette has no response for {method} {path}.")
+                return 404, [("Content-Type", "text/plain")], b"Not in cassette"
+            entry = matches[min(self.cursors[method, path], len(matches) - 1)]
+            self.cursors[method, path] += 1
+
+        with open(self.body_path(entry["body"]), "rb") as body_file:
+            content = body_file.read()
+        return entry["status"], [tuple(header) for header in entry["headers"]], content
+
+
+class CassetteHandler(BaseHTTPRequestHandler):
+    def handle_request(self):
+        cassette = self.server.cassette
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        if self.server.recording:
+            status, headers, content = cassette.record(
+                self.command, self.path, dict(self.headers.items()), body
+            )
+        else:
+            status, headers, content = cassette.replay(self.command, self.path)
+
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    do_GET = do_POST = do_HEAD = handle_request
+
+    def log_message(self, format, *args):
+        logging.debug(f"Cassette server: {format % args}")
+
+
+class CassetteServer(ThreadingHTTPServer):
+    """
+    Local HTTP server that records into or replays from a cassette.
+
+    Attributes:
+        cassette (Cassette): The cassette to record into or replay from.
+        recording (bool): True to forward requests upstream and record the responses.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, cassette, recording=False, port=0):
+        super().__init__(("127.0.0.1", port), CassetteHandler)
+        self.cassette = cassette
+        self.recording = recording
+        cassette.local_origin = self.origin
+        self.thread = None
+
+    @property
+    def origin(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info(f"Cassette server {'recording' if self.recording else 'replaying'} at {self.origin}")
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.recording:
+            self.cassette.save()
+
+
+def count_commands(driver):
+    """
+    Counts the WebDriver commands a driver sends from now on.
+
+    Returns:
+        Counter: Number of calls by WebDriver command name, updated as commands are sent.
+    """
+    counts = Counter()
+    execute = driver.execute
+
+    def counting_execute(driver_command, params=None):
+        counts[driver_command] += 1
+        return execute(driver_command, params)
+
+    driver.execute = counting_execute
+    return counts
+
+
+def run_with_cassette(directory, recording):
+    """
+    Runs a full allocation session through a cassette server and reports its cost.
+
+    Returns:
+        dict: "seconds", "base_parts", "seconds_per_base_part", "commands" (total
+            WebDriver commands), "commands_by_name", "page_load" (the step metrics of
+            the part page loads) and "cassette_misses".
+    """
+    # ~ IMPORTED HERE, webactions CONFIGURES LOGGING ON IMPORT
+    from webactions import WebActions, run_session
+
+    if config.DEBUG:
+        url = config.DEV_CREDENTIALS["url"]
+    else:
+        url = config.PROD_CREDENTIALS["url"]
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+    if recording:
+        os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+        cassette = Cassette(directory, origin_of(url))
+    else:
+        cassette = Cassette.load(directory)
+    server = CassetteServer(cassette, recording=recording)
+    server.start()
+
+    # ~ NEVER OVERWRITE THE REAL SESSION COOKIES WITH THE CASSETTE SERVER'S
+    config.COOKIE_STORE = None
+    # ~ NOR READ OR WRITE THE REAL JOURNAL AND FINGERPRINTS: A REPLAY VISITS EVERY BASE PART
+    config.JOURNAL_FILE = None
+    config.FINGERPRINT_FILE = None
+    base_parts = []
+    start = time.monotonic()
+    web_actions = WebActions(url=server.origin + path)
+    commands = count_commands(web_actions.driver)
+    perform_allocation = web_actions.perform_allocation
+
+    def counting_perform_allocation(link, base_part_num, product, *args, **kwargs):
+        base_parts.append(base_part_num)
+        return perform_allocation(link, base_part_num, product, *args, **kwargs)
+
+    web_actions.perform_allocation = counting_perform_allocation
+    try:
+        run_session(web_actions)
+    finally:
+        web_actions.cleanup()
+        server.stop()
+    seconds = time.monotonic() - start
+
+    report = {
+        "seconds": seconds,
+        "base_parts": len(base_parts),
+        "seconds_per_base_part": seconds / len(base_parts) if base_parts else None,
+        "commands": sum(commands.values()),
+        "commands_by_name": dict(commands.most_common()),
+        "page_load": web_actions.metrics.summary().get("page_load"),
+        "cassette_misses": cassette.misses,
+    }
+    logging.info(f"Cassette run report: {json.dumps(report)}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or replay a LotTracks cassette.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("directory")
+    parser.add_argument("--report", help="write the run report as JSON to this file")
+    parser.add_argument(
+        "--full-browser",
+        action="store_true",
+        help="load every page fully, as with config.LEAN_BROWSER = False",
+    )
+    args = parser.parse_args(argv)
+
+    if args.full_browser:
+        config.LEAN_BROWSER = False
+
+    report = run_with_cassette(args.directory, args.mode == "record")
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,66 @@
-# DEBUG options
-
-DEBUG = False  # set to False in production
-FOR_DEMO = False
-HEADLESS = True
-SAMPLE_BASE_PART_NUM = {"MAX140CMH+"}
-
-DEV_CREDENTIALS = {
-    "username": "JDiwa  nga",
-    "password": "March199809Kendra",
-    "url": "http://cavlrepdev01.maxim-ic.com/webdev/tst/?q=tciat/withdemand/dashboard",
-}
-
-PROD_CREDENTIALS = {
-    "username": "JDiwanga",
-    "password": "March199809Kendra",
-    "url": "http://lottracks.maxim-ic.com/tst/?q=tciat/withdemand/dashboard",
-}
-
-
-MENU_ELEMENT_DEV = 'li[id="menu-1374-1"]'
-MENU_ELEMENT_PROD = 'li[id="menu-1352-1"]'
-DEMAND_ELEMENT_DEV = 'li[id="menu-1375-1"] a'
-DEMAND_ELEMENT_PROD = 'li[id="menu-1353-1"] a'
+# DEBUG options
+
+DEBUG = False  # set to False in production
+FOR_DEMO = False
+HEADLESS = True
+SUMMARY_SNAPSHOT = True  # read the demand summary table with one script call
+CHROME_USER_DATA_DIR = None  # persistent Chrome profile directory; None starts a fresh profile
+COOKIE_STORE = None  # JSON file to save session cookies to and restore them from
+LINK_QUEUE = False  # visit every base part link directly instead of returning to the summary
+PLAN_FIRST = False  # plan every base part before any form write, then apply the plans
+DRY_RUN = False  # plan every base part and write the plans to PLAN_FILE, without form writes
+PLAN_FILE = "allocation_plan.json"  # where the plans of a planned run are written; None skips it
+NUM_WORKERS = 1  # parallel Chrome sessions; 1 keeps the single browser run
+BACKEND = "selenium"  # "selenium" drives Chrome, "http" posts the LotTracks forms directly
+HTTP_TIMEOUT = 30  # seconds per request of the http backend
+BATCHED_FORM_FILL = True  # fill each lot's allocation rows with one script call instead of per-field commands
+SOLVER = "auto"  # PuLP solver for split_score; "auto" prefers HiGHS and falls back to CBC
+SOLVER_WORKERS = 5  # decrease ratios solved in parallel by split_score
+SOLUTION_CACHE_SIZE = 1024  # split_score solutions kept in memory; 0 disables the cache
+SOLUTION_CACHE_FILE = None  # sqlite file that keeps split_score solutions across restarts
+METRICS_FILE = None  # step timing summary written at the end of a run; ".json" for JSON, else Prometheus text
+JOURNAL_FILE = "allocation_journal.jsonl"  # checkpoints of an unfinished run, resumed on restart; None disables
+FINGERPRINT_FILE = "summary_fingerprints.json"  # summary rows of earlier runs; only changed base parts are visited
+FORCE_FULL_SCAN = False  # visit every base part even if its summary row did not change
+DEPLETE_ACROSS_LOTS = False  # later WIP lots of a base part only get the demand earlier lots left
+LEAN_BROWSER = True  # eager page loads, no images, small window, and BLOCKED_URL_PATTERNS blocked
+BLOCKED_URL_PATTERNS = [  # requests the allocation pages do not need, blocked when LEAN_BROWSER is set
+    "*.css",
+    "*.css?*",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.eot",
+    "*google-analytics.com/*",
+    "*googletagmanager.com/*",
+    "*doubleclick.net/*",
+]
+DAEMON_INTERVAL = 900  # seconds between the starts of daemon.py's allocation cycles
+DAEMON_CRON = None  # cron expression ("minute hour day month weekday") for daemon.py, overrides DAEMON_INTERVAL
+LOG_FILE = "session.log"  # JSON lines log, written by a background thread
+LOG_LEVEL = "INFO"  # "DEBUG" also logs the demand and allocation payloads
+LOG_CONSOLE = True  # echo log messages to stdout as plain text
+LOG_PAYLOAD_SAMPLE = 1.0  # fraction of payloads kept at DEBUG level, e.g. 0.05 to sample
+RETRY_ATTEMPTS = 3  # attempts per base part on stale elements, timeouts and server errors
+RETRY_BASE_DELAY = 1.0  # seconds; the n-th retry waits up to RETRY_BASE_DELAY * 2 ** (n - 1), jittered
+RETRY_MAX_DELAY = 30.0  # upper bound of any retry wait, in seconds
+SAMPLE_BASE_PART_NUM = {"MAX140CMH+"}
+
+DEV_CREDENTIALS = {
+    "username": "JDiwa  nga",
+    "password": "March199809Kendra",
+    "url": "http://cavlrepdev01.maxim-ic.com/webdev/tst/?q=tciat/withdemand/dashboard",
+}
+
+PROD_CREDENTIALS = {
+    "username": "JDiwanga",
+    "password": "March199809Kendra",
+    "url": "http://lottracks.maxim-ic.com/tst/?q=tciat/withdemand/dashboard",
+}
+
+
+MENU_ELEMENT_DEV = 'li[id="menu-1374-1"]'
+MENU_ELEMENT_PROD = 'li[id="menu-1352-1"]'
+DEMAND_ELEMENT_DEV = 'li[id="menu-1375-1"] a'
+DEMAND_ELEMENT_PROD = 'li[id="menu-1353-1"] a'
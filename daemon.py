@@ -0,0 +1,296 @@
+"""
+Long-running allocation daemon that keeps its browser sessions warm between cycles.
+
+    python3 daemon.py
+
+Chrome is started and logged in once per process. Every cycle then re-validates the
+session, logging in again only if it expired, and allocates like a single run of
+webactions.py. Cycles start every config.DAEMON_INTERVAL seconds, or on the minutes
+matched by config.DAEMON_CRON. A cycle that overruns the next start skips it instead of
+running back to back. SIGTERM or Ctrl+C stops the daemon after the base part being
+allocated, or with a worker pool after the running cycle; an interrupted cycle is
+resumed from the journal by the next one.
+"""
+
+from datetime import datetime, timedelta
+
+import logging
+import signal
+import threading
+
+import config
+from metrics import Metrics
+from webactions import WebActions, run_session
+
+# Ranges of the minute, hour, day of month, month and day of week fields of a cron expression.
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+class Shutdown(BaseException):
+    """
+    Raised inside a running cycle to stop it; like KeyboardInterrupt, no "except Exception" catches it.
+    """
+
+
+def parse_cron_field(field, low, high):
+    """
+    Returns the set of values a cron field matches, e.g. "*/15", "1-5" or "0,30".
+    """
+    values = set()
+    for part in field.split(","):
+        part, _, step = part.partition("/")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-"))
+        else:
+            start = int(part)
+            end = high if step else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field {field!r} is outside {low}-{high}.")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule:
+    """
+    The start times matched by a five-field cron expression, "minute hour day month weekday".
+
+    Fields take "*", numbers, ranges, lists and steps. Weekdays count from Sunday as 0 (7
+    is Sunday as well). As in cron, a day matches if either the day of month or the day
+    of week matches when both are restricted.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} does not have five fields.")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # ~ "*/2" IS AS UNRESTRICTED AS "*" FOR THE DAY OR RULE, AS IN CRON
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    def matches_day(self, moment):
+        day = moment.day in self.days
+        # ~ datetime COUNTS WEEKDAYS FROM MONDAY AS 0, CRON FROM SUNDAY
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_run(self, after):
+        """
+        Returns the first matching minute after a time.
+        """
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # ~ EVERY SCHEDULE REPEATS WITHIN FOUR YEARS, FEB 29 INCLUDED
+        limit = moment + timedelta(days=4 * 366)
+        while moment < limit:
+            if moment.month not in self.months or not self.matches_day(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError("Cron expression never matches.")
+
+
+class IntervalSchedule:
+    """
+    Start times a fixed number of seconds apart, the first one right away.
+    """
+
+    def __init__(self, seconds):
+        self.interval = timedelta(seconds=seconds)
+
+    def next_run(self, after):
+        return after + self.interval
+
+
+class AllocationDaemon:
+    """
+    Runs allocation cycles on a schedule with browser sessions that stay logged in.
+
+    With config.NUM_WORKERS > 1 the coordinator session and the worker pool are kept warm,
+    otherwise one WebActions (or HttpActions) session.
+
+    Attributes:
+        schedule: A CronSchedule or IntervalSchedule giving the cycle start times.
+        web_actions: The session that runs the cycles, or the pool's coordinator.
+        pool (AllocationPool): The warm worker pool, None for a single session.
+        stop_event (threading.Event): Set once the daemon was asked to stop.
+        in_cycle (bool): True while a cycle runs.
+        busy (bool): True while a base part, or with a pool the whole cycle, is being allocated.
+    """
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.web_actions = None
+        self.pool = None
+        self.stop_event = threading.Event()
+        self.in_cycle = False
+        self.busy = False
+
+    def start_sessions(self):
+        """
+        Starts Chrome (and the workers) once; the sessions log in on their first cycle.
+        """
+        if config.NUM_WORKERS > 1:
+            from worker_pool import AllocationPool
+
+            self.web_actions = WebActions()
+            self.pool = AllocationPool(config.NUM_WORKERS)
+            self.pool.start()
+            return
+
+        if config.BACKEND == "http":
+            from http_backend import HttpActions
+
+            self.web_actions = HttpActions()
+        else:
+            self.web_actions = WebActions()
+        # ~ BOTH WAYS A BASE PART IS WRITTEN: DIRECTLY, OR FROM A PLAN WITH config.PLAN_FIRST
+        self.web_actions.perform_allocation = self.guard(self.web_actions.perform_allocation)
+        self.web_actions.apply_planned_part = self.guard(self.web_actions.apply_planned_part)
+
+    def restart_sessions(self):
+        """
+        Starts fresh sessions, leaving them to the next cycle if Chrome or a worker fails to start.
+        """
+        self.stop_sessions()
+        try:
+            self.start_sessions()
+        except Exception as error:
+            logging.exception(f"Starting the sessions failed, retrying on the next cycle: {error}")
+            self.stop_sessions()
+
+    def stop_sessions(self):
+        if self.pool is not None:
+            self.pool.stop()
+            self.pool = None
+        if self.web_actions is not None:
+            web_actions, self.web_actions = self.web_actions, None
+            try:
+                web_actions.cleanup()
+            except Exception as error:
+                # ~ THE BROWSER MAY ALREADY BE GONE AFTER A FAILED CYCLE
+                logging.info(f"Closing the session failed: {error}")
+
+    def guard(self, allocate):
+        """
+        Wraps a method that writes one base part so a stop request waits for it to finish.
+        """
+
+        def guarded_allocate(*args, **kwargs):
+            self.busy = True
+            try:
+                result = allocate(*args, **kwargs)
+            finally:
+                self.busy = False
+            if self.stop_event.is_set():
+                raise Shutdown()
+            return result
+
+        return guarded_allocate
+
+    def handle_signal(self, signum, frame):
+        logging.info(f"Received signal {signum}, stopping the allocation daemon.")
+        first = not self.stop_event.is_set()
+        self.stop_event.set()
+        if self.in_cycle and first:
+            if self.busy:
+                logging.info("Stopping after the base part being allocated.")
+            else:
+                raise Shutdown()
+
+    def run_cycle(self):
+        """
+        Runs one allocation cycle with the warm sessions and reports its step metrics.
+        """
+        if self.web_actions is None:
+            self.start_sessions()
+        with self.web_actions.metrics.span("cycle"):
+            if self.pool is None:
+                run_session(self.web_actions)
+                self.web_actions.fingerprints.save()
+            else:
+                from worker_pool import collect_links, record_results
+
+                # ~ A STOP REQUEST WAITS FOR THE WORKERS, THEIR RESULTS ARE NOT RECORDED OTHERWISE
+                self.busy = True
+                try:
+                    if not self.pool.alive():
+                        logging.info("Every allocation worker died, starting new ones.")
+                        self.pool.start()
+                    links = collect_links(self.web_actions)
+                    record_results(self.web_actions, self.pool.allocate(links))
+                finally:
+                    self.busy = False
+                if self.stop_event.is_set():
+                    raise Shutdown()
+
+        # ~ REPORT EVERY CYCLE ON ITS OWN
+        self.web_actions.report_metrics()
+        self.web_actions.metrics = Metrics()
+
+    def run(self):
+        """
+        Runs cycles on the schedule until the daemon is stopped.
+        """
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+
+        if isinstance(self.schedule, IntervalSchedule):
+            next_run = datetime.now()
+        else:
+            next_run = self.schedule.next_run(datetime.now())
+        try:
+            self.restart_sessions()
+            while not self.stop_event.is_set():
+                wait = (next_run - datetime.now()).total_seconds()
+                if wait > 0:
+                    logging.info(f"Next allocation cycle at {next_run:%Y-%m-%d %H:%M:%S}.")
+                    self.stop_event.wait(wait)
+                    continue
+
+                logging.info("Allocation cycle started.")
+                self.in_cycle = True
+                try:
+                    self.run_cycle()
+                    logging.info("Allocation cycle finished.")
+                except Exception as error:
+                    logging.exception(f"Allocation cycle failed, restarting the sessions: {error}")
+                    self.restart_sessions()
+                finally:
+                    self.in_cycle = False
+
+                now = datetime.now()
+                skipped = 0
+                next_run = self.schedule.next_run(next_run)
+                while next_run <= now:
+                    skipped += 1
+                    next_run = self.schedule.next_run(next_run)
+                if skipped:
+                    logging.info(f"Allocation cycle overran, skipped {skipped} scheduled cycles.")
+        except Shutdown:
+            logging.info("Allocation cycle interrupted; the journal resumes it on the next start.")
+        finally:
+            self.stop_sessions()
+            logging.info("Allocation daemon stopped.")
+
+
+def main():
+    if config.DAEMON_CRON:
+        schedule = CronSchedule(config.DAEMON_CRON)
+    else:
+        schedule = IntervalSchedule(config.DAEMON_INTERVAL)
+    AllocationDaemon(schedule).run()
+
+
+if __name__ == "__main__":
+    main()
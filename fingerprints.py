@@ -0,0 +1,98 @@
+from collections import defaultdict
+
+import hashlib
+import json
+import logging
+import os
+
+
+def row_fingerprint(row):
+    """
+    Returns a hash of the visible cell texts of a demand summary row.
+    """
+    return hashlib.sha256("\x1f".join(row["cells"]).encode("utf-8")).hexdigest()
+
+
+def combined_fingerprint(row_hashes):
+    """
+    Returns one fingerprint for the rows of a base part number, whatever their order.
+
+    A single row keeps its own fingerprint.
+    """
+    if len(row_hashes) == 1:
+        return row_hashes[0]
+    return hashlib.sha256("\x1f".join(sorted(row_hashes)).encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Remembers the demand summary rows of earlier runs to visit only the base parts that changed.
+
+    A base part number is visited when its row is new or its fingerprint changed since
+    it was last allocated, or when that allocation left lots unallocated. Fingerprints
+    are only stored once a base part was allocated, so a failed visit is retried. A base
+    part number with several summary rows is fingerprinted from all of them.
+
+    Attributes:
+        path (str): JSON file of the stored fingerprints, or None to visit every row.
+        force_full_scan (bool): Visit every row, while still storing fingerprints.
+        read_only (bool): Never store fingerprints, e.g. in a dry run that allocates nothing.
+        rows (dict): "fingerprint" and "pending" by "product|base part number".
+        observed (dict): Fingerprints of the rows read in this run, by the same key.
+    """
+
+    def __init__(self, path, force_full_scan=False, read_only=False):
+        self.path = path
+        self.force_full_scan = force_full_scan
+        self.read_only = read_only
+        self.rows = {}
+        self.observed = {}
+        if path and os.path.exists(path):
+            with open(path) as fingerprint_file:
+                self.rows = json.load(fingerprint_file)
+
+    def observe(self, product, rows):
+        """
+        Fingerprints every base part number of a summary snapshot from all of its rows.
+        """
+        row_hashes = defaultdict(list)
+        for row in rows:
+            row_hashes[f"{product}|{row['base_part_num']}"].append(row_fingerprint(row))
+        for key, hashes in row_hashes.items():
+            self.observed[key] = combined_fingerprint(hashes)
+
+    def should_visit(self, product, row):
+        """
+        Returns True if the base part number of a summary row needs a visit.
+
+        Uses the fingerprint observe() took of all rows of the base part, or the row's
+        own fingerprint if the snapshot was not observed.
+        """
+        key = f"{product}|{row['base_part_num']}"
+        if key not in self.observed:
+            self.observed[key] = row_fingerprint(row)
+        fingerprint = self.observed[key]
+        if not self.path or self.force_full_scan:
+            return True
+
+        stored = self.rows.get(key)
+        return stored is None or stored["fingerprint"] != fingerprint or stored["pending"]
+
+    def record(self, product, base_part_num, pending):
+        """
+        Stores the fingerprint a base part number was allocated at.
+
+        Args:
+            pending (bool): True if lots were left unallocated, so the next run visits it again.
+        """
+        key = f"{product}|{base_part_num}"
+        if key in self.observed and not self.read_only:
+            self.rows[key] = {"fingerprint": self.observed[key], "pending": pending}
+
+    def save(self):
+        if not self.path or self.read_only:
+            return
+        with open(f"{self.path}.tmp", "w") as fingerprint_file:
+            json.dump(self.rows, fingerprint_file, indent=2, sort_keys=True)
+        os.replace(f"{self.path}.tmp", self.path)
+        logging.info(f"Saved {len(self.rows)} summary row fingerprints to {self.path}.")
@@ -0,0 +1,306 @@
+from urllib.parse import urljoin
+
+import logging
+import requests
+
+import config
+from page_parser import parse_forms, parse_links, parse_part_page, parse_summary_page
+from solution_cache import close_default_cache
+from webactions import WebActions, load_cookies, save_cookies
+
+
+class HttpActions(WebActions):
+    """
+    Performs the WebActions operations with plain HTTP requests instead of a browser.
+
+    LotTracks is a Drupal site, so logging in, reading the demand summary and part
+    pages and saving an allocation are ordinary form flows. The pages are parsed with
+    page_parser and the forms are posted back with the values a browser would submit.
+
+    Allocation planning is shared with WebActions. Plans that need extra rows created
+    by the page's JavaScript (splits and MAXCIM allocations across several finish part
+    numbers) cannot be posted this way; those lots are logged and left for the selenium
+    backend.
+
+    Attributes:
+        session (requests.Session): HTTP session holding the login cookies.
+        url (str): URL of the demand summary dashboard.
+        page_url (str): URL of the last page fetched, used to resolve relative links.
+        page_html (str): HTML of the last page fetched.
+    """
+
+    def __init__(self, url=None):
+        """
+        Initializes the HTTP session with the configured credentials.
+
+        Args:
+            url (str): Dashboard URL overriding the configured one, e.g. a local stand-in server.
+        """
+        self._init_state(url)
+        self.session = requests.Session()
+        self.page_url = self.url
+        self.page_html = ""
+        logging.info(f"{self.__class__.__name__} initialized")
+
+    def fetch(self, url, data=None, method="get"):
+        """
+        Requests a page and keeps it as the current page.
+
+        Returns:
+            str: The HTML of the page.
+
+        Raises:
+            requests.HTTPError: If the server answers with an error status.
+        """
+        url = urljoin(self.page_url, url)
+        if method == "post":
+            response = self.session.post(url, data=data, timeout=config.HTTP_TIMEOUT)
+        else:
+            response = self.session.get(url, params=data, timeout=config.HTTP_TIMEOUT)
+        response.raise_for_status()
+        self.page_url = response.url
+        self.page_html = response.text
+        return self.page_html
+
+    def find_form(self, element_id):
+        """Returns the form of the current page holding the element with the given id."""
+        for form in parse_forms(self.page_html):
+            if element_id in form["field_ids"] or element_id in form["buttons"]:
+                return form
+        raise LookupError(f"No form with element #{element_id} on {self.page_url}")
+
+    def submit_form(self, form, button_id=None, values=None):
+        """
+        Submits a parsed form with some field values replaced.
+
+        Args:
+            form (dict): A form as returned by page_parser.parse_forms.
+            button_id (str): Id of the submit button to send, if any.
+            values (dict): Field values by field name. Fields not yet in the form are added.
+        """
+        values = dict(values or {})
+        fields = []
+        for name, value in form["fields"]:
+            if name in values:
+                value = values.pop(name)
+            fields.append((name, value))
+        fields.extend(values.items())
+        if button_id is not None:
+            fields.append(form["buttons"][button_id])
+        return self.fetch(form["action"] or self.page_url, data=fields, method=form["method"])
+
+    def ensure_login(self):
+        """
+        Reuses the cookies of config.COOKIE_STORE if the session is still valid, otherwise logs in.
+        """
+        logging.info(f"{self.__class__.__name__}.ensure_login method called")
+        for cookie in load_cookies(config.COOKIE_STORE):
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+
+        self.fetch(self.url)
+        if self.is_logged_in():
+            logging.info("Reusing the saved session.")
+            return
+
+        self.login()
+        cookies = []
+        for cookie in self.session.cookies:
+            saved = {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": bool(cookie.secure),
+            }
+            if cookie.expires is not None:
+                saved["expiry"] = cookie.expires
+            cookies.append(saved)
+        save_cookies(config.COOKIE_STORE, cookies)
+
+    def is_logged_in(self):
+        """
+        Returns True if the current page is not offering the login menu link.
+        """
+        return not any("menu-658" in link["li_classes"] for link in parse_links(self.page_html))
+
+    def login(self):
+        """
+        Logs in through the Drupal login form with the configured credentials.
+
+        Raises:
+            RuntimeError: If the login form is still shown after submitting it.
+        """
+        logging.info(f"{self.__class__.__name__}.login method called")
+        self.fetch(self.url)
+
+        login_link = next(
+            link for link in parse_links(self.page_html) if "menu-658" in link["li_classes"]
+        )
+        self.fetch(login_link["href"])
+
+        form = self.find_form("edit-name")
+        self.submit_form(
+            form,
+            "edit-submit",
+            {
+                form["field_ids"]["edit-name"]: self.username,
+                form["field_ids"]["edit-pass"]: self.password,
+            },
+        )
+        if any("edit-pass" in form["field_ids"] for form in parse_forms(self.page_html)):
+            raise RuntimeError("Login failed, the login form is still shown.")
+        logging.info("Logged in.")
+
+    def navigate_to_demand_summary_page(self):
+        """
+        Opens the demand summary dashboard, which the configured URL points to.
+        """
+        logging.info("Navigating to the demand summary page.")
+        self.fetch(self.url)
+
+    def select_product(self, product):
+        """
+        Submits the dashboard filter form with the product type radio button checked.
+        """
+        self.product = product
+        radio_id = self.product_type[product]
+        form = self.find_form(radio_id)
+        self.submit_form(form, values={form["field_ids"][radio_id]: form["choices"][radio_id]})
+
+    def read_summary_rows(self):
+        """
+        Returns every row of the demand summary table of the current page.
+        """
+        rows = parse_summary_page(self.page_html)
+        for row in rows:
+            row["link"] = urljoin(self.page_url, row["link"])
+        return rows
+
+    def navigate_each_customer_demand(self):
+        """
+        Allocates every base part number of both products from the summary pages.
+        """
+        for demand in self.collect_demand_links():
+            self.product = demand["product"]
+            self.allocate_base_part(demand["link"], demand["base_part_num"], demand["product"])
+        self.process_retry_queue()
+
+    def read_part_page(self):
+        """
+        Parses the demand and WIP tables of the current page.
+        """
+        return parse_part_page(self.page_html)
+
+    def load_part_page(self, link):
+        """
+        Fetches a base part page and returns it parsed.
+        """
+        with self.metrics.span("page_load"):
+            self.fetch(link)
+        with self.metrics.span("page_parse"):
+            return self.read_part_page()
+
+    def return_to_summary(self):
+        """
+        Nothing to do: every page is fetched directly, so there is no page to return from.
+        """
+
+    def apply_plan(self, plan, page=None):
+        """
+        Posts the finish type selections of a base part plan with the save button of the part form.
+
+        Lots that are no longer allocatable on the current page are skipped. Lot plans
+        that add or fill allocation rows are logged and left for the selenium backend.
+        Multi-demand pages are saved after every lot, single-demand pages once after all
+        lots. Only lots the returned page shows as allocated are recorded in the journal.
+
+        Args:
+            plan (dict): A plan as returned by plan_allocation.
+            page (dict): The parsed current page, if already read.
+
+        Returns:
+            list: Lot numbers of the plan that were left unallocated.
+        """
+        if page is None:
+            page = self.read_part_page()
+        open_lots = {
+            lot["Lot #"]: lot
+            for lot in page["wip_lots"]
+            if lot["Action"] == "" and lot["Status"] == ""
+        }
+
+        selections = {}
+        pending_lots = []
+        for lot_plan in plan["lots"]:
+            lot = open_lots.get(lot_plan["lot_number"])
+            if "error" in lot_plan:
+                pending_lots.append(lot_plan["lot_number"])
+                continue
+            if lot is None:
+                continue
+            if self.journal.has_lot(plan["product"], plan["base_part_num"], lot_plan["lot_number"]):
+                continue
+            if lot_plan["new_items"] or lot_plan["rows"]:
+                logging.info(
+                    f"Lot {lot_plan['lot_number']} of {plan['base_part_num']} needs "
+                    "allocation rows, left for the selenium backend."
+                )
+                pending_lots.append(lot_plan["lot_number"])
+                continue
+            selections[lot_plan["lot_number"]] = (
+                lot["fields"]["fintype"],
+                lot["fintype_values"][lot_plan["option"]],
+            )
+            logging.info(f"Base Part #: {plan['base_part_num']} Lot #: {lot_plan['lot_number']}")
+            logging.info(f"Selected dropdown value: {lot_plan['option']}")
+
+        if plan["save_per_lot"]:
+            batches = [[lot_number] for lot_number in selections]
+        else:
+            batches = [list(selections)] if selections else []
+        for batch in batches:
+            saved = self.save_lots(dict(selections[lot_number] for lot_number in batch))
+            for lot_number in batch:
+                if lot_number not in saved:
+                    logging.warning(
+                        f"Product-Type: {plan['product']} Base-Part-Number: {plan['base_part_num']} "
+                        f"Lot-Number: {lot_number} Save was not confirmed"
+                    )
+                    pending_lots.append(lot_number)
+                    continue
+                self.journal.record_lot(plan["product"], plan["base_part_num"], lot_number)
+                self.allocation_counter += 1
+                logging.info(
+                    f"Product-Type: {plan['product']} Base-Part-Number: {plan['base_part_num']} "
+                    f"Lot-Number: {lot_number} (Allocated Successfull)"
+                )
+        return pending_lots
+
+    def save_lots(self, values):
+        """
+        Saves the part form of the current page with some fields replaced.
+
+        Args:
+            values (dict): Field values by field name, e.g. the fintype selection of each lot.
+
+        Returns:
+            set: Lot numbers the returned page shows with an Action or Status.
+        """
+        with self.metrics.span("save"):
+            self.submit_form(self.find_form("btn_save"), "btn_save", values)
+        return {lot["Lot #"] for lot in self.read_part_page()["wip_lots"] if lot["Action"] or lot["Status"]}
+
+    def cleanup(self):
+        """
+        Closes the HTTP session.
+        """
+        logging.info(f"{self.__class__.__name__}.cleanup method called")
+        self.session.close()
+        self.fingerprints.save()
+        self.report_metrics()
+        close_default_cache()
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import time
+
+
+class Journal:
+    """
+    Append-only checkpoint journal of confirmed allocations, for resuming an interrupted run.
+
+    Every saved lot and every finished base part number is appended as one JSON line and
+    flushed to disk before the bot moves on, so a crash loses at most the entry being
+    written; a torn last line is ignored when the journal is read back. A run that
+    finishes clears the journal, so the next one starts from scratch.
+
+    Attributes:
+        path (str): The JSONL file, or None to keep no journal.
+        base_parts (set): (product, base_part_num) of the finished base part numbers.
+        lots (set): (product, base_part_num, lot_number) of the saved lots.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.base_parts = set()
+        self.lots = set()
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path) as journal_file:
+            lines = journal_file.read().split("\n")
+        if lines[-1]:
+            # ~ DROP THE TORN LAST LINE, OR THE NEXT APPEND WOULD CONTINUE IT
+            with open(self.path, "w") as journal_file:
+                journal_file.write("".join(line + "\n" for line in lines[:-1]))
+
+        for line in lines[:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            key = (entry["product"], entry["base_part_num"])
+            if entry["event"] == "lot":
+                self.lots.add(key + (entry["lot_number"],))
+            else:
+                self.base_parts.add(key)
+        logging.info(
+            f"Resuming from journal {self.path}: {len(self.base_parts)} base parts "
+            f"and {len(self.lots)} lots already done."
+        )
+
+    def append(self, entry):
+        if not self.path:
+            return
+        entry["time"] = time.time()
+        with open(self.path, "a") as journal_file:
+            journal_file.write(json.dumps(entry) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def has_base_part(self, product, base_part_num):
+        return (product, base_part_num) in self.base_parts
+
+    def has_lot(self, product, base_part_num, lot_number):
+        return (product, base_part_num, lot_number) in self.lots
+
+    def record_lot(self, product, base_part_num, lot_number):
+        """
+        Records a lot whose save was confirmed by the reloaded page.
+        """
+        self.lots.add((product, base_part_num, lot_number))
+        self.append(
+            {
+                "event": "lot",
+                "product": product,
+                "base_part_num": base_part_num,
+                "lot_number": lot_number,
+            }
+        )
+
+    def record_base_part(self, product, base_part_num):
+        """
+        Records a base part number whose lots have all been handled.
+        """
+        self.base_parts.add((product, base_part_num))
+        self.append({"event": "base_part", "product": product, "base_part_num": base_part_num})
+
+    def clear(self):
+        """
+        Forgets every entry and deletes the journal file, once a run has finished.
+        """
+        self.base_parts.clear()
+        self.lots.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+            logging.info(f"Run finished, journal {self.path} cleared.")
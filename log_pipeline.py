@@ -0,0 +1,139 @@
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+
+import config
+
+# The running listener, so setup_logging only installs the pipeline once per process.
+_listener = None
+
+
+def to_jsonable(value):
+    """
+    Converts a logged payload to JSON types; records such as Demand become dicts.
+    """
+    if hasattr(value, "_asdict"):
+        return {key: to_jsonable(item) for key, item in value._asdict().items()}
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON line with "time", "level", "module", "message" and,
+    for log_payload records, "payload".
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if hasattr(record, "payload"):
+            entry["payload"] = to_jsonable(record.payload)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """
+    Formats a record as plain text for the console, with a payload as compact JSON.
+    """
+
+    def format(self, record):
+        message = super().format(record)
+        if hasattr(record, "payload"):
+            message = f"{message} {json.dumps(to_jsonable(record.payload))}"
+        return message
+
+
+class RecordQueueHandler(QueueHandler):
+    """
+    Puts records on the queue with their message resolved, leaving all formatting to the listener.
+
+    QueueHandler would format the whole line, traceback included, in the logging thread.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # ~ TRACEBACKS CANNOT CROSS THREADS SAFELY, RENDER THEM HERE
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(path=None, level=None, console=None):
+    """
+    Routes all logging through a queue to a background thread that does the writing.
+
+    Logging calls only put the record on the queue, so file and console I/O never block
+    the browser loop. The listener writes JSON lines to the log file and, if enabled,
+    plain text to stdout, and is flushed when the process exits.
+
+    Args:
+        path (str): JSON lines log file. Defaults to config.LOG_FILE.
+        level (str): Level name of the root logger. Defaults to config.LOG_LEVEL.
+        console (bool): Also write to stdout. Defaults to config.LOG_CONSOLE.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handlers = []
+    file_handler = logging.FileHandler(path or config.LOG_FILE)
+    file_handler.setFormatter(JsonFormatter())
+    handlers.append(file_handler)
+    if config.LOG_CONSOLE if console is None else console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter("%(message)s"))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level or config.LOG_LEVEL)
+    root.addHandler(RecordQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """
+    Writes out every queued record and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def log_payload(message, payload):
+    """
+    Logs a large payload, such as a demand list, at DEBUG level.
+
+    The record is only created when DEBUG is enabled, and then only for the
+    config.LOG_PAYLOAD_SAMPLE fraction of calls, so payloads cost nothing in production.
+    """
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    if config.LOG_PAYLOAD_SAMPLE < 1 and random.random() >= config.LOG_PAYLOAD_SAMPLE:
+        return
+    logging.debug(message, extra={"payload": payload}, stacklevel=2)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from contextlib import contextmanager
+
+import json
+import logging
+import math
+import threading
+import time
+
+# Name of the exported Prometheus metrics.
+METRIC_NAME = "astrobot_step_seconds"
+QUANTILES = [0.5, 0.95]
+
+
+def percentile(durations, quantile):
+    """
+    Returns the nearest-rank percentile of a sorted list of durations.
+    """
+    rank = max(1, math.ceil(quantile * len(durations)))
+    return durations[rank - 1]
+
+
+class Metrics:
+    """
+    Collects timing spans of the bot's steps and summarizes them per step.
+
+    Attributes:
+        durations (dict): Seconds of every completed span, by step name.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """
+        Times the enclosed block as one occurrence of a step, also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self.lock:
+            self.durations[name].append(seconds)
+
+    def summary(self):
+        """
+        Returns "count", "total", "p50", "p95" and "max" seconds by step name.
+        """
+        with self.lock:
+            durations = {name: sorted(values) for name, values in self.durations.items()}
+        return {
+            name: {
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": values[-1],
+            }
+            for name, values in durations.items()
+        }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """
+        Returns the summary in the Prometheus text exposition format.
+        """
+        summary = self.summary()
+        lines = [
+            f"# HELP {METRIC_NAME} Duration of the bot's steps in seconds.",
+            f"# TYPE {METRIC_NAME} summary",
+        ]
+        for name, step in sorted(summary.items()):
+            for quantile in QUANTILES:
+                value = step[f"p{round(quantile * 100)}"]
+                lines.append(f'{METRIC_NAME}{{step="{name}",quantile="{quantile}"}} {value}')
+            lines.append(f'{METRIC_NAME}_sum{{step="{name}"}} {step["total"]}')
+            lines.append(f'{METRIC_NAME}_count{{step="{name}"}} {step["count"]}')
+        lines.append(f"# HELP {METRIC_NAME}_max Longest duration of the bot's steps in seconds.")
+        lines.append(f"# TYPE {METRIC_NAME}_max gauge")
+        for name, step in sorted(summary.items()):
+            lines.append(f'{METRIC_NAME}_max{{step="{name}"}} {step["max"]}')
+        return "\n".join(lines) + "\n"
+
+    def log_summary(self):
+        for name, step in sorted(self.summary().items()):
+            logging.info(
+                f"{name}: {step['count']} x, total {step['total']:.3f}s, p50 {step['p50']:.3f}s, "
+                f"p95 {step['p95']:.3f}s, max {step['max']:.3f}s"
+            )
+
+    def export(self, path):
+        """
+        Writes the summary to a file, as JSON if the path ends with .json, otherwise as Prometheus text.
+        """
+        with open(path, "w") as metrics_file:
+            if path.endswith(".json"):
+                metrics_file.write(self.to_json())
+            else:
+                metrics_file.write(self.to_prometheus())
+        logging.info(f"Wrote step metrics to {path}.")
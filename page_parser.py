@@ -0,0 +1,433 @@
+from html.parser import HTMLParser
+import re
+
+# Elements that never have a closing tag and so are never pushed on the element stack.
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+# Elements whose text is not part of a cell's visible text.
+SKIPPED_TEXT_ELEMENTS = {"script", "style", "select", "textarea"}
+# Start tags that implicitly close an open element (HTML optional end tags), mapped to
+# the elements they close and the elements that bound the search for them.
+IMPLICIT_CLOSERS = {
+    "td": (("td", "th"), ("tr", "table")),
+    "th": (("td", "th"), ("tr", "table")),
+    "tr": (("tr",), ("table", "tbody", "thead", "tfoot")),
+    "option": (("option",), ("select",)),
+}
+# Input types that are never sent as plain form fields.
+BUTTON_INPUT_TYPES = {"submit", "button", "image", "reset", "file"}
+# Form fields of a WIP lot row, by the class the page gives them.
+LOT_FIELD_CLASSES = ("fintype", "finpartnum", "allocqty")
+ASCII_WHITESPACE = " \t\n\r\f"
+
+
+def visible_text(raw_text):
+    """
+    Normalizes cell text the way WebElement.text reports it.
+
+    Runs of ordinary whitespace collapse to one space and are trimmed, while
+    non-breaking spaces survive as plain spaces, so an "&nbsp;" cell reads " ".
+    """
+    text = re.sub(f"[{ASCII_WHITESPACE}]+", " ", raw_text).strip(ASCII_WHITESPACE)
+    return text.replace("\xa0", " ")
+
+
+def is_hidden(style):
+    """Returns True if an inline style attribute hides the element."""
+    return "display:none" in (style or "").replace(" ", "").lower()
+
+
+class LotTracksPageParser(HTMLParser):
+    """
+    Collects the tables, links and forms of a LotTracks page in one pass over its HTML.
+
+    Attributes:
+        demand_items (list): Cells of every tr.demanditem row.
+        demand_tables (list): Cells of every td inside each table.demanddata.
+        wip_lots (list): Cells, fintype options and field names of every tr.wiplotitem row.
+        summary_rows (list): Base part anchor, partial reel cell and cells of every
+            #demandsumarydata body row.
+        links (list): Every anchor with its href, text and the classes of its list item.
+        forms (list): Every form with its action, method, fields and buttons.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.demand_items = []
+        self.demand_tables = []
+        self.wip_lots = []
+        self.summary_rows = []
+        self.links = []
+        self.forms = []
+        # Each entry: (tag, list of collectors opened by this element, hides text)
+        self.stack = []
+        self.text_collectors = []
+        self.form = None
+        self.select = None
+        self.option = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+
+        if tag in IMPLICIT_CLOSERS:
+            self.close_implicit(tag)
+        if tag == "input":
+            self.add_input(attrs, classes)
+        if tag in VOID_ELEMENTS:
+            return
+
+        opened = []
+        if tag == "table" and "demanddata" in classes:
+            self.demand_tables.append([])
+            opened.append(("table", self.demand_tables[-1]))
+        elif tag == "table" and attrs.get("id") == "demandsumarydata":
+            opened.append(("summary", None))
+        elif tag == "tr" and "demanditem" in classes:
+            self.demand_items.append([])
+            opened.append(("row", self.demand_items[-1]))
+        elif tag == "tr" and "wiplotitem" in classes:
+            self.wip_lots.append(
+                {"cells": [], "fintype_options": [], "fintype_values": {}, "fields": {}}
+            )
+            opened.append(("lot", self.wip_lots[-1]))
+        elif tag == "tr" and self.in_summary_body():
+            self.summary_rows.append({"anchor": None, "partial_reel": None, "cells": []})
+            opened.append(("summary_row", self.summary_rows[-1]))
+        elif tag in ("td", "th"):
+            cell = {"text": []}
+            opened.append(("cell", cell))
+            self.text_collectors.append(cell)
+            if tag == "td":
+                for kind, collector in self.collectors():
+                    if kind in ("table", "row"):
+                        collector.append(cell)
+                    elif kind in ("lot", "summary_row"):
+                        collector["cells"].append(cell)
+            summary_row = self.innermost("summary_row")
+            if summary_row is not None and "partreelcnt" in classes:
+                summary_row["partial_reel"] = cell
+            if summary_row is not None and "nav" in classes:
+                opened.append(("nav", None))
+        elif tag == "a":
+            anchor = {
+                "href": attrs.get("href"),
+                "text": [],
+                "li_classes": self.innermost("li") or [],
+            }
+            self.links.append(anchor)
+            self.text_collectors.append(anchor)
+            opened.append(("cell", anchor))
+            summary_row = self.innermost("summary_row")
+            if (
+                summary_row is not None
+                and summary_row["anchor"] is None
+                and self.is_open("nav")
+            ):
+                summary_row["anchor"] = anchor
+        elif tag == "li":
+            opened.append(("li", classes))
+        elif tag == "form":
+            self.form = {
+                "id": attrs.get("id"),
+                "action": attrs.get("action") or "",
+                "method": (attrs.get("method") or "get").lower(),
+                "fields": [],
+                "buttons": {},
+            }
+            self.forms.append(self.form)
+        elif tag in ("select", "textarea"):
+            self.select = {
+                "name": attrs.get("name"),
+                "id": attrs.get("id"),
+                "tag": tag,
+                "options": [],
+                "text": [],
+            }
+            self.add_field(self.select, classes)
+        elif tag == "option" and self.select is not None:
+            self.option = {
+                "value": attrs.get("value"),
+                "selected": "selected" in attrs,
+                "hidden": is_hidden(attrs.get("style")),
+                "text": [],
+            }
+            self.select["options"].append(self.option)
+
+        hides_text = tag in SKIPPED_TEXT_ELEMENTS or is_hidden(attrs.get("style"))
+        self.stack.append((tag, opened, hides_text))
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        if tag == "form":
+            self.form = None
+        if not any(open_tag == tag for open_tag, _, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, _, _ = self.stack[-1]
+            self.pop()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.option is not None:
+            self.option["text"].append(data)
+        if self.select is not None and self.select["tag"] == "textarea":
+            self.select["text"].append(data)
+            return
+        if any(hides_text for _, _, hides_text in self.stack):
+            return
+        for collector in self.text_collectors:
+            collector["text"].append(data)
+
+    def close_implicit(self, tag):
+        """Closes elements whose end tag is optional before a new sibling starts."""
+        closes, boundaries = IMPLICIT_CLOSERS[tag]
+        for index in range(len(self.stack) - 1, -1, -1):
+            open_tag = self.stack[index][0]
+            if open_tag in closes:
+                while len(self.stack) > index:
+                    self.pop()
+                return
+            if open_tag in boundaries:
+                return
+
+    def pop(self):
+        tag, opened, _ = self.stack.pop()
+        for kind, collector in opened:
+            if kind == "cell":
+                self.text_collectors.remove(collector)
+        if tag == "option":
+            self.option = None
+        elif tag in ("select", "textarea"):
+            self.select = None
+            self.option = None
+
+    def add_input(self, attrs, classes):
+        """Records an input as a form field, or as a button if it submits the form."""
+        if self.form is None or not attrs.get("name"):
+            return
+        input_type = (attrs.get("type") or "text").lower()
+        if input_type in BUTTON_INPUT_TYPES:
+            self.form["buttons"][attrs.get("id") or attrs["name"]] = (
+                attrs["name"],
+                attrs.get("value") or "",
+            )
+            return
+        if input_type in ("checkbox", "radio") and "checked" not in attrs:
+            value = None
+        elif input_type in ("checkbox", "radio"):
+            value = attrs.get("value") or "on"
+        else:
+            value = attrs.get("value") or ""
+        field = {"name": attrs["name"], "id": attrs.get("id"), "value": value}
+        if input_type in ("checkbox", "radio"):
+            field["choice"] = attrs.get("value") or "on"
+        self.add_field(field, classes)
+
+    def add_field(self, field, classes):
+        """Adds a field to the open form and to the field names of the open WIP lot row."""
+        if self.form is not None and field.get("name"):
+            self.form["fields"].append(field)
+        lot = self.innermost("lot")
+        if lot is None:
+            return
+        for field_class in LOT_FIELD_CLASSES:
+            if field_class in classes and field_class not in lot["fields"]:
+                lot["fields"][field_class] = field.get("name")
+                if field_class == "fintype":
+                    lot["fintype_field"] = field
+
+    def collectors(self):
+        for _, opened, _ in self.stack:
+            for kind, collector in opened:
+                yield kind, collector
+
+    def innermost(self, wanted):
+        """Returns the collector of the innermost open element of the wanted kind."""
+        found = None
+        for kind, collector in self.collectors():
+            if kind == wanted:
+                found = collector
+        return found
+
+    def is_open(self, wanted):
+        """Returns True if an element of the wanted kind is open."""
+        return any(kind == wanted for kind, _ in self.collectors())
+
+    def in_summary_body(self):
+        """Returns True inside the tbody of the #demandsumarydata table."""
+        in_summary = False
+        for open_tag, opened, _ in self.stack:
+            if any(kind == "summary" for kind, _ in opened):
+                in_summary = True
+            elif in_summary and open_tag == "tbody":
+                return True
+        return False
+
+
+def parse_page(html):
+    """Feeds a whole page through LotTracksPageParser and returns the parser."""
+    parser = LotTracksPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def cell_texts(cells):
+    return [visible_text("".join(cell["text"])) for cell in cells]
+
+
+def field_value(field):
+    """Returns the value a browser would submit for a form field, or None for no value."""
+    if "options" not in field:
+        return field["value"]
+    if field["tag"] == "textarea":
+        return "".join(field["text"])
+    chosen = None
+    for option in field["options"]:
+        if option["selected"] or chosen is None:
+            chosen = option
+    if chosen is None:
+        return None
+    if chosen["value"] is not None:
+        return chosen["value"]
+    return visible_text("".join(chosen["text"]))
+
+
+def option_values(field):
+    """Maps the visible text of each option of a select field to its submitted value."""
+    values = {}
+    for option in field["options"]:
+        text = visible_text("".join(option["text"]))
+        values[text] = option["value"] if option["value"] is not None else text
+    return values
+
+
+def parse_part_page(html):
+    """
+    Parses a base part page into the rows perform_allocation works with.
+
+    Args:
+        html (str): The page source of a base part demand page.
+
+    Returns:
+        dict: "demand_items" and "demand_tables" hold lists of cell texts. "wip_lots"
+            holds one dict per WIP lot with "Action", "Lot #", "Operation", "Qty" and
+            "Status" read from the row cells, plus "cells", "fintype_options" (the
+            options not hidden with display: none), "fintype_values" (option text to
+            value) and "fields" (form field name by lot field class).
+    """
+    parser = parse_page(html)
+
+    wip_lots = []
+    for lot in parser.wip_lots:
+        cells = cell_texts(lot["cells"])
+        action, lot_number, operation, *_, status, _ = cells
+        fintype_field = lot.get("fintype_field")
+        fintype_options = []
+        fintype_values = {}
+        if fintype_field is not None:
+            fintype_options = [
+                visible_text("".join(option["text"]))
+                for option in fintype_field["options"]
+                if not option["hidden"]
+            ]
+            fintype_values = option_values(fintype_field)
+        wip_lots.append(
+            {
+                "Action": action,
+                "Lot #": lot_number,
+                "Operation": operation,
+                "Qty": cells[3],
+                "Status": status,
+                "cells": cells,
+                "fintype_options": fintype_options,
+                "fintype_values": fintype_values,
+                "fields": lot["fields"],
+            }
+        )
+
+    return {
+        "demand_items": [cell_texts(row) for row in parser.demand_items],
+        "demand_tables": [cell_texts(table) for table in parser.demand_tables],
+        "wip_lots": wip_lots,
+    }
+
+
+def parse_summary_page(html):
+    """
+    Parses the demand summary page into the same rows as the summary snapshot script.
+
+    Returns:
+        list: Dicts with "base_part_num", "link", "partial_reel" and "cells" keys in
+            table order. Rows without a base part link are left out.
+    """
+    rows = []
+    for row in parse_page(html).summary_rows:
+        anchor = row["anchor"]
+        if anchor is None:
+            continue
+        partial_reel = row["partial_reel"]
+        rows.append(
+            {
+                "base_part_num": visible_text("".join(anchor["text"])),
+                "link": anchor["href"],
+                "partial_reel": visible_text("".join(partial_reel["text"])) if partial_reel else "",
+                "cells": [visible_text("".join(cell["text"])) for cell in row["cells"]],
+            }
+        )
+    return rows
+
+
+def parse_forms(html):
+    """
+    Returns the forms of a page with the values a browser would submit for them.
+
+    Returns:
+        list: Dicts with "id", "action", "method", "fields" (a list of [name, value]
+            pairs in document order, unchecked boxes and empty selects left out),
+            "field_ids" (field name by element id), "choices" (the value a radio
+            button or checkbox submits when checked, by element id) and "buttons"
+            (submit button name and value by element id).
+    """
+    forms = []
+    for form in parse_page(html).forms:
+        fields = []
+        field_ids = {}
+        choices = {}
+        for field in form["fields"]:
+            value = field_value(field)
+            if field.get("id"):
+                field_ids[field["id"]] = field["name"]
+                if "choice" in field:
+                    choices[field["id"]] = field["choice"]
+            if value is not None:
+                fields.append([field["name"], value])
+        forms.append(
+            {
+                "id": form["id"],
+                "action": form["action"],
+                "method": form["method"],
+                "fields": fields,
+                "field_ids": field_ids,
+                "choices": choices,
+                "buttons": form["buttons"],
+            }
+        )
+    return forms
+
+
+def parse_links(html):
+    """Returns every anchor of a page as dicts with "href", "text" and "li_classes" keys."""
+    return [
+        {
+            "href": link["href"],
+            "text": visible_text("".join(link["text"])),
+            "li_classes": link["li_classes"],
+        }
+        for link in parse_page(html).links
+    ]
@@ -0,0 +1,97 @@
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+import logging
+import time
+
+# Locators of the tables that mark a page as usable.
+SUMMARY_TABLE = (By.ID, "demandsumarydata")
+WIP_TABLE = (By.CSS_SELECTOR, "tr.wiplotitem")
+
+
+class PageReadiness:
+    """
+    Waits for page transitions to complete, returning as soon as the new page is usable.
+
+    A transition is complete once the old page is gone (its root element went stale, the
+    URL changed or a watched element went stale), the document is no longer loading and,
+    if given, the target element is present. Every wait logs how long it actually took.
+
+    Attributes:
+        driver (webdriver.Chrome): The WebDriver instance to watch.
+        timeout (float): Maximum seconds for each stage of a wait.
+        poll_frequency (float): Seconds between checks.
+    """
+
+    def __init__(self, driver, timeout=10, poll_frequency=0.1):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+
+    def until(self, condition):
+        return WebDriverWait(
+            self.driver, self.timeout, poll_frequency=self.poll_frequency
+        ).until(condition)
+
+    def wait_for_navigation(
+        self, action, target=None, stale_element=None, label="page", require_change=False
+    ):
+        """
+        Performs an action that leaves the current page and waits until the next one is usable.
+
+        Args:
+            action (callable): Triggers the transition, e.g. a button's click method.
+            target (tuple): Locator of an element that must be present on the new page.
+            stale_element (WebElement): An element that is replaced when the page is
+                re-rendered in place, for transitions that keep the document and URL.
+            label (str): Name of the transition in the log.
+            require_change (bool): Raise if the page did not change, instead of only
+                logging it, for actions whose effect must be confirmed by a reload.
+
+        Returns:
+            float: Seconds the transition took.
+
+        Raises:
+            TimeoutException: If the document does not finish loading or the target
+                does not appear within the timeout, or with require_change if the page
+                did not change.
+        """
+        old_url = self.driver.current_url
+        old_root = self.driver.find_element(By.TAG_NAME, "html")
+        start = time.monotonic()
+
+        action()
+
+        def page_left(driver):
+            if driver.current_url != old_url or EC.staleness_of(old_root)(driver):
+                return True
+            return stale_element is not None and EC.staleness_of(stale_element)(driver)
+
+        try:
+            self.until(page_left)
+        except TimeoutException:
+            logging.warning(f"{label}: page did not change within {self.timeout}s.")
+            if require_change:
+                raise
+
+        self.wait_for_ready(target)
+        elapsed = time.monotonic() - start
+        logging.info(f"{label} ready after {elapsed:.3f}s")
+        return elapsed
+
+    def wait_for_ready(self, target=None):
+        """
+        Waits until the document is no longer loading and the target element is present.
+        """
+
+        def document_ready(driver):
+            try:
+                return driver.execute_script("return document.readyState") != "loading"
+            except StaleElementReferenceException:
+                return False
+
+        self.until(document_ready)
+        if target is not None:
+            self.until(EC.presence_of_element_located(target))
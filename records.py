@@ -0,0 +1,193 @@
+from collections import deque
+from typing import NamedTuple
+
+
+def week_ordinal(bsd):
+    """
+    Converts a BSD week key such as "W49'23" to a sortable integer, year * 100 + week.
+    """
+    week, year = bsd.split("'")
+    return int(year) * 100 + int(week[1:])
+
+
+class Demand(NamedTuple):
+    """
+    One weekly demand line of a finish part number, as read from a demand table.
+
+    Attributes:
+        bsd (str): The BSD week key, e.g. "W49'23".
+        week (int): The BSD as a sortable week ordinal, see week_ordinal.
+        finish_process (str): e.g. "TAPEREEL" or "LEADSCAN".
+        finish_type (str): "STD" or "CUST".
+        remaining_balance (int): Units still to be allocated.
+        finish_part_num (str): The finish part number.
+        std_qty (int): Units per reel, 0 if the table has none.
+    """
+
+    bsd: str
+    week: int
+    finish_process: str
+    finish_type: str
+    remaining_balance: int
+    finish_part_num: str
+    std_qty: int
+
+
+class Allocation(NamedTuple):
+    """
+    Units of a WIP lot allocated to one demand line.
+
+    Attributes:
+        bsd (str): The BSD week key of the demand line.
+        finish_part_num (str): The finish part number.
+        finish_process (str): The finish process of the part.
+        allocated_qty (int): Units allocated.
+        std_qty (float): Reel size the allocation is rounded to, including the MAXCIM allowance.
+        finish_type (str): "STD" or "CUST".
+    """
+
+    bsd: str
+    finish_part_num: str
+    finish_process: str
+    allocated_qty: int
+    std_qty: float
+    finish_type: str
+
+
+class DemandHeader:
+    """
+    A finish part header row of a demand table, filled in as its cells stream by.
+
+    Attributes:
+        start (int): Index of the "-" cell that opens the header.
+        fields (dict): Cell text by offset from start, for the offsets read by a demand line.
+        unconfirmed (list): W cells seen while the header is open. They belong to the
+            previous header's demand lines only if this header is never closed.
+    """
+
+    # Offsets from the "-" cell of the finish part number, finish process, STD_QTY and finish type
+    FIELD_OFFSETS = (2, 4, 5, 10)
+
+    def __init__(self, start):
+        self.start = start
+        self.fields = {}
+        self.unconfirmed = []
+
+    def complete(self):
+        return 10 in self.fields
+
+
+class DemandLine:
+    """
+    A W cell of a demand section, waiting for its balance cell and header fields.
+    """
+
+    def __init__(self, index, bsd, header):
+        self.index = index
+        self.bsd = bsd
+        self.header = header
+        self.balance = None
+        self.confirmed = False
+
+    def ready(self):
+        return self.confirmed and self.balance is not None and self.header.complete()
+
+    def record(self):
+        fields = self.header.fields
+        try:
+            std_qty = int(fields[5].replace(",", ""))
+        except ValueError:
+            std_qty = 0
+        return Demand(
+            bsd=self.bsd,
+            week=week_ordinal(self.bsd),
+            finish_process=fields[4],
+            finish_type=fields[10],
+            remaining_balance=int(self.balance.replace(",", "")),
+            finish_part_num=fields[2],
+            std_qty=std_qty,
+        )
+
+
+def iter_demand_records(cells):
+    """
+    Yields the demand lines of a demand table's cell texts in one pass.
+
+    A header row opens with a "-" cell and is closed by the next " " cell. The cells
+    after it, up to the next header, are its demand section: every cell containing "W"
+    there is a BSD whose remaining balance is three cells later. The cell just before
+    the next header and the last cell of the table are not read as BSDs. A header that
+    is never closed is read as part of the previous demand section.
+
+    Only the open header and the lines still waiting for a later cell are kept, so
+    memory does not grow with the size of the table.
+
+    Args:
+        cells (iterable): Cell texts of the table, in document order.
+
+    Yields:
+        Demand: One record per demand line, in table order.
+
+    Raises:
+        IndexError: If the table ends before a cell a header or demand line refers to,
+            or right after a header.
+        ValueError: If a remaining balance is not a number.
+    """
+    header = None  # ~ HEADER WHOSE DEMAND SECTION IS BEING READ
+    opening = None  # ~ HEADER WHOSE " " CELL HAS NOT BEEN SEEN YET
+    closed = []  # ~ HEADERS THAT STILL MISS THEIR FINISH PROCESS CELL
+    waiting = {}  # ~ CELL INDEX -> (HEADER OFFSET OR None FOR A BALANCE, HEADER OR LINE)
+    pending = deque()  # ~ DEMAND LINES IN TABLE ORDER, NOT YET YIELDED
+    close_index = None
+    index = -1
+
+    for index, cell in enumerate(cells):
+        for offset, target in waiting.pop(index, ()):
+            if offset is None:
+                target.balance = cell
+            else:
+                target.fields[offset] = cell
+
+        if opening is None and cell == "-":
+            opening = DemandHeader(index)
+            for offset in DemandHeader.FIELD_OFFSETS:
+                waiting.setdefault(index + offset, []).append((offset, opening))
+            # ~ A W CELL RIGHT BEFORE A HEADER IS NOT A DEMAND LINE, UNLESS THE HEADER NEVER CLOSES
+            if pending and not pending[-1].confirmed and pending[-1].index == index - 1:
+                opening.unconfirmed.append(pending[-1])
+        elif opening is not None and cell == " ":
+            for line in opening.unconfirmed:
+                pending.remove(line)
+            header = opening
+            opening = None
+            close_index = index
+            if 4 not in header.fields:
+                closed.append(header)
+        elif header is not None:
+            if opening is None and pending and not pending[-1].confirmed:
+                pending[-1].confirmed = True
+            if "W" in cell:
+                line = DemandLine(index, cell, header)
+                waiting.setdefault(index + 3, []).append((None, line))
+                pending.append(line)
+                if opening is not None:
+                    opening.unconfirmed.append(line)
+
+        while pending and pending[0].balance is not None and pending[0].ready():
+            yield pending.popleft().record()
+
+    last_index = index
+    if opening is not None:
+        for line in opening.unconfirmed:
+            line.confirmed = line.index != last_index
+    if pending and not pending[-1].confirmed:
+        pending.pop()
+
+    if header is not None and close_index == last_index:
+        raise IndexError("Demand table ends right after a header.")
+    if any(4 not in item.fields for item in closed):
+        raise IndexError("Demand table ends inside a header.")
+    for line in pending:
+        if not line.ready():
+            raise IndexError(f"Demand table ends before the balance of {line.bsd}.")
+        yield line.record()
@@ -0,0 +1,105 @@
+from selenium.common.exceptions import (
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+import logging
+import random
+import time
+
+import requests
+
+# Error classes. Stale elements, timeouts and server errors usually pass on a second
+# try; parse errors and anything unknown come back the same way, so they are not retried.
+STALE = "stale element"
+TIMEOUT = "timeout"
+SERVER = "server error"
+PARSE = "parse error"
+UNKNOWN = "unknown"
+TRANSIENT_ERRORS = {STALE, TIMEOUT, SERVER}
+
+# Chrome's net:: error names of a page that could not be loaded, e.g. net::ERR_CONNECTION_RESET.
+NETWORK_ERROR_MARKERS = ("net::ERR_", "ERR_CONNECTION", "ERR_TIMED_OUT")
+
+
+def classify_error(error):
+    """
+    Sorts an exception of an allocation step into one of the error classes.
+    """
+    if isinstance(error, StaleElementReferenceException):
+        return STALE
+    if isinstance(error, (TimeoutException, requests.Timeout, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 500
+        return SERVER if status >= 500 or status == 429 else UNKNOWN
+    if isinstance(error, requests.ConnectionError):
+        return SERVER
+    if isinstance(error, WebDriverException):
+        if any(marker in str(error.msg) for marker in NETWORK_ERROR_MARKERS):
+            return SERVER
+        return UNKNOWN
+    if isinstance(error, (ValueError, IndexError, KeyError)):
+        return PARSE
+    return UNKNOWN
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with jittered exponential backoff.
+
+    The n-th retry waits a random time between 0 and base_delay * 2 ** (n - 1) seconds,
+    capped at max_delay ("full jitter"), so workers that failed together do not retry
+    together. Permanent errors are raised right away.
+
+    Attributes:
+        max_attempts (int): Attempts in total, the first one included.
+        base_delay (float): Upper bound of the first wait, in seconds.
+        max_delay (float): Upper bound of any wait, in seconds.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """
+        Returns the seconds to wait after the given failed attempt, counted from 1.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def backoff(self, attempt):
+        time.sleep(self.delay(attempt))
+
+    def run(self, action, label, recover=None):
+        """
+        Calls action until it succeeds, the error is permanent or the attempts run out.
+
+        Args:
+            action (callable): The step to run, without arguments.
+            label (str): What the step works on, for the log.
+            recover (callable): Called before every retry, e.g. to get back to a known page.
+
+        Returns:
+            The return value of action.
+
+        Raises:
+            Exception: The last error of action.
+        """
+        attempt = 1
+        while True:
+            try:
+                return action()
+            except Exception as error:
+                kind = classify_error(error)
+                if kind not in TRANSIENT_ERRORS or attempt >= self.max_attempts:
+                    raise
+                logging.warning(
+                    f"{label}: {kind} on attempt {attempt} of {self.max_attempts}, retrying: {error}"
+                )
+                self.backoff(attempt)
+                attempt += 1
+                if recover is not None:
+                    recover()
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+import config
+
+
+def solution_key(**inputs):
+    """
+    Returns a canonical hash of split_score inputs.
+
+    Numbers are normalized to floats, so 1000 and 1000.0 give the same key, and the
+    keys are sorted so the argument order does not matter.
+    """
+
+    def normalize(item):
+        if isinstance(item, (list, tuple)):
+            return [normalize(element) for element in item]
+        if isinstance(item, (int, float)) and not isinstance(item, bool):
+            return float(item)
+        return item
+
+    canonical = json.dumps(
+        {name: normalize(item) for name, item in inputs.items()},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    """
+    Bounded LRU cache of split_score solutions with an optional sqlite store.
+
+    Entries evicted from memory stay in the sqlite file, which also survives restarts,
+    so a miss in memory falls back to a lookup on disk before the solver has to run.
+
+    Attributes:
+        max_entries (int): Number of solutions kept in memory.
+        path (str): sqlite file of the persistent store, or None for memory only.
+        hits (int): Lookups answered from memory or disk.
+        misses (int): Lookups that found no solution.
+    """
+
+    def __init__(self, max_entries=1024, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT)"
+            )
+            self.connection.commit()
+
+    def get(self, key):
+        """
+        Returns the cached solution of a key, or None.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+            solution = None
+            if self.connection is not None:
+                row = self.connection.execute(
+                    "SELECT solution FROM solutions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    solution = json.loads(row[0])
+                    self.remember(key, solution)
+
+            if solution is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return solution
+
+    def put(self, key, solution):
+        """
+        Stores a JSON serializable solution in memory and, if configured, on disk.
+        """
+        with self.lock:
+            self.remember(key, solution)
+            if self.connection is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO solutions (key, solution) VALUES (?, ?)",
+                    (key, json.dumps(solution)),
+                )
+                self.connection.commit()
+
+    def remember(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns the hit and miss counters and the number of solutions in memory.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+    def close(self):
+        logging.info(f"Solution cache: {self.stats()}")
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    Returns the process-wide cache built from config, or None if caching is disabled.
+    """
+    global _default_cache
+    if config.SOLUTION_CACHE_SIZE <= 0:
+        return None
+    if _default_cache is None:
+        _default_cache = SolutionCache(config.SOLUTION_CACHE_SIZE, config.SOLUTION_CACHE_FILE)
+    return _default_cache
+
+
+def close_default_cache():
+    """
+    Logs the statistics of the process-wide cache and closes its sqlite store, if it was created.
+
+    A later default_cache() call opens a new one.
+    """
+    global _default_cache
+    if _default_cache is not None:
+        _default_cache.close()
+        _default_cache = None
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+# ~ KEEP TEST RUNS OUT OF THE FILES THE REAL BOT USES
+config.LOG_FILE = os.path.join(tempfile.gettempdir(), "astrobot-tests.log")
+config.LOG_CONSOLE = False
+config.COOKIE_STORE = None
+config.JOURNAL_FILE = None
+config.FINGERPRINT_FILE = None
+config.SOLUTION_CACHE_FILE = None
+config.METRICS_FILE = None
@@ -0,0 +1,71 @@
+import pytest
+
+from records import Demand, week_ordinal
+from webactions import WebActions
+
+
+@pytest.fixture
+def allocator():
+    # ~ THE ALLOCATION MATH NEVER TOUCHES THE BROWSER
+    return WebActions.__new__(WebActions)
+
+
+def demand(bsd, part, balance, process="TAPEREEL", std_qty=1000, finish_type="STD"):
+    return Demand(bsd, week_ordinal(bsd), process, finish_type, balance, part, std_qty)
+
+
+def quantities(lot_sums):
+    return [{part: details[0] for part, details in sums_by_part.items()} for sums_by_part in lot_sums]
+
+
+def test_demand_is_depleted_across_lots(allocator):
+    demands = allocator.sort_demands([demand("W02'24", "A", 2000), demand("W01'24", "A", 3000)])
+
+    lot_sums = allocator.allocate_lots([4000, 4000], demands, "COMETS")
+    assert quantities(lot_sums) == [{"A": 4000}, {"A": 1000}]
+
+    # ~ EVERY LOT ON ITS OWN WOULD COVER THE SAME BSDS AGAIN
+    per_lot = [allocator.allocate_supply(lot_qty, demands, "COMETS") for lot_qty in (4000, 4000)]
+    assert quantities(per_lot) == [{"A": 4000}, {"A": 4000}]
+
+
+def test_later_lots_take_the_rounded_reel_quantity(allocator):
+    demands = allocator.sort_demands(
+        [demand("W01'24", "A", 2500), demand("W01'24", "B", 1000, process="LEADSCAN", std_qty=0)]
+    )
+
+    lot_sums = allocator.allocate_lots([5000, 3000], demands, "COMETS")
+    # ~ A IS ROUNDED DOWN TO WHOLE REELS, ITS SURPLUS GOES TO THE LEADSCAN PART
+    assert quantities(lot_sums) == [{"A": 2000, "B": 1500}, {"A": 500}]
+
+
+def test_lots_after_all_demand_is_covered_get_nothing(allocator):
+    demands = [demand("W01'24", "A", 1000, process="LEADSCAN", std_qty=0)]
+
+    lot_sums = allocator.allocate_lots([3000, 2000], demands, "COMETS")
+    assert quantities(lot_sums) == [{"A": 1000}, {}]
+    assert allocator.plan_lot(lot_sums[1], ["Full LS"], "COMETS")["error"] == "Nothing to allocate"
+
+
+@pytest.mark.parametrize("product", ["COMETS", "MAXCIM"])
+@pytest.mark.parametrize(
+    "demands, lot_qty",
+    [
+        ([demand("W01'24", "A", 3000), demand("W02'24", "A", 2000)], 4000),
+        ([demand("W01'24", "A", 2500), demand("W01'24", "B", 1000, process="LEADSCAN", std_qty=0)], 5000),
+        ([demand("W01'24", "A", 2500), demand("W03'24", "B", 7000, process="PACKLABEL", std_qty=2500)], 6200),
+        ([demand("W01'24", "A", 800, finish_type="CUST")], 10000),
+    ],
+)
+def test_single_lot_matches_the_per_lot_path(allocator, demands, lot_qty, product):
+    demands = allocator.sort_demands(demands)
+    assert allocator.allocate_lots([lot_qty], demands, product) == [
+        allocator.allocate_supply(lot_qty, demands, product)
+    ]
+
+
+def test_deplete_demands_takes_parts_in_bsd_order(allocator):
+    demands = [demand("W01'24", "A", 1000), demand("W02'24", "A", 1000), demand("W01'24", "B", 500)]
+    # ~ MAXCIM QUANTITIES CARRY THE REEL ALLOWANCE, SO A FRACTION USES UP A WHOLE UNIT
+    remaining = allocator.deplete_demands(demands, {"A": [1499.2, "TAPEREEL", "STD"]})
+    assert remaining == [demand("W02'24", "A", 500), demand("W01'24", "B", 500)]
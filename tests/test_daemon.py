@@ -0,0 +1,117 @@
+import signal
+
+import pytest
+
+import config
+import daemon
+from daemon import AllocationDaemon, IntervalSchedule
+from fingerprints import FingerprintStore
+from metrics import Metrics
+from webactions import WebActions
+
+
+class FakeSession:
+    """
+    Stands in for the WebActions session the daemon keeps warm.
+    """
+
+    def __init__(self):
+        self.metrics = Metrics()
+        self.fingerprints = FingerprintStore(None)
+        self.closed = False
+
+    def perform_allocation(self, *args, **kwargs):
+        return {"pending_lots": []}
+
+    def report_metrics(self):
+        pass
+
+    def cleanup(self):
+        self.closed = True
+
+
+@pytest.fixture
+def allocation_daemon(monkeypatch):
+    monkeypatch.setattr(config, "NUM_WORKERS", 1)
+    monkeypatch.setattr(config, "BACKEND", "selenium")
+    # ~ run() INSTALLS SIGNAL HANDLERS, KEEP PYTEST'S OWN
+    monkeypatch.setattr(daemon.signal, "signal", lambda signum, handler: None)
+    return AllocationDaemon(IntervalSchedule(0.001))
+
+
+def session_factory(monkeypatch, failures):
+    """
+    Makes the daemon's sessions fail to start on the given attempts, counted from 1.
+    """
+    sessions = []
+
+    def start_session():
+        sessions.append(None)
+        if len(sessions) in failures:
+            raise RuntimeError("Chrome failed to start")
+        sessions[-1] = FakeSession()
+        return sessions[-1]
+
+    monkeypatch.setattr(daemon, "WebActions", start_session)
+    return sessions
+
+
+def test_failed_start_is_retried_on_the_next_cycle(allocation_daemon, monkeypatch):
+    sessions = session_factory(monkeypatch, failures={1})
+    cycles = []
+
+    def run_session(web_actions):
+        cycles.append(web_actions)
+        allocation_daemon.stop_event.set()
+
+    monkeypatch.setattr(daemon, "run_session", run_session)
+    allocation_daemon.run()
+
+    assert len(sessions) == 2
+    assert cycles == [sessions[1]]
+    assert sessions[1].closed
+
+
+def test_failed_restart_after_a_failed_cycle_keeps_the_daemon_running(allocation_daemon, monkeypatch):
+    sessions = session_factory(monkeypatch, failures={2})
+    cycles = []
+
+    def run_session(web_actions):
+        cycles.append(web_actions)
+        if len(cycles) == 1:
+            raise RuntimeError("chromedriver died")
+        allocation_daemon.stop_event.set()
+
+    monkeypatch.setattr(daemon, "run_session", run_session)
+    allocation_daemon.run()
+
+    assert len(sessions) == 3
+    assert cycles == [sessions[0], sessions[2]]
+    assert sessions[0].closed and sessions[2].closed
+
+
+def test_stop_waits_for_the_planned_base_part_being_written(allocation_daemon, monkeypatch):
+    web_actions = WebActions.__new__(WebActions)
+    web_actions._init_state("https://lottracks.test/")
+    web_actions.cleanup = lambda: None
+    web_actions.report_metrics = lambda: None
+    web_actions.load_part_page = lambda link: {"wip_lots": []}
+    written = []
+
+    def apply_plan(plan, page):
+        # ~ SIGTERM ARRIVES BETWEEN THE SAVE AND ITS JOURNAL ENTRY
+        written.append(plan["base_part_num"])
+        allocation_daemon.handle_signal(signal.SIGTERM, None)
+        return []
+
+    web_actions.apply_plan = apply_plan
+    monkeypatch.setattr(daemon, "WebActions", lambda: web_actions)
+    plans = [
+        {"product": "COMETS", "base_part_num": base_part_num, "link": base_part_num, "lots": [{"lot_number": "L1"}]}
+        for base_part_num in ("BP1", "BP2")
+    ]
+    monkeypatch.setattr(daemon, "run_session", lambda session: session.apply_run(plans))
+    allocation_daemon.run()
+
+    assert written == ["BP1"]
+    assert web_actions.journal.has_base_part("COMETS", "BP1")
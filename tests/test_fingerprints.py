@@ -0,0 +1,69 @@
+from fingerprints import FingerprintStore, combined_fingerprint, row_fingerprint
+
+
+def row(base_part_num, *cells):
+    return {"base_part_num": base_part_num, "cells": [base_part_num, *cells]}
+
+
+def test_combined_fingerprint_ignores_row_order():
+    first, second = row_fingerprint(row("BP1", "100")), row_fingerprint(row("BP1", "200"))
+    assert combined_fingerprint([first]) == first
+    assert combined_fingerprint([first, second]) == combined_fingerprint([second, first])
+    assert combined_fingerprint([first, second]) not in (first, second)
+
+
+def test_only_changed_or_pending_rows_are_visited(tmp_path):
+    path = str(tmp_path / "fingerprints.json")
+    store = FingerprintStore(path)
+    store.observe("COMETS", [row("BP1", "100"), row("BP2", "200")])
+    store.record("COMETS", "BP1", pending=False)
+    store.record("COMETS", "BP2", pending=True)
+    store.save()
+
+    reloaded = FingerprintStore(path)
+    assert not reloaded.should_visit("COMETS", row("BP1", "100"))
+    assert reloaded.should_visit("COMETS", row("BP2", "200"))
+    assert FingerprintStore(path).should_visit("COMETS", row("BP1", "150"))
+    assert FingerprintStore(path).should_visit("MAXCIM", row("BP1", "100"))
+    assert FingerprintStore(path).should_visit("COMETS", row("BP3", "100"))
+
+
+def test_a_change_in_any_row_of_a_base_part_is_seen(tmp_path):
+    path = str(tmp_path / "fingerprints.json")
+    store = FingerprintStore(path)
+    store.observe("COMETS", [row("BP1", "100"), row("BP1", "200")])
+    store.record("COMETS", "BP1", pending=False)
+    store.save()
+
+    unchanged = FingerprintStore(path)
+    unchanged.observe("COMETS", [row("BP1", "200"), row("BP1", "100")])
+    assert not unchanged.should_visit("COMETS", row("BP1", "200"))
+
+    changed = FingerprintStore(path)
+    changed.observe("COMETS", [row("BP1", "100"), row("BP1", "250")])
+    assert changed.should_visit("COMETS", row("BP1", "100"))
+
+
+def test_unobserved_base_part_is_not_recorded(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.json"))
+    store.record("COMETS", "BP1", pending=False)
+    assert store.rows == {}
+
+
+def test_force_full_scan_visits_but_still_records(tmp_path):
+    path = str(tmp_path / "fingerprints.json")
+    store = FingerprintStore(path, force_full_scan=True)
+    assert store.should_visit("COMETS", row("BP1", "100"))
+    store.record("COMETS", "BP1", pending=False)
+    store.save()
+    assert not FingerprintStore(path).should_visit("COMETS", row("BP1", "100"))
+
+
+def test_read_only_store_never_writes(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    store = FingerprintStore(str(path), read_only=True)
+    store.observe("COMETS", [row("BP1", "100")])
+    store.record("COMETS", "BP1", pending=False)
+    store.save()
+    assert store.rows == {}
+    assert not path.exists()
@@ -0,0 +1,187 @@
+from selenium.common.exceptions import TimeoutException
+
+import os
+
+import pytest
+
+import config
+from journal import Journal
+from webactions import WebActions, run_session
+from worker_pool import record_results
+
+LINK = "https://lottracks.test/?q=tciat/withdemand/basepart/BP1"
+
+
+@pytest.fixture
+def journal_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.jsonl")
+    monkeypatch.setattr(config, "JOURNAL_FILE", path)
+    monkeypatch.setattr(config, "DRY_RUN", False)
+    return path
+
+
+def test_entries_survive_a_reload(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.record_lot("COMETS", "BP1", "L1")
+    journal.record_base_part("COMETS", "BP1")
+    journal.record_lot("MAXCIM", "BP2", "L7")
+
+    reloaded = Journal(path)
+    assert reloaded.has_base_part("COMETS", "BP1")
+    assert reloaded.has_lot("COMETS", "BP1", "L1")
+    assert reloaded.has_lot("MAXCIM", "BP2", "L7")
+    assert not reloaded.has_base_part("MAXCIM", "BP2")
+    assert not reloaded.has_lot("COMETS", "BP1", "L7")
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    Journal(path).record_lot("COMETS", "BP1", "L1")
+    with open(path, "a") as journal_file:
+        journal_file.write('{"event": "base_part", "product": "COM')
+
+    reloaded = Journal(path)
+    assert reloaded.has_lot("COMETS", "BP1", "L1")
+    assert not reloaded.has_base_part("COMETS", "BP1")
+
+    # ~ THE NEXT APPEND STARTS ON A LINE OF ITS OWN
+    reloaded.record_base_part("COMETS", "BP1")
+    assert Journal(path).has_base_part("COMETS", "BP1")
+    with open(path) as journal_file:
+        assert len(journal_file.read().splitlines()) == 2
+
+
+def test_clear_deletes_the_file(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.record_lot("COMETS", "BP1", "L1")
+    journal.record_base_part("COMETS", "BP1")
+
+    journal.clear()
+    assert not os.path.exists(path)
+    assert not journal.has_lot("COMETS", "BP1", "L1")
+    assert not journal.has_base_part("COMETS", "BP1")
+    assert not Journal(path).has_base_part("COMETS", "BP1")
+
+
+def test_without_a_path_nothing_is_written(tmp_path):
+    journal = Journal(None)
+    journal.record_base_part("COMETS", "BP1")
+    assert journal.has_base_part("COMETS", "BP1")
+    journal.clear()
+    assert list(tmp_path.iterdir()) == []
+
+
+def offline_actions(save_error=None):
+    """
+    Returns a WebActions without a browser whose page reads and saves are canned.
+    """
+    web_actions = WebActions.__new__(WebActions)
+    web_actions._init_state("https://lottracks.test/")
+    web_actions.product = "COMETS"
+    web_actions.visited = []
+    page = {"wip_lots": [{"Lot #": "L1", "Action": "", "Status": ""}]}
+
+    def load_part_page(link):
+        web_actions.visited.append(link)
+        return page
+
+    def save_allocation():
+        if save_error is not None:
+            raise save_error
+
+    web_actions.load_part_page = load_part_page
+    web_actions.plan_allocation = lambda page, base_part_num, product: {
+        "product": product,
+        "base_part_num": base_part_num,
+        "save_per_lot": True,
+        "lots": [{"lot_number": "L1"}],
+    }
+    web_actions.apply_lot_plan = lambda lot_plan: None
+    web_actions.save_allocation = save_allocation
+    return web_actions
+
+
+def test_unconfirmed_save_is_revisited_on_resume(journal_file):
+    interrupted = offline_actions(save_error=TimeoutException("page did not reload"))
+    plan = interrupted.perform_allocation(LINK, "BP1", "COMETS", return_after=False)
+    assert plan["pending_lots"] == ["L1"]
+
+    resumed = offline_actions()
+    assert not resumed.journal.has_base_part("COMETS", "BP1")
+    assert not resumed.journal.has_lot("COMETS", "BP1", "L1")
+    row = {"base_part_num": "BP1", "link": LINK, "partial_reel": "", "cells": ["BP1", "5,000", ""]}
+    assert resumed.allocatable_rows([row]) == [row]
+
+    plan = resumed.perform_allocation(LINK, "BP1", "COMETS", return_after=False)
+    assert resumed.visited == [LINK]
+    assert plan["pending_lots"] == []
+    assert offline_actions().journal.has_base_part("COMETS", "BP1")
+
+
+def test_confirmed_base_part_is_skipped_on_resume(journal_file):
+    offline_actions().perform_allocation(LINK, "BP1", "COMETS", return_after=False)
+
+    resumed = offline_actions()
+    row = {"base_part_num": "BP1", "link": LINK, "partial_reel": "", "cells": ["BP1", "5,000", ""]}
+    assert resumed.allocatable_rows([row]) == []
+
+
+def finish_run(web_actions, failing=()):
+    """
+    Runs run_session with the navigation stubbed; the base parts in failing end on the retry queue.
+    """
+    web_actions.ensure_login = lambda: None
+    web_actions.navigate_to_demand_summary_page = lambda: None
+
+    def navigate_each_customer_demand():
+        for base_part_num in ("BP1", "BP2"):
+            if base_part_num in failing:
+                web_actions.retry_queue.append(
+                    {"product": "COMETS", "base_part_num": base_part_num, "link": LINK}
+                )
+            else:
+                web_actions.journal.record_base_part("COMETS", base_part_num)
+
+    web_actions.navigate_each_customer_demand = navigate_each_customer_demand
+    run_session(web_actions)
+
+
+def test_finished_run_clears_the_journal(journal_file, monkeypatch):
+    monkeypatch.setattr(config, "PLAN_FIRST", False)
+    finish_run(offline_actions())
+    assert not os.path.exists(journal_file)
+
+
+def test_run_with_failures_keeps_the_journal(journal_file, monkeypatch):
+    monkeypatch.setattr(config, "PLAN_FIRST", False)
+    finish_run(offline_actions(), failing=("BP2",))
+    resumed = offline_actions()
+    assert resumed.journal.has_base_part("COMETS", "BP1")
+    assert not resumed.journal.has_base_part("COMETS", "BP2")
+
+
+def test_dry_run_keeps_the_journal_of_an_interrupted_run(journal_file, monkeypatch):
+    offline_actions().journal.record_base_part("COMETS", "BP1")
+    monkeypatch.setattr(config, "DRY_RUN", True)
+    web_actions = offline_actions()
+    web_actions.ensure_login = lambda: None
+    web_actions.navigate_to_demand_summary_page = lambda: None
+    web_actions.run_planned = lambda: []
+    run_session(web_actions)
+    assert offline_actions().journal.has_base_part("COMETS", "BP1")
+
+
+def test_pool_keeps_the_journal_after_transient_failures(journal_file):
+    coordinator = offline_actions()
+    coordinator.journal.record_base_part("COMETS", "BP1")
+    results = [
+        {"product": "COMETS", "base_part_num": "BP1", "error": None, "transient": False, "pending": False},
+        {"product": "COMETS", "base_part_num": "BP2", "error": "TimeoutException: ", "transient": True, "pending": True},
+    ]
+    record_results(coordinator, results)
+    assert os.path.exists(journal_file)
+
+    record_results(coordinator, results[:1])
+    assert not os.path.exists(journal_file)
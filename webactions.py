@@ -1,1459 +1,1681 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.options import Options
-# from calculations import Calculations
-from selenium.webdriver.support.ui import Select
-# from utilities import current_work_week, parse_week_codes
-from selenium.webdriver.chrome.service import Service as ChromeService
-from collections import Counter
-from math import ceil
-
-import logging
-import config
-import time
-import platform
-
-logging.basicConfig(
-    filename="session.log",
-    level=logging.INFO,
-    format="%(asctime)s - [%(levelname)s] - %(module)s - %(message)s",
-)
-
-
-
-class WebActions:
-    """
-    A class used to perform web actions using Selenium.
-
-    This class encapsulates methods for web interactions such as navigating,
-    logging in, and interacting with web elements. It is configured to use headless Chrome.
-
-    Attributes:
-        driver (webdriver.Chrome): The Chrome WebDriver instance for browser interactions.
-        url (str): URL for the web application to interact with.
-        username (str): Username for login.
-        password (str): Password for login.
-        wait (WebDriverWait): WebDriverWait instance for managing explicit waits.
-        product_type (dict): Mapping of product types for use in interactions.
-    """
-
-    def __init__(self):
-        """
-        Initializes the WebActions with configured credentials and sets up the headless Chrome driver.
-
-        The method sets up logging and initializes the Chrome WebDriver with the necessary options
-        for running in headless mode. It also configures the credentials and URL based on the DEBUG
-        setting in the config module.
-        """
-
-        if platform.system() == "Linux":
-            print("Linux")
-            logging.info(f"Running at {platform.system()}.")
-            self.driver_location = "/usr/bin/chromedriver"
-            self.binary_location = "/usr/bin/google-chrome"
-            chrome_service = ChromeService(executable_path=self.driver_location)
-
-            if config.HEADLESS:
-                # Set Chrome options for headless mode
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument("--disable-gpu")
-                chrome_options.binary_location = self.binary_location
-                # Set up the Chrome service with the path to the ChromeDriver
-                chrome_service = ChromeService(executable_path=self.driver_location)
-                self.driver = webdriver.Chrome(
-                    service=chrome_service, options=chrome_options
-                )
-            else:
-                self.driver = webdriver.Chrome()
-        elif platform.system() == "Windows":
-            print("Windows")
-            logging.info(f"Running at {platform.system()}.")
-            if config.HEADLESS:
-                # Set Chrome options for headless mode
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument("--disable-gpu")
-                self.driver = webdriver.Chrome(options=chrome_options)
-            else:
-                self.driver = webdriver.Chrome()
-
-        if config.DEBUG:
-            self.url = config.DEV_CREDENTIALS["url"]
-            self.username = config.DEV_CREDENTIALS["username"]
-            self.password = config.DEV_CREDENTIALS["password"]
-        else:
-            self.url = config.PROD_CREDENTIALS["url"]
-            self.username = config.PROD_CREDENTIALS["username"]
-            self.password = config.PROD_CREDENTIALS["password"]
-
-        self.wait = WebDriverWait(self.driver, 10)
-        self.product_type = {
-            "COMETS": "edit-producttype-C",
-            "MAXCIM": "edit-producttype-M",
-        }
-        self.allocation_counter = 0
-        logging.info(f"{self.__class__.__name__} initialized")
-
-    def login(self):
-        """
-        Handles the login process on the website using configured credentials.
-
-        Navigates to the login page, inputs credentials, and submits the login form.
-        Uses WebDriverWait to ensure elements are clickable or present before interaction.
-
-        Raises:
-            TimeoutException: If an expected condition is not met during login.
-        """
-
-        logging.info(f"{self.__class__.__name__}.login method called")
-        self.driver.get(self.url)
-
-        self.wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "li.menu-658.first.last> a"))
-        ).click()
-        self.wait.until(EC.presence_of_element_located((By.ID, "edit-name"))).send_keys(
-            self.username
-        )
-        self.wait.until(EC.presence_of_element_located((By.ID, "edit-pass"))).send_keys(
-            self.password
-        )
-        self.wait.until(EC.presence_of_element_located((By.ID, "edit-submit"))).click()
-        print("login")
-
-    def navigate_to_demand_summary_page(self):
-        """
-        Navigates to the demand summary page by interacting with the menu elements.
-
-        Depending on the environment (development or production), the method selects the appropriate
-        menu elements to navigate to the demand summary page.
-        """
-        logging.info("Navigating to the demand summary page.")
-
-        if config.DEBUG:
-            menu_element = config.MENU_ELEMENT_DEV
-            demand_element = config.DEMAND_ELEMENT_DEV
-        else:
-            menu_element = config.MENU_ELEMENT_PROD
-            demand_element = config.DEMAND_ELEMENT_PROD
-
-        logging.debug(
-            "check_page_navigation elemtents with menu_element: %s, demand_element: %s",
-            menu_element,
-            demand_element,
-        )
-
-        parent_menu = self.wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, menu_element))
-        )
-        actions = ActionChains(self.driver)
-        actions.move_to_element(parent_menu).perform()
-
-        demand_summary = self.wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, demand_element))
-        )
-        demand_summary.click()
-        print("Navigating")
-
-    def navigate_each_customer_demand(self):
-        """
-        Handle radio button interactions on the webpage for faster processing.
-        """
-        for product in self.product_type:
-            # CLICK WHICH PRODUCT : COMETS OR MAXCIM
-            self.product = product
-            radio_button = self.wait.until(
-                EC.presence_of_element_located((By.ID, self.product_type[product]))
-            )
-            radio_button.click()
-
-            table = self.driver.find_element(By.ID, "demandsumarydata")
-
-            # Locate the tbody within the table
-            tbody = table.find_element(By.TAG_NAME, "tbody")
-
-            # ~ CHECK IF SET TO DEBUG. OTHERWISE GET ALL DEMANDS ITEMS
-            if config.FOR_DEMO:
-                # base_part_numbers_sample:dict = config.SAMPLE_BASE_PART_NUM
-
-                rows = tbody.find_elements(By.TAG_NAME, "tr")
-                row_texts = []
-
-                # Extract all row texts first to minimize WebDriver calls
-                for row in rows:
-                    try:
-                        row_texts.append(
-                            row.find_element(By.CSS_SELECTOR, "td.nav a").text
-                        )
-                    except Exception as error:
-                        print(f"Error processing row: {error}")
-
-                # Filter rows using list comprehension
-                selected_rows = [
-                    row
-                    for row, text in zip(rows, row_texts)
-                    if any(part_num in text for part_num in config.SAMPLE_BASE_PART_NUM)
-                ]
-                rows = selected_rows
-            else:
-                rows = tbody.find_elements(By.TAG_NAME, "tr")
-
-            # ~ PROCESS(ALLOCATE) EACH DEMAND ITEM(ROW).
-            len_rows = len(rows)  # ~ ACTUAL NUMBER OF DEMANDS
-            idx = 0
-            list_partial_tp = (
-                []
-            )  # ~ RECORD PREVIOUSLY SEEN DEMAND ITEM THAT HAS PARTIAL REEL
-
-            while len_rows > idx:
-                try:
-                    # ~ RELOCATE AGAIN EACH DEMAND ITEM. IT PREVENTS SELENIUM QUITING IF THERE IS ACCIDENTAL WEBPAGE RELOADING
-
-                    table_d = self.driver.find_element(By.ID, "demandsumarydata")
-
-                    # Locate the tbody within the table
-                    tbody = table_d.find_element(By.TAG_NAME, "tbody")
-
-                    if config.FOR_DEMO:
-                        rows = tbody.find_elements(By.TAG_NAME, "tr")
-                        row_texts = []
-
-                        # Extract all row texts first to minimize WebDriver calls
-                        for row in rows:
-                            try:
-                                row_texts.append(
-                                    row.find_element(By.CSS_SELECTOR, "td.nav a").text
-                                )
-                            except Exception as error:
-                                print(f"Error processing row: {error}")
-
-                        # Filter rows using list comprehension
-                        selected_rows = [
-                            row
-                            for row, text in zip(rows, row_texts)
-                            if any(
-                                part_num in text
-                                for part_num in config.SAMPLE_BASE_PART_NUM
-                            )
-                        ]
-                        rows = selected_rows
-                    else:
-                        rows = tbody.find_elements(By.TAG_NAME, "tr")
-
-                    # ~ FOR THAT ROW(idx), CHECKS BASEPART NUMBER, IT THE DEMAND HAS PARTIAL REEL, AND ITS LINK.
-
-                    # Locate the anchor tag within the row
-                    anchor = rows[idx].find_element(By.CSS_SELECTOR, "td.nav a")
-
-                    # Extract the href attribute to get the link
-                    link = anchor.get_attribute("href")
-
-                    base_part_num = anchor.text
-
-                    # Locate the cell with the specific class
-                    partial_reel = rows[idx].find_element(
-                        By.CSS_SELECTOR,
-                        "td.labelnum.partreelcnt, td.labelnum.partreelcnt.ispartreel",
-                    )
-
-                    # Extract the text from the cell
-                    response = partial_reel.text
-
-                    # ~ CHECK IF THAT BASE PART NUMBER DONT HAVE PARTIAL REEL, OTHERWISE IT WILL PROCEED TO NEXT BASEPART NUMBER.
-                    if base_part_num in list_partial_tp:
-                        idx += 1
-                        continue  # Wont execute below self.faster_process_links
-                    if response != "":
-                        list_partial_tp.append(base_part_num)
-                        idx += 1
-                        continue
-
-                    # ~ THIS EXECUTES ALLOCATION OF BASE PART NUMBER DEDICATED LINK
-                    self.perform_allocation(link, base_part_num, product)
-
-                    idx += 1
-                except Exception as error:
-                    return_button = self.driver.find_element(By.ID, "btn_return")
-                    return_button.click()
-                    time.sleep(1)
-                    idx += 1
-                    continue
-
-    def check_and_return(self, elements):
-        # Define the specific elements to check
-        specific_elements = ["BDPACK-TR", "PACKLABEL", "TAPEREEL"]
-
-        # Check if there's an element that is not in specific_elements
-        for element in elements:
-            if element not in specific_elements:
-                return element
-
-        # If no such element, check if "PACKLABEL" exists
-        if "PACKLABEL" in elements:
-            return "PACKLABEL"
-
-        # If "PACKLABEL" also doesn't exist, return the remaining element
-        # Assuming there's only one remaining element
-        for element in elements:
-            if element in specific_elements:
-                return element
-
-        # In case no elements match (should not happen as per the problem statement)
-        return None
-    # Function to sort the keys based on work week and year
-    def sort_week_keys(self, week_keys):
-        # Convert the keys to a sortable form (e.g., 'W49'23' becomes (23, 49))
-        sortable_weeks = [
-            (int(wk.split("'")[1]), int(wk[1:].split("'")[0])) for wk in week_keys
-        ]
-        # Sort by year first, then by week number
-        sorted_weeks = sorted(sortable_weeks)
-        # Convert back to the original format
-        sorted_week_keys = [f"W{wk[1]:02}'{wk[0]:02}" for wk in sorted_weeks]
-        # sorted_week_keys = []
-        # for wk in sorted_weeks:
-        #     if len(wk[1]) == 1:
-        #         sorted_week_keys.append()
-        return sorted_week_keys
-
-    def sort_demands(self, demands):
-        # Convert BSD to a sortable format assuming the format 'W##\'YY'
-        for demand in demands:
-            week, year = demand["BSD"].split("'")
-            demand["Sort Key"] = int(year) * 52 + int(
-                week[1:]
-            )  # Calculate a sortable key
-        # Sort demands based on the Sort Key, Finish Process, and Finish Type
-        sorted_demands = sorted(
-            demands,
-            key=lambda x: (x["Sort Key"], x["Finish Process"], x["Finish Type"]),
-        )
-        return sorted_demands
-
-    def allocate_supply(self, lot_qty, sorted_demands, product_type):
-        allocations = []
-        tape_reel_total = 0
-
-        # Group demands by BSD
-        demands_by_bsd = {}
-        for demand in sorted_demands:
-            bsd_key = demand["BSD"]
-            if bsd_key not in demands_by_bsd:
-                demands_by_bsd[bsd_key] = []
-            demands_by_bsd[bsd_key].append(demand)
-
-        # Sort demands within each BSD by the remaining balance in descending order
-        for bsd_key in demands_by_bsd:
-            demands_by_bsd[bsd_key].sort(
-                key=lambda x: x["Remaining Balance"], reverse=True
-            )
-
-        # Allocate for each BSD
-        allocated_part_num_tracker = []
-        std_qty_tracker = []
-        for bsd_key in self.sort_week_keys(demands_by_bsd.keys()):
-            for demand in demands_by_bsd[bsd_key]:
-                allocated_part_num_tracker.append(demand["Finish Part #"])#tracker
-                if demand["Finish Process"] in ["BDPACK-TR", "PACKLABEL", "TAPEREEL"]:
-                    if product_type == "MAXCIM":
-                        demand["STD_QTY"] = demand["STD_QTY"] * (1.002)
-                        min_allocated_qty = ceil((
-                            min(lot_qty, demand["Remaining Balance"] * (1.002))
-                            // demand["STD_QTY"]
-                        ) * demand["STD_QTY"])
-                        if demand["Remaining Balance"] >= min_allocated_qty:
-                            allocated_qty = min(lot_qty, demand["Remaining Balance"])
-                        else:
-                            allocated_qty = min(lot_qty, min_allocated_qty)
-                    else:
-                        min_allocated_qty = ceil((
-                            min(lot_qty, demand["Remaining Balance"])
-                            // demand["STD_QTY"]
-                        ) * demand["STD_QTY"])
-                        if demand["Remaining Balance"] >= min_allocated_qty:
-                            allocated_qty = min(lot_qty, demand["Remaining Balance"])
-                        else:
-                            allocated_qty = min(lot_qty, min_allocated_qty)
-                    # current_std_qty = demand["STD_QTY"]
-                    std_qty_tracker.append(demand["STD_QTY"])
-                    tape_reel_total += allocated_qty
-                else:
-                    allocated_qty = min(lot_qty, demand["Remaining Balance"])
-
-                lot_qty -= allocated_qty
-
-                allocations.append(
-                    {
-                        "BSD": demand["BSD"],
-                        "Finish Part #": demand["Finish Part #"],
-                        "Finish Process": demand["Finish Process"],
-                        "Allocated Qty": allocated_qty,
-                        "STD_QTY": demand["STD_QTY"],
-                        "Finish Type": demand["Finish Type"],
-                    }
-                )
-
-                if lot_qty <= 0:
-                    break
-            if lot_qty <= 0:
-                break
-
-        print(allocations)
-        num_remain_allocation = 0
-        for allocation in allocations:
-            if allocation["Allocated Qty"] != 0:
-                num_remain_allocation += 1
-
-        if num_remain_allocation != 1: #FULL or SPLIT
-            # # Adjust TAPE REEL allocations if necessary
-            # if tape_reel_total % tapereel_std_qty != 0:
-            sums_by_part = {}
-            for allocation in allocations:
-                part = allocation["Finish Part #"]
-                qty = allocation["Allocated Qty"]
-                finish_proc = allocation["Finish Process"]
-                finish_type = allocation["Finish Type"]
-                if qty > 0:
-                    if part in sums_by_part:
-                        sums_by_part[part][0] += qty
-                    else:
-                        sums_by_part[part] = [qty, finish_proc, finish_type]
-
-            surplus_units = 0
-            for record in sums_by_part:
-                if sums_by_part[record][1] in ["BDPACK-TR", "PACKLABEL", "TAPEREEL"]:
-                    
-                    
-                    for allocation in allocations:
-                        if record == allocation["Finish Part #"]:
-                            if sums_by_part[record][0]%allocation["STD_QTY"] != 0:
-                                difference = sums_by_part[record][0]%allocation["STD_QTY"]
-                                sums_by_part[record][0] -= difference
-                                surplus_units += difference
-                                break
-            alloc_fp_tuple = tuple(sums_by_part[key][1] for key in sums_by_part)
-
-            not_std_elem = self.check_and_return(alloc_fp_tuple)
-
-            for record in sums_by_part:
-                if sums_by_part[record][1] == not_std_elem:
-                    sums_by_part[record][0] += surplus_units
-                    break
-            
-
-
-            # #{'MAX17613AATP+': [1634, 'LEADSCAN', 'STD'], 'MAX17613AATP+T': [56740, 'TAPEREEL', 'STD']}      
-            # for allocation in allocations:
-            #     if allocation["Finish Process"] in [
-            #         "BDPACK-TR",
-            #         "PACKLABEL",
-            #         "TAPEREEL",
-            #     ]:
-            #         if allocation["Allocated Qty"] > allocation["STD_QTY"]:
-            #             difference = tape_reel_total % tapereel_std_qty
-            #             allocation["Allocated Qty"] -= difference
-            #             tape_reel_total -= difference
-            #             for allocation in reversed(allocations):
-            #                 if allocation["Finish Process"] not in [
-            #                     "BDPACK-TR",
-            #                     "PACKLABEL",
-            #                     "TAPEREEL",
-            #                 ]:
-            #                     allocation["Allocated Qty"] += difference
-            #                     break
-            #             if tape_reel_total % tapereel_std_qty == 0:
-        
-        
-          #                 break
-        else:
-            sums_by_part = {}
-            for allocation in allocations:
-                part = allocation["Finish Part #"]
-                qty = allocation["Allocated Qty"]
-                finish_proc = allocation["Finish Process"]
-                finish_type = allocation["Finish Type"]
-                if qty > 0:
-                    if part in sums_by_part:
-                        sums_by_part[part][0] += qty
-                    else:
-                        sums_by_part[part] = [qty, finish_proc, finish_type]
-
-        # allocations = adjust_tape_reel_allocations(allocations, std_qty)
-        return sums_by_part
-
-    def parse_demand_data_new(self, lst: list):
-        # Initialize variables to store the indices
-
-        dash_indices = []
-        space_indices = []
-
-        # Iterate over the list to find indices of '-' and ' '
-        for i, item in enumerate(lst):
-            if item == "-":
-                dash_indices.append(i)
-            elif item == " ":
-                space_indices.append(i)
-
-        # Pair the indices
-        index_pairs = list(zip(dash_indices, space_indices))
-
-        between_pairs = []
-
-        # Iterate through the index pairs
-        for i in range(len(index_pairs) - 1):
-            # Start of the next range is one more than the end of the current range
-            start = index_pairs[i][1] + 1
-            # End of the next range is one less than the start of the following range
-            end = index_pairs[i + 1][0] - 1
-            between_pairs.append((start, end))
-
-        # Add the last range, which goes from the end of the last pair to the end of the list
-        if index_pairs:
-            last_end = index_pairs[-1][1]
-            if last_end < len(lst) - 1:
-                between_pairs.append((last_end + 1, len(lst) - 1))
-
-        # Iterate over header demand rows
-        header_indexes = 0
-        sub_rows_indexes = 1
-
-        index_pairs = (index_pairs, between_pairs)
-        # index_pairs = ([(0, 11), (22, 33)], [(12, 21), (34, 48)])
-        # header_indexes = [(0, 11), (22, 33)]
-        # sub_rows_indexes = [(12, 21), (34, 48)]
-        data = []
-        # std_qty_list = []
-        for idx, (f_idx, l_idx) in enumerate(index_pairs[header_indexes]):
-            # check packaging type
-            # print(lst[f_idx:l_idx])
-            FINISH_PROCESS = lst[f_idx + 4]
-            fsub_idx, lsub_idx = index_pairs[sub_rows_indexes][idx]
-            # STD_QTY = int(lst[f_idx + 5].replace(",", ""))
-            # std_qty_list.append(STD_QTY)
-            # print(fsub_idx, lsub_idx)
-            for index, elem in enumerate(lst[fsub_idx:lsub_idx]):
-                if "W" in elem:
-                    # print(index)
-                    # print(int(data[index+lsub_idx+3].replace(",","")))
-                    FINISH_PART_NUM = lst[f_idx + 2]
-                    FINISH_TYPE = lst[f_idx + 10]
-                    BSD = lst[index + fsub_idx]
-                    REMAINING_BALANCE = lst[index + fsub_idx + 3].replace(",", "")
-                    try:
-                        STD_QTY = int(lst[f_idx + 5].replace(",", ""))
-                    except:
-                        STD_QTY = 0
-                    # raw_Ti_LS.append(lst[index + fsub_idx].replace("W", ""))
-                    # D_LS.append(int(lst[index + fsub_idx + 3].replace(",", "")))
-                    data.append(
-                        {
-                            "BSD": BSD,
-                            "Finish Process": FINISH_PROCESS,
-                            "Finish Type": FINISH_TYPE,
-                            "Remaining Balance": int(REMAINING_BALANCE),
-                            "Finish Part #": FINISH_PART_NUM,
-                            "STD_QTY": STD_QTY,
-                            # "Finish Type":
-                        }
-                    )
-
-        return data
-
-    def evaluate_allocation(self, input_dict):
-        # Check if any of the values contain "CUST" as the last element
-        contains_cust = any(value[-1] == "CUST" for value in input_dict.values())
-
-        # Check the count of non-zero values
-        non_zero_count = sum(1 for value in input_dict.values() if value[0] != 0)
-
-        # If "CUST" is found or there's more than one non-zero value, return "SPLIT"
-        if contains_cust or non_zero_count > 1:
-            return "SPLIT"
-        else:
-            return "FULL"
-
-    def evaluate_demands(self, input_list):
-        # Flags and counters for conditions
-        tapereel_std_count = 0
-        leadscan_std_count = 0
-        has_cust = False
-        non_standard = False
-
-        # Iterate through each dictionary in the list
-        for item in input_list:
-            finish_process = item["Finish Process"]
-            finish_type = item["Finish Type"]
-
-            # Count TAPEREEL and LEADSCAN with STD
-            if finish_process == "TAPEREEL" and finish_type == "STD":
-                tapereel_std_count += 1
-            elif finish_process == "LEADSCAN" and finish_type == "STD":
-                leadscan_std_count += 1
-
-            # Check for CUST
-            if finish_type == "CUST":
-                has_cust = True
-
-            # Check for non-standard types
-            if finish_process not in ["TAPEREEL", "LEADSCAN"]:
-                non_standard = True
-
-        # Determine the categories
-        categories = set()
-        if has_cust:
-            categories.add("Split CUST Special")
-        if non_standard:
-            categories.add("Maxcim")
-        if tapereel_std_count > 0:
-            categories.add("Full TR")
-        if leadscan_std_count > 0:
-            categories.add("Full LS")
-        if tapereel_std_count > 0 and leadscan_std_count > 0:
-            categories.add("Split TR")
-
-        # Add "Split STD" if there are multiple occurrences or mixed types with STD
-        if (
-            tapereel_std_count > 1
-            or leadscan_std_count > 1
-            or (
-                tapereel_std_count > 0
-                and leadscan_std_count > 0
-                and (tapereel_std_count + leadscan_std_count > 2)
-            )
-        ):
-            categories.add("Split STD")
-
-        return categories
-
-    def perform_allocation(self, link, base_part_num, product):
-        logging.info(f"Processing links with product type: {self.product}")
-
-        # ~ CAREFULLY GO TO THE LINK. SCAN BASEPART# DEMANDS TABLE
-        try:
-            # click the link
-            self.driver.get(link)
-
-            # ~ SCAN BASEPART# DEMANDS TABLE
-            demanditem_rows = self.wait.until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tr.demanditem"))
-            )
-
-            demand_table = self.wait.until(
-                EC.presence_of_all_elements_located(
-                    (By.CSS_SELECTOR, "table.demanddata")
-                )
-            )
-
-            to_save = False
-
-            # print(
-            #     f"Product Type: {self.product} Base Part Number: {base_part_num}",
-            #     end=" ",
-            # )
-        except Exception:
-            print("Problem on clicking demand item link on demand summary!")
-
-        if len(demanditem_rows) == 1:  # 1 way demand
-            # for i, row in enumerate(demanditem_rows):
-            row, *_ = demanditem_rows
-            try:
-                # parsing demand table
-                td_elements = WebDriverWait(row, 10).until(
-                    EC.presence_of_all_elements_located((By.TAG_NAME, "td"))
-                )
-
-                row_data = [cell.text for cell in td_elements]
-
-                _, _, _, _, finish_process, *_, finish_type = row_data
-
-                if finish_process not in [
-                    "TAPEREEL",
-                    "LEADSCAN",
-                    "PACKLABEL",
-                    "BDPACK-TR",
-                ]:
-                    return
-
-                # New block to extract data from the specific table
-                try:
-                    # Get items from wip table
-                    item_rows = self.wait.until(
-                        EC.presence_of_all_elements_located(
-                            (By.CSS_SELECTOR, "tr.wiplotitem")
-                        )
-                    )
-
-                    # Initialize a list to hold the data
-                    # item_table_data = []
-                    empty = ""
-                    # iterate lot items
-                    for row in item_rows:
-                        # Locate the td elements within this row
-                        td_elements = row.find_elements(By.TAG_NAME, "td")
-                        # Extract text from each td element
-                        # row_data = [td.text for td in td_elements]
-                        action, lot_number, operation, *_, status, _ = [
-                            td.text for td in td_elements
-                        ]
-                        print(
-                            f"Product-Type: {self.product} Base-Part-Number: {base_part_num} Lot-Number: {lot_number}",
-                            end=" ",
-                        )
-                        if (
-                            action is empty
-                            and status is empty
-                            and int(operation) != 9790
-                        ):
-                            if any(
-                                keyword in row_data[1]
-                                for keyword in ["ENG", "NPI", "QUAL", "QUA"]
-                            ) or lot_number.lower().startswith("z"):
-                                continue  # Skip this tuple
-                            to_save = True
-
-                            try:
-                                # Locate the dropdown within this row
-                                dropdown = row.find_element(
-                                    By.CSS_SELECTOR, "select.fintype"
-                                )
-                                # Create a Select object
-                                select_dropdown = Select(dropdown)
-                                # time.sleep(1)
-                                logging.info(f"Base Part #: {base_part_num}")
-                                if (
-                                    finish_process == "TAPEREEL"
-                                    and finish_type == "STD"
-                                ):
-                                    select_dropdown.select_by_visible_text("Full TR")
-                                    select_value = "Full TR"
-                                elif (
-                                    finish_process == "LEADSCAN"
-                                    and finish_type == "STD"
-                                ):
-                                    select_dropdown.select_by_visible_text("Full LS")
-                                    select_value = "Full LS"
-                                elif (
-                                    finish_process == "PACKLABEL"
-                                    and finish_type == "STD"
-                                ):
-                                    select_dropdown.select_by_visible_text("MaxCIM")
-                                    select_value = "MaxCIM"
-                                elif (
-                                    finish_process == "BDPACK-TR"
-                                    and finish_type == "STD"
-                                ):
-                                    select_dropdown.select_by_visible_text("Full TR")
-                                    select_value = "Full TR"
-
-                                elif finish_type == "CUST":
-                                    select_dropdown.select_by_visible_text(
-                                        "Split Cust Special"
-                                    )
-                                    select_value = "Split Cust Special"
-                                logging.info(f"Selected dropdown value: {select_value}")
-                                self.allocation_counter += 1
-                            except Exception as e_dropdown:
-                                print(
-                                    f"An error occurred while interacting with the dropdown: {str(e_dropdown)}"
-                                )
-
-                    if to_save:
-                        # Locate the "Save" button and click it
-                        save_button = self.driver.find_element(By.ID, "btn_save")
-                        save_button.click()
-                        print("(Allocated Successfull)")
-                    else:
-                        print("")
-
-                    # time.sleep(1)
-                except Exception as e:
-                    print("Problem on one-way demand allocation!")
-                    print(
-                        f"An error occurred while extracting item table data: {str(e)}"
-                    )
-
-            except Exception as e_inner:
-                print(f"Problem on one way demand: {type(e_inner)}")
-
-            return_button = self.driver.find_element(By.ID, "btn_return")
-            return_button.click()
-            time.sleep(1)
-
-        
-        else: #demanditem_Rows > 1
-            for i, row in enumerate(demand_table):
-                try:
-                    # parsing demand table
-                    td_elements = WebDriverWait(row, 10).until(
-                        EC.presence_of_all_elements_located((By.TAG_NAME, "td"))
-                    )
-                    # extract demand data
-
-                    all_data = [cell.text for cell in td_elements]
-                    # print(all_data)
-
-                    demands = self.parse_demand_data_new(all_data)
-
-                except:
-                    print(" Problem on parsing demand table")
-                    continue
-
-            # if std_proceed_allocation:
-            try:
-                # ~ CHECK AND PARSE WIP TABLE
-                item_rows = self.wait.until(
-                    EC.presence_of_all_elements_located(
-                        (By.CSS_SELECTOR, "tr.wiplotitem")
-                    )
-                )
-
-                num_rows = len(item_rows)  # ACTUAL NUMBER OF ROWS
-                idx = 0
-                empty = ""
-                while num_rows > 0:
-                    # ~ RUN THROUGH EACH WIP ITEM
-                    demand_table = self.wait.until(
-                        EC.presence_of_all_elements_located(
-                            (By.CSS_SELECTOR, "table.demanddata")
-                        )
-                    )
-
-                    # ~ PARSE DEMAND TABLE, IT HAS ONLY 1 VALUE.
-                    for i, row in enumerate(demand_table):
-                        try:
-                            # parsing demand table
-                            td_elements = WebDriverWait(row, 10).until(
-                                EC.presence_of_all_elements_located((By.TAG_NAME, "td"))
-                            )
-                            # extract demand data
-
-                            all_data = [cell.text for cell in td_elements]
-                            parsed_data = self.parse_demand_data_new(all_data)
-
-                        except:
-                            print(" Problem on parsing demand table")
-                            continue
-
-                    # Get items from wip table
-                    item_rows = self.wait.until(
-                        EC.presence_of_all_elements_located(
-                            (By.CSS_SELECTOR, "tr.wiplotitem")
-                        )
-                    )
-
-                    td_elements = item_rows[idx].find_elements(By.TAG_NAME, "td")
-                    row_data = [td.text for td in td_elements]
-                    action, lot_number, operation, *_, status, _ = [
-                        td.text for td in td_elements
-                    ]
-                    # print(
-                    #     f"Product Type: {self.product_type} Base Part Number: {base_part_num}"
-                    # )
-                    # row 0 = action status  row 14 = allocation status row 2 = operation status
-                    print(
-                        f"Product-Type: {self.product} Base-Part-Number: {base_part_num} Lot-Number: {lot_number}",
-                        end=" ",
-                    )
-                    if action is empty and status is empty and int(operation) != 9790:
-                        # logging.info(
-                        #     f"Current link: {link}, base_part_num: {base_part_num}"
-                        # )
-                        if any(
-                            keyword in row_data[1]
-                            for keyword in ["ENG", "NPI", "QUAL", "QUA"]
-                        ) or lot_number.lower().startswith("z"):
-                            num_rows -= 1
-                            continue
-
-                        to_save = True
-                        # item_table_data.append(row_data[:4])
-
-                        lot_qty = int(row_data[3].replace(",", ""))
-
-                        sorted_demand_data = self.sort_demands(parsed_data)
-                        print(sorted_demand_data)
-                        # possible_allocation = self.evaluate_demands(sorted_demand_data)
-                        # print(possible_allocation)
-                        sums_by_part = self.allocate_supply(
-                            lot_qty, sorted_demand_data, product
-                        )
-
-                        # sums_by_part = {}
-                        # for allocation in allocations:
-                        #     part = allocation["Finish Part #"]
-                        #     qty = allocation["Allocated Qty"]
-                        #     finish_proc = allocation["Finish Process"]
-                        #     finish_type = allocation["Finish Type"]
-                        #     if qty > 0:
-                        #         if part in sums_by_part:
-                        #             sums_by_part[part][0] += qty
-                        #         else:
-                        #             sums_by_part[part] = [qty, finish_proc, finish_type]
-
-                        print(sums_by_part)
-
-                        alloc_category = self.evaluate_allocation(
-                            sums_by_part
-                        )  # FUll or SPLIT
-
-                        # allocation_finish_process = {}
-                        # for allocation in allocations:
-                        #     allocation_finish_process[
-                        #         allocation["Finish Part #"]
-                        #     ] = allocation["Finish Process"]
-                        # Code to interact with the dropdown and select 'FULL_TR'
-
-                        try:
-                            # Locate the dropdown within this row
-                            # Get items from wip table
-
-                            dropdown = item_rows[idx].find_element(
-                                By.CSS_SELECTOR, "select.fintype"
-                            )
-                            # Create a Select object
-                            select_dropdown = Select(dropdown)
-
-                            # List to hold the text of visible options
-                            visible_options_text = []
-
-                            # Iterate over all options in the dropdown
-                            for option in select_dropdown.options:
-                                # Check if the option is visible (i.e., not having 'display: none')
-                                if option.get_attribute("style") != "display: none;":
-                                    # Add the text of the option to the list
-                                    visible_options_text.append(option.text)
-                            # time.sleep(1)
-
-                            allocation_record_matrix = {
-                                "FULL": {
-                                    "TAPEREEL": "Full TR",
-                                    "LEADSCAN": "Full LS",
-                                    "BDPACK-TR": "Full TR",
-                                    "BDPACK-LS": "Full LS",
-                                    "PACKLABEL": "MaxCIM",
-                                },
-                                "SPLIT": [
-                                    "Split TR",
-                                    "Split Cust Special",
-                                    "MaxCIM",
-                                    "Split Standard",
-                                ],
-                            }
-                            # common_option = list(
-                            #     set(visible_options_text).intersection(
-                            #         set(allocation_record_matrix[alloc_category])
-                            #     )
-                            # )
-                            logging.info(f"Base Part #: {base_part_num}")
-
-                            # Using if/else for decision making
-                            if alloc_category == "FULL":
-                                if self.product == "MAXCIM":
-                                    common_option = list(
-                                        set(visible_options_text).intersection(
-                                            set(["Full TR", "Full LS"])
-                                        )
-                                    )
-                                    print(common_option)
-
-                                # Process the input to create the desired output, excluding records with zero values
-                                # {"TAPEREEL":1213123}
-                                output_data = {
-                                    details[1]: details[0]
-                                    for details in sums_by_part.values()
-                                    if details[0] != 0
-                                }
-                                fp = list(output_data.keys())[0]  # TAPEREEL
-                                common_option1 = allocation_record_matrix[
-                                    alloc_category
-                                ][fp]
-
-                                if self.product == "COMETS":
-                                    select_dropdown.select_by_visible_text(
-                                        common_option1
-                                    )
-                                    select_value = "Full"
-                                
-                                else:
-                                    if common_option[0] == common_option1:
-                                        select_dropdown.select_by_visible_text(
-                                            common_option1
-                                        )
-                                        select_value = "Full"
-                                    elif (
-                                        common_option[0] != common_option1
-                                        or common_option1 == "MaxCIM"
-                                    ):
-                                        select_dropdown.select_by_visible_text("MaxCIM")
-                                        select_value = "MaxCIM"
-                                        allocation_dropdown = {
-                                            details[1]: details[0]
-                                            for details in sums_by_part.values()
-                                        }
-
-                                        # TR_allocation = int(allocation_dropdown["TAPEREEL"])
-                                        # LS_allocation = int(allocation_dropdown["LEADSCAN"])
-
-                                        num_allocation = len(sums_by_part.keys())
-                                        for i in range(num_allocation - 1):
-                                            row_span_newitem = item_rows[idx].find_element(
-                                                By.CSS_SELECTOR, "span.act_newitem"
-                                            )
-                                            row_span_newitem.click()
-                                        for alloc_idx, FINISH_PART_NUM in enumerate(
-                                            sums_by_part
-                                        ):
-                                            if alloc_idx == 0:
-                                                finish_partnum_dropdown = item_rows[
-                                                    idx
-                                                ].find_element(
-                                                    By.CSS_SELECTOR, "select.finpartnum"
-                                                )
-                                                dropdown_part_num = FINISH_PART_NUM
-                                                select_dropdown = Select(
-                                                    finish_partnum_dropdown
-                                                )
-                                                select_dropdown.select_by_visible_text(
-                                                    dropdown_part_num
-                                                )
-
-                                                allocation_cell1 = item_rows[
-                                                    idx
-                                                ].find_element(
-                                                    By.CSS_SELECTOR, "input.allocqty"
-                                                )
-                                                allocation_cell1.send_keys(
-                                                    int(sums_by_part[FINISH_PART_NUM][0])
-                                                )
-                                            else:
-                                                new_row_xpath = f"//tr[contains(@id, 'rowtmp__{alloc_idx}')]"
-                                                self.wait.until(
-                                                    EC.presence_of_element_located(
-                                                        (By.XPATH, new_row_xpath)
-                                                    )
-                                                )
-                                                new_row = self.driver.find_element(
-                                                    By.XPATH, new_row_xpath
-                                                )
-
-                                                new_finish_type_dropdown = (
-                                                    new_row.find_element(
-                                                        By.CSS_SELECTOR, "select.fintype"
-                                                    )
-                                                )
-
-                                                select_dropdown = Select(
-                                                    new_finish_type_dropdown
-                                                )
-                                                select_dropdown.select_by_visible_text(
-                                                    "MaxCIM"
-                                                )
-                                                select_value = "MaxCIM"
-
-                                                new_finish_partnum_dropdown = (
-                                                    new_row.find_element(
-                                                        By.CSS_SELECTOR, "select.finpartnum"
-                                                    )
-                                                )
-                                                dropdown_part_num = FINISH_PART_NUM
-                                                select_dropdown = Select(
-                                                    new_finish_partnum_dropdown
-                                                )
-                                                select_dropdown.select_by_visible_text(
-                                                    dropdown_part_num
-                                                )
-
-                                                allocation_cell2 = new_row.find_element(
-                                                    By.CSS_SELECTOR, "input.allocqty"
-                                                )
-                                                allocation_cell2.send_keys(
-                                                    int(sums_by_part[FINISH_PART_NUM][0])
-                                                )
-
-                            elif alloc_category == "SPLIT":
-                                common_option = list(
-                                    set(visible_options_text).intersection(
-                                        set(allocation_record_matrix[alloc_category])
-                                    )
-                                )
-                                if common_option[0] == "Split TR":
-                                    select_dropdown.select_by_visible_text("Split TR")
-                                    select_value = "SPLIT_TR"
-                                    allocation_dropdown = {
-                                        details[1]: details[0]
-                                        for details in sums_by_part.values()
-                                    }
-
-                                    if "TAPEREEL" in allocation_dropdown:
-                                        TR_allocation = int(
-                                            allocation_dropdown["TAPEREEL"]
-                                        )
-
-                                    if "BDPACK-TR" in allocation_dropdown:
-                                        TR_allocation = int(
-                                            allocation_dropdown["BDPACK-TR"]
-                                        )
-
-                                    if "LEADSCAN" in allocation_dropdown:
-                                        LS_allocation = int(
-                                            allocation_dropdown["LEADSCAN"]
-                                        )
-
-                                    if "BDPACK-LS" in allocation_dropdown:
-                                        LS_allocation = int(
-                                            allocation_dropdown["BDPACK-LS"]
-                                        )
-
-                                    allocation_cell1 = item_rows[idx].find_element(
-                                        By.CSS_SELECTOR, "input.allocqty"
-                                    )
-                                    allocation_cell1.send_keys(TR_allocation)
-
-                                    new_row_xpath = "//tr[contains(@id, 'rowtmp__')]"
-                                    self.wait.until(
-                                        EC.presence_of_element_located(
-                                            (By.XPATH, new_row_xpath)
-                                        )
-                                    )
-                                    new_row = self.driver.find_element(
-                                        By.XPATH, new_row_xpath
-                                    )
-                                    allocation_cell2 = new_row.find_element(
-                                        By.CSS_SELECTOR, "input.allocqty"
-                                    )
-                                    allocation_cell2.send_keys(LS_allocation)
-
-                                    print(f"Number of rows: {num_rows}")
-                                    # num_rows += 1
-                                    idx += 1
-                                elif common_option[0] == "Split Cust Special":
-                                    select_dropdown.select_by_visible_text(
-                                        "Split Cust Special"
-                                    )
-                                    select_value = "Split Cust Special"
-                                    allocation_dropdown = {
-                                        details[1]: details[0]
-                                        for details in sums_by_part.values()
-                                    }
-
-                                    # TR_allocation = int(allocation_dropdown["TAPEREEL"])
-                                    # LS_allocation = int(allocation_dropdown["LEADSCAN"])
-
-                                    num_allocation = len(sums_by_part.keys())
-                                    for i in range(num_allocation - 1):
-                                        row_span_newitem = item_rows[idx].find_element(
-                                            By.CSS_SELECTOR, "span.act_newitem"
-                                        )
-                                        row_span_newitem.click()
-                                    for alloc_idx, FINISH_PART_NUM in enumerate(
-                                        sums_by_part
-                                    ):
-                                        if alloc_idx == 0:
-                                            finish_partnum_dropdown = item_rows[
-                                                idx
-                                            ].find_element(
-                                                By.CSS_SELECTOR, "select.finpartnum"
-                                            )
-                                            dropdown_part_num = FINISH_PART_NUM
-                                            select_dropdown = Select(
-                                                finish_partnum_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                dropdown_part_num
-                                            )
-
-                                            allocation_cell1 = item_rows[
-                                                idx
-                                            ].find_element(
-                                                By.CSS_SELECTOR, "input.allocqty"
-                                            )
-                                            allocation_cell1.send_keys(
-                                                int(sums_by_part[FINISH_PART_NUM][0])
-                                            )
-                                        else:
-                                            new_row_xpath = f"//tr[contains(@id, 'rowtmp__{alloc_idx}')]"
-                                            self.wait.until(
-                                                EC.presence_of_element_located(
-                                                    (By.XPATH, new_row_xpath)
-                                                )
-                                            )
-                                            new_row = self.driver.find_element(
-                                                By.XPATH, new_row_xpath
-                                            )
-
-                                            new_finish_type_dropdown = (
-                                                new_row.find_element(
-                                                    By.CSS_SELECTOR, "select.fintype"
-                                                )
-                                            )
-
-                                            select_dropdown = Select(
-                                                new_finish_type_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                "Split Cust Special"
-                                            )
-                                            select_value = "MaxCIM"
-
-                                            new_finish_partnum_dropdown = (
-                                                new_row.find_element(
-                                                    By.CSS_SELECTOR, "select.finpartnum"
-                                                )
-                                            )
-                                            dropdown_part_num = FINISH_PART_NUM
-                                            select_dropdown = Select(
-                                                new_finish_partnum_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                dropdown_part_num
-                                            )
-
-                                            allocation_cell2 = new_row.find_element(
-                                                By.CSS_SELECTOR, "input.allocqty"
-                                            )
-                                            allocation_cell2.send_keys(
-                                                int(sums_by_part[FINISH_PART_NUM][0])
-                                            )
-
-                                elif common_option[0] == "MaxCIM":
-                                    select_dropdown.select_by_visible_text("MaxCIM")
-                                    select_value = "MaxCIM"
-                                    allocation_dropdown = {
-                                        details[1]: details[0]
-                                        for details in sums_by_part.values()
-                                    }
-
-                                    # TR_allocation = int(allocation_dropdown["TAPEREEL"])
-                                    # LS_allocation = int(allocation_dropdown["LEADSCAN"])
-
-                                    num_allocation = len(sums_by_part.keys())
-                                    for i in range(num_allocation - 1):
-                                        row_span_newitem = item_rows[idx].find_element(
-                                            By.CSS_SELECTOR, "span.act_newitem"
-                                        )
-                                        row_span_newitem.click()
-                                    for alloc_idx, FINISH_PART_NUM in enumerate(
-                                        sums_by_part
-                                    ):
-                                        if alloc_idx == 0:
-                                            finish_partnum_dropdown = item_rows[
-                                                idx
-                                            ].find_element(
-                                                By.CSS_SELECTOR, "select.finpartnum"
-                                            )
-                                            dropdown_part_num = FINISH_PART_NUM
-                                            select_dropdown = Select(
-                                                finish_partnum_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                dropdown_part_num
-                                            )
-
-                                            allocation_cell1 = item_rows[
-                                                idx
-                                            ].find_element(
-                                                By.CSS_SELECTOR, "input.allocqty"
-                                            )
-                                            allocation_cell1.send_keys(
-                                                int(sums_by_part[FINISH_PART_NUM][0])
-                                            )
-                                        else:
-                                            new_row_xpath = f"//tr[contains(@id, 'rowtmp__{alloc_idx}')]"
-                                            self.wait.until(
-                                                EC.presence_of_element_located(
-                                                    (By.XPATH, new_row_xpath)
-                                                )
-                                            )
-                                            new_row = self.driver.find_element(
-                                                By.XPATH, new_row_xpath
-                                            )
-
-                                            new_finish_type_dropdown = (
-                                                new_row.find_element(
-                                                    By.CSS_SELECTOR, "select.fintype"
-                                                )
-                                            )
-
-                                            select_dropdown = Select(
-                                                new_finish_type_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                "MaxCIM"
-                                            )
-                                            select_value = "MaxCIM"
-
-                                            new_finish_partnum_dropdown = (
-                                                new_row.find_element(
-                                                    By.CSS_SELECTOR, "select.finpartnum"
-                                                )
-                                            )
-                                            dropdown_part_num = FINISH_PART_NUM
-                                            select_dropdown = Select(
-                                                new_finish_partnum_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                dropdown_part_num
-                                            )
-
-                                            allocation_cell2 = new_row.find_element(
-                                                By.CSS_SELECTOR, "input.allocqty"
-                                            )
-                                            allocation_cell2.send_keys(
-                                                int(sums_by_part[FINISH_PART_NUM][0])
-                                            )
-                                elif common_option[0] == "Split Standard":
-                                    select_dropdown.select_by_visible_text("Split Standard")
-                                    select_value = "Split Standard"
-                                    allocation_dropdown = {
-                                        details[1]: details[0]
-                                        for details in sums_by_part.values()
-                                    }
-
-                                    # TR_allocation = int(allocation_dropdown["TAPEREEL"])
-                                    # LS_allocation = int(allocation_dropdown["LEADSCAN"])
-
-                                    num_allocation = len(sums_by_part.keys())
-                                    for i in range(num_allocation - 1):
-                                        row_span_newitem = item_rows[idx].find_element(
-                                            By.CSS_SELECTOR, "span.act_newitem"
-                                        )
-                                        row_span_newitem.click()
-                                    for alloc_idx, FINISH_PART_NUM in enumerate(
-                                        sums_by_part
-                                    ):
-                                        if alloc_idx == 0:
-                                            finish_partnum_dropdown = item_rows[
-                                                idx
-                                            ].find_element(
-                                                By.CSS_SELECTOR, "select.finpartnum"
-                                            )
-                                            dropdown_part_num = FINISH_PART_NUM
-                                            select_dropdown = Select(
-                                                finish_partnum_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                dropdown_part_num
-                                            )
-
-                                            allocation_cell1 = item_rows[idx].find_element(
-                                                By.CSS_SELECTOR, "input.allocqty"
-                                            )
-                                            allocation_cell1.send_keys(
-                                                int(sums_by_part[FINISH_PART_NUM][0])
-                                            )
-                                        else:
-                                            new_row_xpath = f"//tr[contains(@id, 'rowtmp__{alloc_idx}')]"
-                                            self.wait.until(
-                                                EC.presence_of_element_located(
-                                                    (By.XPATH, new_row_xpath)
-                                                )
-                                            )
-                                            new_row = self.driver.find_element(
-                                                By.XPATH, new_row_xpath
-                                            )
-
-                                            new_finish_type_dropdown = new_row.find_element(
-                                                By.CSS_SELECTOR, "select.fintype"
-                                            )
-
-                                            select_dropdown = Select(
-                                                new_finish_type_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                "Split Standard"
-                                            )
-                                            select_value = "Split Standard"
-
-                                            new_finish_partnum_dropdown = (
-                                                new_row.find_element(
-                                                    By.CSS_SELECTOR, "select.finpartnum"
-                                                )
-                                            )
-                                            dropdown_part_num = FINISH_PART_NUM
-                                            select_dropdown = Select(
-                                                new_finish_partnum_dropdown
-                                            )
-                                            select_dropdown.select_by_visible_text(
-                                                dropdown_part_num
-                                            )
-
-                                            allocation_cell2 = new_row.find_element(
-                                                By.CSS_SELECTOR, "input.allocqty"
-                                            )
-                                            allocation_cell2.send_keys(
-                                                int(sums_by_part[FINISH_PART_NUM][0])
-                                            )
-
-                            else:
-                                print("Allocation is not working")
-
-                            logging.info(f"Selected dropdown value: {select_value}")
-                            self.allocation_counter += 1
-
-                        except Exception as e_dropdown:
-                            print(
-                                f"An error occurred while interacting with the dropdown: {str(e_dropdown)}"
-                            )
-                    if to_save:
-                        # Locate the "Save" button and click it
-                        save_button = self.driver.find_element(By.ID, "btn_save")
-                        save_button.click()
-                        time.sleep(1)
-                        print("(Allocated Successfull)")
-
-                        # logging.info("Save successful.")
-                    num_rows -= 1
-                    idx += 1
-                # time.sleep(1)
-            except Exception as e:
-                print("Problem on two-way allocation.")
-                print(f"An error occurred while extracting item table data: {str(e)}")
-
-            return_button = self.driver.find_element(By.ID, "btn_return")
-            return_button.click()
-            time.sleep(1)
-        print("")
-
-    def cleanup(self):
-        """
-        Closes the browser and properly ends the WebDriver session.
-
-        This method waits for a brief period to ensure that all actions are complete
-        before closing the browser. It then calls quit() on the WebDriver to properly
-        terminate the session.
-
-        Note:
-            This method includes a fixed 1-second sleep to mitigate the risk of prematurely
-            closing the browser before all actions are completed. Adjust this duration
-            if necessary based on the specific requirements of the web interactions.
-        """
-        logging.info(f"{self.__class__.__name__}.cleanup method called")
-        time.sleep(1)
-        self.driver.quit()
-
-
-def main():
-    """
-    Sequences of web actions to automate allocation.
-    """
-    web_actions = WebActions()
-    try:
-        web_actions.login()
-        # Add more actions here
-        web_actions.navigate_to_demand_summary_page()
-        web_actions.navigate_each_customer_demand()
-    except Exception as error:
-        print(error)
-    finally:
-        web_actions.cleanup()
-
-
-if __name__ == "__main__":
-    main()
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.chrome.options import Options
+# from calculations import Calculations
+from selenium.webdriver.support.ui import Select
+# from utilities import current_work_week, parse_week_codes
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.common.exceptions import TimeoutException
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from fingerprints import FingerprintStore
+from journal import Journal
+from log_pipeline import log_payload, setup_logging
+from math import ceil
+from metrics import Metrics
+from page_parser import parse_part_page
+from readiness import PageReadiness, SUMMARY_TABLE, WIP_TABLE
+from records import Allocation, iter_demand_records
+from retry import TRANSIENT_ERRORS, RetryPolicy, classify_error
+from solution_cache import close_default_cache
+
+import json
+import logging
+import os
+import config
+import time
+import platform
+
+setup_logging()
+
+# Menu link that leads to the login form; only shown when logged out.
+LOGIN_LINK = "li.menu-658.first.last> a"
+
+
+def load_cookies(path):
+    """
+    Loads saved session cookies.
+
+    Returns:
+        list: Cookie dicts in the WebDriver get_cookies() format, empty if there are none.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path) as cookie_file:
+            return json.load(cookie_file)
+    except (OSError, ValueError) as error:
+        logging.info(f"Could not read cookie store {path}: {error}")
+        return []
+
+
+def save_cookies(path, cookies):
+    """
+    Saves session cookies, replacing the store atomically so concurrent sessions cannot corrupt it.
+    """
+    if not path:
+        return
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as cookie_file:
+        json.dump(cookies, cookie_file)
+    os.replace(temp_path, path)
+
+
+def cdp_cookie(cookie):
+    """
+    Converts a WebDriver cookie dict into Network.setCookie parameters.
+
+    Setting cookies over CDP works before the first page load, so restoring a session
+    does not cost an extra navigation to the site's domain.
+    """
+    params = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain"),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if "expiry" in cookie:
+        params["expires"] = cookie["expiry"]
+    if "sameSite" in cookie:
+        params["sameSite"] = cookie["sameSite"]
+    return params
+
+
+# Finish type dropdown options for a FULL allocation by finish process, and the
+# options that can carry a SPLIT allocation.
+ALLOCATION_RECORD_MATRIX = {
+    "FULL": {
+        "TAPEREEL": "Full TR",
+        "LEADSCAN": "Full LS",
+        "BDPACK-TR": "Full TR",
+        "BDPACK-LS": "Full LS",
+        "PACKLABEL": "MaxCIM",
+    },
+    "SPLIT": [
+        "Split TR",
+        "Split Cust Special",
+        "MaxCIM",
+        "Split Standard",
+    ],
+}
+
+# Collects base part number, link and partial reel flag of every summary row in one call.
+SUMMARY_SNAPSHOT_SCRIPT = """
+var table = document.getElementById("demandsumarydata");
+var snapshot = [];
+var tbody = table ? table.querySelector("tbody") : null;
+if (tbody) {
+    var rows = tbody.querySelectorAll("tr");
+    for (var i = 0; i < rows.length; i++) {
+        var anchor = rows[i].querySelector("td.nav a");
+        if (!anchor) {
+            continue;
+        }
+        var partialReel = rows[i].querySelector("td.labelnum.partreelcnt");
+        var cells = [];
+        for (var j = 0; j < rows[i].cells.length; j++) {
+            cells.push(rows[i].cells[j].innerText.trim());
+        }
+        snapshot.push({
+            base_part_num: anchor.innerText.trim(),
+            link: anchor.href,
+            partial_reel: partialReel ? partialReel.innerText.trim() : "",
+            cells: cells
+        });
+    }
+}
+return JSON.stringify(snapshot);
+"""
+
+# Applies a lot plan (see WebActions.plan_lot) to the allocation form in one round-trip.
+# Rows created by the page's JavaScript are filled as soon as they and their options exist.
+FORM_FILL_SCRIPT = """
+var lotPlan = arguments[0];
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var deadline = Date.now() + timeoutMs;
+
+function fire(element, type) {
+    element.dispatchEvent(new Event(type, {bubbles: true}));
+}
+
+function findLotRow() {
+    var rows = document.querySelectorAll("tr.wiplotitem");
+    for (var i = 0; i < rows.length; i++) {
+        var cells = rows[i].children;
+        if (cells.length > 1 && cells[1].textContent.trim() === lotPlan.lot_number) {
+            return rows[i];
+        }
+    }
+    return null;
+}
+
+function selectByText(select, text) {
+    for (var i = 0; i < select.options.length; i++) {
+        if (select.options[i].text.trim() === text) {
+            if (select.selectedIndex !== i) {
+                select.selectedIndex = i;
+                fire(select, "change");
+            }
+            return true;
+        }
+    }
+    return false;
+}
+
+function fillRow(row, rowPlan) {
+    if (rowPlan.fintype !== null) {
+        var fintype = row.querySelector("select.fintype");
+        if (!fintype || !selectByText(fintype, rowPlan.fintype)) {
+            return false;
+        }
+    }
+    if (rowPlan.finpartnum !== null) {
+        var finpartnum = row.querySelector("select.finpartnum");
+        if (!finpartnum || !selectByText(finpartnum, rowPlan.finpartnum)) {
+            return false;
+        }
+    }
+    if (rowPlan.qty !== null) {
+        var qty = row.querySelector("input.allocqty");
+        if (!qty) {
+            return false;
+        }
+        qty.value = String(rowPlan.qty);
+        fire(qty, "input");
+        fire(qty, "keyup");
+        fire(qty, "change");
+    }
+    return true;
+}
+
+var lotRow = findLotRow();
+if (!lotRow) {
+    done({error: "Lot " + lotPlan.lot_number + " not found"});
+    return;
+}
+var lotFintype = lotRow.querySelector("select.fintype");
+if (!lotFintype || !selectByText(lotFintype, lotPlan.option)) {
+    done({error: "Option " + lotPlan.option + " not offered for lot " + lotPlan.lot_number});
+    return;
+}
+var newItem = lotRow.querySelector("span.act_newitem");
+for (var n = 0; n < lotPlan.new_items; n++) {
+    newItem.click();
+}
+
+var pending = lotPlan.rows.slice();
+(function fillPending() {
+    try {
+        pending = pending.filter(function (rowPlan) {
+            var row = rowPlan.row === "lot"
+                ? lotRow
+                : document.querySelector("tr[id*='" + rowPlan.row + "']");
+            return !(row && fillRow(row, rowPlan));
+        });
+    } catch (error) {
+        done({error: String(error)});
+        return;
+    }
+    if (pending.length === 0) {
+        done({error: null});
+    } else if (Date.now() > deadline) {
+        done({error: "Rows not ready: " + pending.map(function (r) { return r.row; }).join(", ")});
+    } else {
+        setTimeout(fillPending, 50);
+    }
+})();
+"""
+
+
+class WebActions:
+    """
+    A class used to perform web actions using Selenium.
+
+    This class encapsulates methods for web interactions such as navigating,
+    logging in, and interacting with web elements. It is configured to use headless Chrome.
+
+    Attributes:
+        driver (webdriver.Chrome): The Chrome WebDriver instance for browser interactions.
+        url (str): URL for the web application to interact with.
+        username (str): Username for login.
+        password (str): Password for login.
+        wait (WebDriverWait): WebDriverWait instance for managing explicit waits.
+        product_type (dict): Mapping of product types for use in interactions.
+        metrics (Metrics): Timing spans of the session's steps.
+        metrics_file (str): Where cleanup writes the step metrics, or None.
+        journal (Journal): Checkpoints of the saved lots and finished base part numbers.
+        fingerprints (FingerprintStore): Summary rows of earlier runs, to skip unchanged base parts.
+    """
+
+    def __init__(self, user_data_dir=None, url=None):
+        """
+        Initializes the WebActions with configured credentials and sets up the headless Chrome driver.
+
+        The method sets up logging and initializes the Chrome WebDriver with the necessary options
+        for running in headless mode. It also configures the credentials and URL based on the DEBUG
+        setting in the config module.
+
+        Args:
+            user_data_dir (str): Persistent Chrome profile directory. Defaults to
+                config.CHROME_USER_DATA_DIR; a fresh profile is used if neither is set.
+            url (str): Dashboard URL overriding the configured one, e.g. a cassette server.
+        """
+        self._init_state(url)
+        driver_start = time.perf_counter()
+        self.user_data_dir = user_data_dir or config.CHROME_USER_DATA_DIR
+        chrome_options = self.chrome_options()
+
+        if platform.system() == "Linux":
+            logging.info(f"Running at {platform.system()}.")
+            self.driver_location = "/usr/bin/chromedriver"
+            self.binary_location = "/usr/bin/google-chrome"
+
+            if config.HEADLESS:
+                chrome_options.binary_location = self.binary_location
+                # Set up the Chrome service with the path to the ChromeDriver
+                chrome_service = ChromeService(executable_path=self.driver_location)
+                self.driver = webdriver.Chrome(
+                    service=chrome_service, options=chrome_options
+                )
+            else:
+                self.driver = webdriver.Chrome(options=chrome_options)
+        elif platform.system() == "Windows":
+            logging.info(f"Running at {platform.system()}.")
+            self.driver = webdriver.Chrome(options=chrome_options)
+        if config.LEAN_BROWSER:
+            self.block_unneeded_requests()
+        self.metrics.observe("driver_start", time.perf_counter() - driver_start)
+
+        self.wait = WebDriverWait(self.driver, 10)
+        self.readiness = PageReadiness(self.driver, timeout=10)
+        logging.info(f"{self.__class__.__name__} initialized")
+
+    def _init_state(self, url=None):
+        """
+        Sets up the state every backend shares: credentials, metrics, journal, fingerprints and retries.
+
+        Args:
+            url (str): Dashboard URL overriding the configured one.
+        """
+        if config.DEBUG:
+            credentials = config.DEV_CREDENTIALS
+        else:
+            credentials = config.PROD_CREDENTIALS
+        self.url = url or credentials["url"]
+        self.username = credentials["username"]
+        self.password = credentials["password"]
+
+        self.product_type = {
+            "COMETS": "edit-producttype-C",
+            "MAXCIM": "edit-producttype-M",
+        }
+        self.allocation_counter = 0
+        self.metrics = Metrics()
+        self.metrics_file = config.METRICS_FILE
+        self.journal = Journal(config.JOURNAL_FILE)
+        # ~ A DRY RUN ALLOCATES NOTHING, SO IT MUST NOT MARK ANY ROW AS DONE
+        self.fingerprints = FingerprintStore(
+            config.FINGERPRINT_FILE, config.FORCE_FULL_SCAN, read_only=config.DRY_RUN
+        )
+        self.retry_policy = RetryPolicy(
+            config.RETRY_ATTEMPTS, config.RETRY_BASE_DELAY, config.RETRY_MAX_DELAY
+        )
+        self.retry_queue = []
+
+    def chrome_options(self):
+        """
+        Builds the Chrome options: headless mode if configured and the persistent profile if set.
+
+        With config.LEAN_BROWSER, navigation returns once the DOM is parsed instead of after
+        every subresource loaded, images are not loaded, and Chrome runs with a small window
+        and without extensions. The bot only reads and fills the DOM, so it never waits for
+        rendering it does not use.
+        """
+        chrome_options = Options()
+        if config.HEADLESS:
+            # Set Chrome options for headless mode
+            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_argument("--disable-gpu")
+        if config.LEAN_BROWSER:
+            # ~ THE TABLES ARE AWAITED EXPLICITLY, SO DOMContentLoaded IS ENOUGH
+            chrome_options.page_load_strategy = "eager"
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_argument("--window-size=1024,768")
+            chrome_options.add_argument("--disable-extensions")
+            chrome_options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+        if self.user_data_dir:
+            # ~ KEEP THE PROFILE (COOKIES AND HTTP CACHE) BETWEEN RUNS
+            chrome_options.add_argument(f"--user-data-dir={self.user_data_dir}")
+        return chrome_options
+
+    def block_unneeded_requests(self):
+        """
+        Blocks the stylesheets, fonts and third-party scripts matching config.BLOCKED_URL_PATTERNS.
+
+        The patterns are Chrome DevTools URL patterns, where "*" matches any characters.
+        """
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": config.BLOCKED_URL_PATTERNS}
+        )
+        logging.info(f"Blocking {len(config.BLOCKED_URL_PATTERNS)} URL patterns.")
+
+    def ensure_login(self):
+        """
+        Reuses the previous session if it is still valid, otherwise logs in.
+
+        Saved cookies from config.COOKIE_STORE are restored before the first page load, and
+        one request to the dashboard tells whether the session is still logged in. Only an
+        expired session falls back to login(), after which the new cookies are saved.
+        """
+        logging.info(f"{self.__class__.__name__}.ensure_login method called")
+        cookies = load_cookies(config.COOKIE_STORE)
+        for cookie in cookies:
+            self.driver.execute_cdp_cmd("Network.setCookie", cdp_cookie(cookie))
+
+        self.driver.get(self.url)
+        if self.is_logged_in():
+            logging.info("Reusing the saved session.")
+            return
+
+        self.login()
+        save_cookies(config.COOKIE_STORE, self.driver.get_cookies())
+
+    def is_logged_in(self):
+        """
+        Returns True if the current page is not offering the login menu link.
+        """
+        return not self.driver.find_elements(By.CSS_SELECTOR, LOGIN_LINK)
+
+    def login(self):
+        """
+        Handles the login process on the website using configured credentials.
+
+        Navigates to the login page, inputs credentials, and submits the login form.
+        Uses WebDriverWait to ensure elements are clickable or present before interaction.
+
+        Raises:
+            TimeoutException: If an expected condition is not met during login.
+        """
+
+        logging.info(f"{self.__class__.__name__}.login method called")
+        self.driver.get(self.url)
+
+        self.wait.until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, LOGIN_LINK))
+        ).click()
+        self.wait.until(EC.presence_of_element_located((By.ID, "edit-name"))).send_keys(
+            self.username
+        )
+        self.wait.until(EC.presence_of_element_located((By.ID, "edit-pass"))).send_keys(
+            self.password
+        )
+        self.wait.until(EC.presence_of_element_located((By.ID, "edit-submit"))).click()
+        logging.info("Logged in.")
+
+    def navigate_to_demand_summary_page(self):
+        """
+        Navigates to the demand summary page by interacting with the menu elements.
+
+        Depending on the environment (development or production), the method selects the appropriate
+        menu elements to navigate to the demand summary page.
+        """
+        logging.info("Navigating to the demand summary page.")
+
+        if config.DEBUG:
+            menu_element = config.MENU_ELEMENT_DEV
+            demand_element = config.DEMAND_ELEMENT_DEV
+        else:
+            menu_element = config.MENU_ELEMENT_PROD
+            demand_element = config.DEMAND_ELEMENT_PROD
+
+        logging.debug(
+            "check_page_navigation elemtents with menu_element: %s, demand_element: %s",
+            menu_element,
+            demand_element,
+        )
+
+        parent_menu = self.wait.until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, menu_element))
+        )
+        actions = ActionChains(self.driver)
+        actions.move_to_element(parent_menu).perform()
+
+        demand_summary = self.wait.until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, demand_element))
+        )
+        demand_summary.click()
+
+    def navigate_each_customer_demand(self):
+        """
+        Handle radio button interactions on the webpage for faster processing.
+        """
+        # ~ VISIT EVERY BASE PART LINK DIRECTLY, NEVER GOING BACK TO THE SUMMARY PAGE
+        if config.LINK_QUEUE:
+            self.process_link_queue()
+            return
+
+        for product in self.product_type:
+            # CLICK WHICH PRODUCT : COMETS OR MAXCIM
+            self.select_product(product)
+
+            # ~ READ THE WHOLE SUMMARY TABLE ONCE AND WORK FROM THE IN-MEMORY ROWS
+            if config.SUMMARY_SNAPSHOT:
+                self.allocate_summary_snapshot(product)
+                continue
+
+            table = self.driver.find_element(By.ID, "demandsumarydata")
+
+            # Locate the tbody within the table
+            tbody = table.find_element(By.TAG_NAME, "tbody")
+
+            # ~ CHECK IF SET TO DEBUG. OTHERWISE GET ALL DEMANDS ITEMS
+            if config.FOR_DEMO:
+                # base_part_numbers_sample:dict = config.SAMPLE_BASE_PART_NUM
+
+                rows = tbody.find_elements(By.TAG_NAME, "tr")
+                row_texts = []
+
+                # Extract all row texts first to minimize WebDriver calls
+                for row in rows:
+                    try:
+                        row_texts.append(
+                            row.find_element(By.CSS_SELECTOR, "td.nav a").text
+                        )
+                    except Exception as error:
+                        logging.warning(f"Error processing row: {error}")
+
+                # Filter rows using list comprehension
+                selected_rows = [
+                    row
+                    for row, text in zip(rows, row_texts)
+                    if any(part_num in text for part_num in config.SAMPLE_BASE_PART_NUM)
+                ]
+                rows = selected_rows
+            else:
+                rows = tbody.find_elements(By.TAG_NAME, "tr")
+
+            # ~ PROCESS(ALLOCATE) EACH DEMAND ITEM(ROW).
+            len_rows = len(rows)  # ~ ACTUAL NUMBER OF DEMANDS
+            idx = 0
+            list_partial_tp = (
+                []
+            )  # ~ RECORD PREVIOUSLY SEEN DEMAND ITEM THAT HAS PARTIAL REEL
+
+            row_attempts = Counter()  # ~ FAILED ATTEMPTS TO READ A ROW, BY ITS INDEX
+
+            while len_rows > idx:
+                try:
+                    # ~ RELOCATE AGAIN EACH DEMAND ITEM. IT PREVENTS SELENIUM QUITING IF THERE IS ACCIDENTAL WEBPAGE RELOADING
+
+                    table_d = self.driver.find_element(By.ID, "demandsumarydata")
+
+                    # Locate the tbody within the table
+                    tbody = table_d.find_element(By.TAG_NAME, "tbody")
+
+                    if config.FOR_DEMO:
+                        rows = tbody.find_elements(By.TAG_NAME, "tr")
+                        row_texts = []
+
+                        # Extract all row texts first to minimize WebDriver calls
+                        for row in rows:
+                            try:
+                                row_texts.append(
+                                    row.find_element(By.CSS_SELECTOR, "td.nav a").text
+                                )
+                            except Exception as error:
+                                logging.warning(f"Error processing row: {error}")
+
+                        # Filter rows using list comprehension
+                        selected_rows = [
+                            row
+                            for row, text in zip(rows, row_texts)
+                            if any(
+                                part_num in text
+                                for part_num in config.SAMPLE_BASE_PART_NUM
+                            )
+                        ]
+                        rows = selected_rows
+                    else:
+                        rows = tbody.find_elements(By.TAG_NAME, "tr")
+
+                    # ~ FOR THAT ROW(idx), CHECKS BASEPART NUMBER, IT THE DEMAND HAS PARTIAL REEL, AND ITS LINK.
+
+                    # Locate the anchor tag within the row
+                    anchor = rows[idx].find_element(By.CSS_SELECTOR, "td.nav a")
+
+                    # Extract the href attribute to get the link
+                    link = anchor.get_attribute("href")
+
+                    base_part_num = anchor.text
+
+                    # Locate the cell with the specific class
+                    partial_reel = rows[idx].find_element(
+                        By.CSS_SELECTOR,
+                        "td.labelnum.partreelcnt, td.labelnum.partreelcnt.ispartreel",
+                    )
+
+                    # Extract the text from the cell
+                    response = partial_reel.text
+
+                    # ~ CHECK IF THAT BASE PART NUMBER DONT HAVE PARTIAL REEL, OTHERWISE IT WILL PROCEED TO NEXT BASEPART NUMBER.
+                    if base_part_num in list_partial_tp:
+                        idx += 1
+                        continue  # Wont execute below self.faster_process_links
+                    if response != "":
+                        list_partial_tp.append(base_part_num)
+                        idx += 1
+                        continue
+                    # ~ ALREADY DONE BY AN INTERRUPTED EARLIER RUN
+                    if self.journal.has_base_part(product, base_part_num):
+                        idx += 1
+                        continue
+
+                    # ~ THIS EXECUTES ALLOCATION OF BASE PART NUMBER DEDICATED LINK
+                    self.allocate_base_part(link, base_part_num, product)
+
+                    idx += 1
+                except Exception as error:
+                    # ~ A STALE OR SLOW ROW IS READ AGAIN, ANY OTHER FAILURE SKIPS IT
+                    kind = classify_error(error)
+                    row_attempts[idx] += 1
+                    self.recover_summary(product)
+                    if kind in TRANSIENT_ERRORS and row_attempts[idx] < self.retry_policy.max_attempts:
+                        logging.warning(f"Summary row {idx}: {kind}, reading it again: {error}")
+                        self.retry_policy.backoff(row_attempts[idx])
+                        continue
+                    logging.warning(f"Summary row {idx} skipped after a {kind}: {error}")
+                    idx += 1
+                    continue
+
+        self.process_retry_queue()
+
+    def snapshot_summary_rows(self):
+        """
+        Reads every row of the demand summary table with a single script call.
+
+        Each row is returned as a dict with the base part number, the link to its
+        demand page and the partial reel cell text, so the summary loop does not
+        need any further WebDriver round-trips. Rows without a base part link are left out.
+
+        Returns:
+            list: Dicts with "base_part_num", "link", "partial_reel" and "cells" (the text
+                of every cell) keys in table order.
+        """
+        rows = self.read_summary_rows()
+        if config.FOR_DEMO:
+            rows = [
+                row
+                for row in rows
+                if any(
+                    part_num in row["base_part_num"]
+                    for part_num in config.SAMPLE_BASE_PART_NUM
+                )
+            ]
+        logging.info(f"Snapshot of {len(rows)} demand summary rows taken.")
+        return rows
+
+    def read_summary_rows(self):
+        """
+        Returns every row of the demand summary table, read with one script call.
+        """
+        return json.loads(self.driver.execute_script(SUMMARY_SNAPSHOT_SCRIPT))
+
+    def select_product(self, product):
+        """
+        Clicks the product type radio button (COMETS or MAXCIM) on the demand summary page.
+        """
+        self.product = product
+        radio_button = self.wait.until(
+            EC.presence_of_element_located((By.ID, self.product_type[product]))
+        )
+        radio_button.click()
+
+    def allocatable_rows(self, rows):
+        """
+        Filters summary snapshot rows down to the base part numbers that should be allocated.
+
+        Base part numbers with a partial reel are skipped, and so are any later rows for them.
+        Base part numbers the journal has as done are skipped without visiting their page,
+        and so are rows that did not change since their base part was last allocated.
+        """
+        list_partial_tp = []  # ~ RECORD PREVIOUSLY SEEN DEMAND ITEM THAT HAS PARTIAL REEL
+        selected_rows = []
+        unchanged = 0
+        self.fingerprints.observe(self.product, rows)
+
+        for row in rows:
+            base_part_num = row["base_part_num"]
+
+            if base_part_num in list_partial_tp:
+                continue
+            if row["partial_reel"] != "":
+                list_partial_tp.append(base_part_num)
+                continue
+            if self.journal.has_base_part(self.product, base_part_num):
+                continue
+            if not self.fingerprints.should_visit(self.product, row):
+                unchanged += 1
+                continue
+            selected_rows.append(row)
+
+        if unchanged:
+            logging.info(f"Skipped {unchanged} unchanged {self.product} base part numbers.")
+        return selected_rows
+
+    def collect_demand_links(self):
+        """
+        Collects the demand page link of every base part number to allocate, for all products.
+
+        Must be called on the demand summary page.
+
+        Returns:
+            list: Dicts with "product", "base_part_num" and "link" keys.
+        """
+        links = []
+        for product in self.product_type:
+            self.select_product(product)
+            for row in self.allocatable_rows(self.snapshot_summary_rows()):
+                links.append(
+                    {
+                        "product": product,
+                        "base_part_num": row["base_part_num"],
+                        "link": row["link"],
+                    }
+                )
+        logging.info(f"Collected {len(links)} base part links.")
+        return links
+
+    def process_link_queue(self):
+        """
+        Allocates every base part number by visiting its link directly.
+
+        All links are collected from the summary page up front, so the summary page is
+        never rendered again. Progress is keyed by product and base part number, so a
+        server-side re-sort or reload cannot make a base part be skipped or repeated.
+        """
+        done = set()
+        for demand in self.collect_demand_links():
+            key = (demand["product"], demand["base_part_num"])
+            if key in done:
+                continue
+            self.product = demand["product"]
+            self.allocate_base_part(
+                demand["link"], demand["base_part_num"], demand["product"], return_after=False
+            )
+            done.add(key)
+        self.process_retry_queue()
+
+    def allocate_summary_snapshot(self, product):
+        """
+        Allocates each base part number of the currently selected product from a snapshot.
+
+        Behaves like the row-by-row loop of navigate_each_customer_demand.
+        """
+        for row in self.allocatable_rows(self.snapshot_summary_rows()):
+            self.allocate_base_part(row["link"], row["base_part_num"], product)
+
+    def allocate_base_part(self, link, base_part_num, product, return_after=True):
+        """
+        Allocates one base part number, retrying transient failures with backoff.
+
+        A base part that still fails with a transient error is put on retry_queue for
+        process_retry_queue at the end of the cycle; one that fails permanently is only
+        logged. Either way the summary page is restored if return_after is set.
+
+        Returns:
+            dict: The plan of perform_allocation, or None if the base part failed.
+        """
+        label = f"Allocation of {product} {base_part_num}"
+        try:
+            return self.retry_policy.run(
+                lambda: self.perform_allocation(link, base_part_num, product, return_after),
+                label,
+            )
+        except Exception as error:
+            kind = classify_error(error)
+            if kind in TRANSIENT_ERRORS:
+                logging.warning(f"{label} failed with a {kind}, retrying it at the end of the cycle: {error}")
+                self.retry_queue.append(
+                    {"product": product, "base_part_num": base_part_num, "link": link}
+                )
+            else:
+                logging.warning(f"{label} failed with a {kind}: {error}")
+            if return_after:
+                self.recover_summary(product)
+            return None
+
+    def recover_summary(self, product):
+        """
+        Brings the browser back to the demand summary of a product after a failure.
+
+        The return button is used if the page still has one, otherwise the summary is
+        opened from the menu again.
+        """
+        try:
+            self.return_to_summary()
+        except Exception:
+            self.navigate_to_demand_summary_page()
+            self.select_product(product)
+
+    def process_retry_queue(self):
+        """
+        Allocates the base part numbers that failed transiently earlier in the cycle.
+
+        Their links are visited directly, each with a fresh set of retries. Those that
+        fail again stay on retry_queue, so the run keeps its journal and the next run
+        visits them again.
+        """
+        queued, self.retry_queue = self.retry_queue, []
+        if not queued:
+            return
+        logging.info(f"Retrying {len(queued)} base part numbers that failed earlier in the cycle.")
+        failed = 0
+        for demand in queued:
+            self.product = demand["product"]
+            label = f"Allocation of {demand['product']} {demand['base_part_num']}"
+            try:
+                self.retry_policy.run(
+                    lambda: self.perform_allocation(
+                        demand["link"], demand["base_part_num"], demand["product"], return_after=False
+                    ),
+                    label,
+                )
+            except Exception as error:
+                failed += 1
+                self.retry_queue.append(demand)
+                logging.warning(f"{label} failed again, leaving it to the next run: {error}")
+        logging.info(f"Retried {len(queued)} base part numbers, {failed} failed again.")
+
+    def check_and_return(self, elements):
+        # Define the specific elements to check
+        specific_elements = ["BDPACK-TR", "PACKLABEL", "TAPEREEL"]
+
+        # Check if there's an element that is not in specific_elements
+        for element in elements:
+            if element not in specific_elements:
+                return element
+
+        # If no such element, check if "PACKLABEL" exists
+        if "PACKLABEL" in elements:
+            return "PACKLABEL"
+
+        # If "PACKLABEL" also doesn't exist, return the remaining element
+        # Assuming there's only one remaining element
+        for element in elements:
+            if element in specific_elements:
+                return element
+
+        # In case no elements match (should not happen as per the problem statement)
+        return None
+    # Function to sort the keys based on work week and year
+    def sort_week_keys(self, week_keys):
+        # Convert the keys to a sortable form (e.g., 'W49'23' becomes (23, 49))
+        sortable_weeks = [
+            (int(wk.split("'")[1]), int(wk[1:].split("'")[0])) for wk in week_keys
+        ]
+        # Sort by year first, then by week number
+        sorted_weeks = sorted(sortable_weeks)
+        # Convert back to the original format
+        sorted_week_keys = [f"W{wk[1]:02}'{wk[0]:02}" for wk in sorted_weeks]
+        # sorted_week_keys = []
+        # for wk in sorted_weeks:
+        #     if len(wk[1]) == 1:
+        #         sorted_week_keys.append()
+        return sorted_week_keys
+
+    def sort_demands(self, demands):
+        # Sort demands based on the BSD week, Finish Process, and Finish Type
+        return sorted(
+            demands,
+            key=lambda demand: (demand.week, demand.finish_process, demand.finish_type),
+        )
+
+    def allocate_supply(self, lot_qty, sorted_demands, product_type):
+        allocations = []
+
+        # Group demands by BSD
+        demands_by_bsd = {}
+        for demand in sorted_demands:
+            demands_by_bsd.setdefault(demand.week, []).append(demand)
+
+        # Sort demands within each BSD by the remaining balance in descending order
+        for week in demands_by_bsd:
+            demands_by_bsd[week].sort(
+                key=lambda demand: demand.remaining_balance, reverse=True
+            )
+
+        # Allocate for each BSD
+        for week in sorted(demands_by_bsd):
+            for demand in demands_by_bsd[week]:
+                std_qty = demand.std_qty
+                if demand.finish_process in ["BDPACK-TR", "PACKLABEL", "TAPEREEL"]:
+                    if product_type == "MAXCIM":
+                        # ~ MAXCIM REELS CARRY A 0.2% ALLOWANCE
+                        std_qty = demand.std_qty * (1.002)
+                        min_allocated_qty = ceil((
+                            min(lot_qty, demand.remaining_balance * (1.002))
+                            // std_qty
+                        ) * std_qty)
+                        if demand.remaining_balance >= min_allocated_qty:
+                            allocated_qty = min(lot_qty, demand.remaining_balance)
+                        else:
+                            allocated_qty = min(lot_qty, min_allocated_qty)
+                    else:
+                        min_allocated_qty = ceil((
+                            min(lot_qty, demand.remaining_balance)
+                            // std_qty
+                        ) * std_qty)
+                        if demand.remaining_balance >= min_allocated_qty:
+                            allocated_qty = min(lot_qty, demand.remaining_balance)
+                        else:
+                            allocated_qty = min(lot_qty, min_allocated_qty)
+                else:
+                    allocated_qty = min(lot_qty, demand.remaining_balance)
+
+                lot_qty -= allocated_qty
+
+                allocations.append(
+                    Allocation(
+                        bsd=demand.bsd,
+                        finish_part_num=demand.finish_part_num,
+                        finish_process=demand.finish_process,
+                        allocated_qty=allocated_qty,
+                        std_qty=std_qty,
+                        finish_type=demand.finish_type,
+                    )
+                )
+
+                if lot_qty <= 0:
+                    break
+            if lot_qty <= 0:
+                break
+
+        log_payload("Allocations", allocations)
+
+        # ~ ONE PASS: QUANTITY PER FINISH PART, AND THE REEL SIZES EACH PART WAS ALLOCATED AT
+        sums_by_part = {}
+        reel_sizes = {}
+        num_remain_allocation = 0
+        for allocation in allocations:
+            part = allocation.finish_part_num
+            sizes = reel_sizes.setdefault(part, [])
+            if allocation.std_qty not in sizes:
+                sizes.append(allocation.std_qty)
+            if allocation.allocated_qty != 0:
+                num_remain_allocation += 1
+            if allocation.allocated_qty > 0:
+                if part in sums_by_part:
+                    sums_by_part[part][0] += allocation.allocated_qty
+                else:
+                    sums_by_part[part] = [
+                        allocation.allocated_qty,
+                        allocation.finish_process,
+                        allocation.finish_type,
+                    ]
+
+        if num_remain_allocation != 1: #FULL or SPLIT
+            # Round every reel part down to whole reels and collect the surplus
+            surplus_units = 0
+            first_part_by_process = {}
+            for part, details in sums_by_part.items():
+                first_part_by_process.setdefault(details[1], part)
+                if details[1] in ["BDPACK-TR", "PACKLABEL", "TAPEREEL"]:
+                    for std_qty in reel_sizes[part]:
+                        difference = details[0] % std_qty
+                        if difference != 0:
+                            details[0] -= difference
+                            surplus_units += difference
+                            break
+
+            # The surplus goes to the first part of the process check_and_return picks
+            not_std_elem = self.check_and_return(first_part_by_process)
+            if not_std_elem in first_part_by_process:
+                sums_by_part[first_part_by_process[not_std_elem]][0] += surplus_units
+
+        # allocations = adjust_tape_reel_allocations(allocations, std_qty)
+        return sums_by_part
+
+    def allocate_lots(self, lot_quantities, sorted_demands, product_type):
+        """
+        Allocates all WIP lots of a base part against its demand together, in lot order.
+
+        Every lot only sees the balance the earlier lots left, so two lots never cover
+        the same BSD twice. Lots that find no demand left get nothing.
+
+        Args:
+            lot_quantities (list): Quantity of every lot, in allocation order.
+            sorted_demands (list): Demand records as returned by sort_demands.
+            product_type (str): "COMETS" or "MAXCIM".
+
+        Returns:
+            list: The sums_by_part of every lot, as allocate_supply returns them.
+        """
+        open_demands = list(sorted_demands)
+        lot_sums = []
+        for lot_qty in lot_quantities:
+            sums_by_part = self.allocate_supply(lot_qty, open_demands, product_type)
+            lot_sums.append(sums_by_part)
+            open_demands = self.deplete_demands(open_demands, sums_by_part)
+        return lot_sums
+
+    def deplete_demands(self, demands, sums_by_part):
+        """
+        Deducts a lot's allocation from the demand records it was allocated from.
+
+        The final quantity of every finish part number, after reel rounding, is taken
+        from that part's demand lines in BSD order. Exhausted lines are left out.
+
+        Returns:
+            list: The demand records with balance left, in the order given.
+        """
+        consumed = {part: ceil(details[0]) for part, details in sums_by_part.items()}
+        remaining = []
+        for demand in demands:
+            used = min(consumed.get(demand.finish_part_num, 0), demand.remaining_balance)
+            if used:
+                consumed[demand.finish_part_num] -= used
+            if demand.remaining_balance > used:
+                remaining.append(
+                    demand._replace(remaining_balance=demand.remaining_balance - used)
+                )
+        return remaining
+
+    def parse_demand_data_new(self, lst: list):
+        """
+        Parses the cell texts of a demand table into demand records.
+
+        Returns:
+            list: Demand records in table order, see records.iter_demand_records.
+        """
+        return list(iter_demand_records(lst))
+
+    def one_way_option(self, finish_process, finish_type):
+        """
+        Returns the finish type dropdown option for a base part with a single demand item.
+
+        Returns:
+            str: The option text, or None if the finish process and type have no option.
+        """
+        if finish_process == "TAPEREEL" and finish_type == "STD":
+            return "Full TR"
+        elif finish_process == "LEADSCAN" and finish_type == "STD":
+            return "Full LS"
+        elif finish_process == "PACKLABEL" and finish_type == "STD":
+            return "MaxCIM"
+        elif finish_process == "BDPACK-TR" and finish_type == "STD":
+            return "Full TR"
+        elif finish_type == "CUST":
+            return "Split Cust Special"
+        return None
+
+    def evaluate_allocation(self, input_dict):
+        # Check if any of the values contain "CUST" as the last element
+        contains_cust = any(value[-1] == "CUST" for value in input_dict.values())
+
+        # Check the count of non-zero values
+        non_zero_count = sum(1 for value in input_dict.values() if value[0] != 0)
+
+        # If "CUST" is found or there's more than one non-zero value, return "SPLIT"
+        if contains_cust or non_zero_count > 1:
+            return "SPLIT"
+        else:
+            return "FULL"
+
+    def evaluate_demands(self, input_list):
+        # Flags and counters for conditions
+        tapereel_std_count = 0
+        leadscan_std_count = 0
+        has_cust = False
+        non_standard = False
+
+        # Iterate through each dictionary in the list
+        for item in input_list:
+            finish_process = item.finish_process
+            finish_type = item.finish_type
+
+            # Count TAPEREEL and LEADSCAN with STD
+            if finish_process == "TAPEREEL" and finish_type == "STD":
+                tapereel_std_count += 1
+            elif finish_process == "LEADSCAN" and finish_type == "STD":
+                leadscan_std_count += 1
+
+            # Check for CUST
+            if finish_type == "CUST":
+                has_cust = True
+
+            # Check for non-standard types
+            if finish_process not in ["TAPEREEL", "LEADSCAN"]:
+                non_standard = True
+
+        # Determine the categories
+        categories = set()
+        if has_cust:
+            categories.add("Split CUST Special")
+        if non_standard:
+            categories.add("Maxcim")
+        if tapereel_std_count > 0:
+            categories.add("Full TR")
+        if leadscan_std_count > 0:
+            categories.add("Full LS")
+        if tapereel_std_count > 0 and leadscan_std_count > 0:
+            categories.add("Split TR")
+
+        # Add "Split STD" if there are multiple occurrences or mixed types with STD
+        if (
+            tapereel_std_count > 1
+            or leadscan_std_count > 1
+            or (
+                tapereel_std_count > 0
+                and leadscan_std_count > 0
+                and (tapereel_std_count + leadscan_std_count > 2)
+            )
+        ):
+            categories.add("Split STD")
+
+        return categories
+
+    def read_part_page(self):
+        """
+        Parses the demand and WIP tables of the current base part page.
+
+        The page source is fetched with a single WebDriver call and parsed locally,
+        instead of reading every table cell through its own remote call.
+
+        Returns:
+            dict: The parsed page as returned by page_parser.parse_part_page.
+        """
+        return parse_part_page(self.driver.page_source)
+
+    def return_to_summary(self):
+        """
+        Clicks the return button of a base part page and waits for the demand summary table.
+        """
+        with self.metrics.span("return_to_summary"):
+            return_button = self.driver.find_element(By.ID, "btn_return")
+            self.readiness.wait_for_navigation(
+                return_button.click, target=SUMMARY_TABLE, label="Return to summary"
+            )
+
+    def save_allocation(self):
+        """
+        Clicks the save button of a base part page and waits until the WIP table is reloaded.
+
+        Raises:
+            TimeoutException: If the page was not reloaded, so the save is not confirmed.
+        """
+        with self.metrics.span("save"):
+            save_button = self.driver.find_element(By.ID, "btn_save")
+            self.readiness.wait_for_navigation(
+                save_button.click,
+                target=WIP_TABLE,
+                stale_element=save_button,
+                label="Save",
+                require_change=True,
+            )
+
+    def lot_is_allocatable(self, lot, keyword_cell):
+        """
+        Returns True if a WIP lot is unallocated and not an engineering or qualification lot.
+
+        Args:
+            lot (dict): A WIP lot as returned by page_parser.parse_part_page.
+            keyword_cell (str): The cell checked for the ENG/NPI/QUAL keywords.
+        """
+        if lot["Action"] != "" or lot["Status"] != "" or int(lot["Operation"]) == 9790:
+            return False
+        if any(keyword in keyword_cell for keyword in ["ENG", "NPI", "QUAL", "QUA"]):
+            return False
+        return not lot["Lot #"].lower().startswith("z")
+
+    def plan_allocation(self, page, base_part_num, product):
+        """
+        Plans the allocation of every WIP lot of a base part page without touching the browser.
+
+        Args:
+            page (dict): The parsed page as returned by page_parser.parse_part_page.
+            base_part_num (str): The base part number.
+            product (str): "COMETS" or "MAXCIM".
+
+        Returns:
+            dict: A JSON-serializable plan with "product", "base_part_num", "save_per_lot"
+                and "lots". Each lot plan holds "lot_number", "option" (the finish type
+                dropdown value), "new_items" (rows to add with act_newitem) and "rows"
+                (the fintype, finpartnum and quantity to write per row), or "error"
+                if the lot cannot be allocated.
+
+        Raises:
+            ValueError: If none of the demand tables of a multi-demand page can be parsed.
+        """
+        plan = {
+            "product": product,
+            "base_part_num": base_part_num,
+            "save_per_lot": len(page["demand_items"]) != 1,
+            "lots": [],
+        }
+
+        if len(page["demand_items"]) == 1:  # 1 way demand
+            row_data = page["demand_items"][0]
+            _, _, _, _, finish_process, *_, finish_type = row_data
+
+            if finish_process not in ["TAPEREEL", "LEADSCAN", "PACKLABEL", "BDPACK-TR"]:
+                return plan
+
+            for lot in page["wip_lots"]:
+                if not self.lot_is_allocatable(lot, row_data[1]):
+                    continue
+                option = self.one_way_option(finish_process, finish_type)
+                lot_plan = {"lot_number": lot["Lot #"], "option": option, "new_items": 0, "rows": []}
+                if option is None:
+                    lot_plan["error"] = f"No allocation option for {finish_process} {finish_type}"
+                plan["lots"].append(lot_plan)
+            return plan
+
+        lots = [
+            lot for lot in page["wip_lots"] if self.lot_is_allocatable(lot, lot["cells"][1])
+        ]
+        if not lots:
+            return plan
+
+        # ~ DEMAND RECORDS ARE IMMUTABLE, ONE PARSE SERVES EVERY LOT OF THE PAGE
+        with self.metrics.span("demand_parse"):
+            parsed_data = None
+            for all_data in page["demand_tables"]:
+                try:
+                    parsed_data = self.parse_demand_data_new(all_data)
+                except Exception:
+                    logging.warning(f"Problem on parsing a demand table of {base_part_num}.")
+            if parsed_data is None:
+                raise ValueError(f"No demand table of {base_part_num} could be parsed.")
+            sorted_demand_data = self.sort_demands(parsed_data)
+            log_payload("Sorted demand", sorted_demand_data)
+
+        with self.metrics.span("allocation_math"):
+            lot_quantities = [int(lot["Qty"].replace(",", "")) for lot in lots]
+            if config.DEPLETE_ACROSS_LOTS:
+                lot_sums = self.allocate_lots(lot_quantities, sorted_demand_data, product)
+            else:
+                lot_sums = [
+                    self.allocate_supply(lot_qty, sorted_demand_data, product)
+                    for lot_qty in lot_quantities
+                ]
+
+            for lot, sums_by_part in zip(lots, lot_sums):
+                log_payload(f"Sums by part of lot {lot['Lot #']}", sums_by_part)
+                lot_plan = self.plan_lot(sums_by_part, lot["fintype_options"], product)
+                plan["lots"].append({"lot_number": lot["Lot #"], **lot_plan})
+
+        return plan
+
+    def plan_lot(self, sums_by_part, visible_options_text, product):
+        """
+        Plans the finish type dropdown and allocation rows of one lot of a multi-demand page.
+
+        Args:
+            sums_by_part (dict): Allocation per finish part number from allocate_supply.
+            visible_options_text (list): Finish type options offered for the lot.
+            product (str): "COMETS" or "MAXCIM".
+
+        Returns:
+            dict: The lot plan, see plan_allocation.
+        """
+        allocation_record_matrix = ALLOCATION_RECORD_MATRIX
+        alloc_category = self.evaluate_allocation(sums_by_part)  # FUll or SPLIT
+
+        def split_rows(option):
+            # First finish part number goes into the lot row, the others into new rows
+            rows = []
+            for alloc_idx, finish_part_num in enumerate(sums_by_part):
+                rows.append(
+                    {
+                        "row": "lot" if alloc_idx == 0 else f"rowtmp__{alloc_idx}",
+                        "fintype": None if alloc_idx == 0 else option,
+                        "finpartnum": finish_part_num,
+                        "qty": int(sums_by_part[finish_part_num][0]),
+                    }
+                )
+            return {"option": option, "new_items": len(sums_by_part) - 1, "rows": rows}
+
+        if alloc_category == "FULL":
+            # Process the input to create the desired output, excluding records with zero values
+            # {"TAPEREEL":1213123}
+            output_data = {
+                details[1]: details[0]
+                for details in sums_by_part.values()
+                if details[0] != 0
+            }
+            if not output_data:
+                return {"option": None, "new_items": 0, "rows": [], "error": "Nothing to allocate"}
+            fp = list(output_data.keys())[0]  # TAPEREEL
+            common_option1 = allocation_record_matrix[alloc_category].get(fp)
+            if common_option1 is None:
+                return {"option": None, "new_items": 0, "rows": [], "error": f"No FULL option for {fp}"}
+
+            if product == "COMETS":
+                return {"option": common_option1, "new_items": 0, "rows": []}
+
+            common_option = [
+                option for option in ["Full TR", "Full LS"] if option in visible_options_text
+            ]
+            if not common_option:
+                return {"option": None, "new_items": 0, "rows": [], "error": "No Full TR/LS option"}
+            if common_option1 in common_option:
+                return {"option": common_option1, "new_items": 0, "rows": []}
+            return split_rows("MaxCIM")
+
+        # ~ SPLIT: FIRST OFFERED OPTION IN THE ORDER OF THE ALLOCATION MATRIX
+        common_option = [
+            option
+            for option in allocation_record_matrix[alloc_category]
+            if option in visible_options_text
+        ]
+        if not common_option:
+            return {"option": None, "new_items": 0, "rows": [], "error": "No SPLIT option"}
+
+        if common_option[0] == "Split TR":
+            allocation_dropdown = {
+                details[1]: details[0] for details in sums_by_part.values()
+            }
+            TR_allocation = allocation_dropdown.get(
+                "BDPACK-TR", allocation_dropdown.get("TAPEREEL")
+            )
+            LS_allocation = allocation_dropdown.get(
+                "BDPACK-LS", allocation_dropdown.get("LEADSCAN")
+            )
+            if TR_allocation is None or LS_allocation is None:
+                return {"option": None, "new_items": 0, "rows": [], "error": "Split TR needs TR and LS"}
+            # ~ THE PAGE ADDS THE SECOND ROW ITSELF WHEN SPLIT TR IS SELECTED
+            return {
+                "option": "Split TR",
+                "new_items": 0,
+                "rows": [
+                    {"row": "lot", "fintype": None, "finpartnum": None, "qty": int(TR_allocation)},
+                    {"row": "rowtmp__", "fintype": None, "finpartnum": None, "qty": int(LS_allocation)},
+                ],
+            }
+        return split_rows(common_option[0])
+
+    def load_part_page(self, link):
+        """
+        Opens a base part page and returns it parsed, once its demand and WIP tables are present.
+        """
+        with self.metrics.span("page_load"):
+            self.driver.get(link)
+
+            # ~ SCAN BASEPART# DEMANDS TABLE
+            self.wait.until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "tr.demanditem"))
+            )
+            self.wait.until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "table.demanddata"))
+            )
+        with self.metrics.span("page_parse"):
+            return self.read_part_page()
+
+    def find_lot_row(self, lot_number):
+        """
+        Locates the WIP table row of a lot by its lot number.
+        """
+        return self.wait.until(
+            EC.presence_of_element_located(
+                (
+                    By.XPATH,
+                    "//tr[contains(concat(' ', normalize-space(@class), ' '), ' wiplotitem ')]"
+                    f"[td[2][normalize-space(.)='{lot_number}']]",
+                )
+            )
+        )
+
+    def fill_lot_form(self, lot_plan):
+        """
+        Writes one lot plan into the allocation form with a single script call.
+
+        Raises:
+            RuntimeError: If the lot, an option or a created row is missing on the page.
+        """
+        result = self.driver.execute_async_script(
+            FORM_FILL_SCRIPT, lot_plan, int(self.readiness.timeout * 1000)
+        )
+        if result["error"]:
+            raise RuntimeError(result["error"])
+
+    def apply_lot_plan(self, lot_plan):
+        """
+        Writes one lot plan into the allocation form: dropdown, new rows, part numbers and quantities.
+        """
+        if config.BATCHED_FORM_FILL:
+            self.fill_lot_form(lot_plan)
+            logging.info(f"Selected dropdown value: {lot_plan['option']}")
+            self.allocation_counter += 1
+            return
+
+        row = self.find_lot_row(lot_plan["lot_number"])
+        Select(row.find_element(By.CSS_SELECTOR, "select.fintype")).select_by_visible_text(
+            lot_plan["option"]
+        )
+
+        for _ in range(lot_plan["new_items"]):
+            row.find_element(By.CSS_SELECTOR, "span.act_newitem").click()
+
+        for row_plan in lot_plan["rows"]:
+            if row_plan["row"] == "lot":
+                target_row = row
+            else:
+                target_row = self.wait.until(
+                    EC.presence_of_element_located(
+                        (By.XPATH, f"//tr[contains(@id, '{row_plan['row']}')]")
+                    )
+                )
+            if row_plan["fintype"] is not None:
+                Select(
+                    target_row.find_element(By.CSS_SELECTOR, "select.fintype")
+                ).select_by_visible_text(row_plan["fintype"])
+            if row_plan["finpartnum"] is not None:
+                Select(
+                    target_row.find_element(By.CSS_SELECTOR, "select.finpartnum")
+                ).select_by_visible_text(row_plan["finpartnum"])
+            if row_plan["qty"] is not None:
+                target_row.find_element(By.CSS_SELECTOR, "input.allocqty").send_keys(
+                    row_plan["qty"]
+                )
+
+        logging.info(f"Selected dropdown value: {lot_plan['option']}")
+        self.allocation_counter += 1
+
+    def apply_plan(self, plan, page=None):
+        """
+        Performs the form writes of a base part plan on its page, which must be open.
+
+        Lots that are no longer allocatable on the current page are skipped, so a plan
+        computed earlier never overwrites an allocation made in the meantime. Multi-demand
+        pages are saved after every lot, single-demand pages once after all lots. Saved
+        lots are recorded in the journal, and lots it already has are skipped.
+
+        Args:
+            plan (dict): A plan as returned by plan_allocation.
+            page (dict): The parsed current page, if already read.
+
+        Returns:
+            list: Lot numbers of the plan that were left unallocated.
+        """
+        if page is None:
+            page = self.read_part_page()
+        open_lots = {lot["Lot #"] for lot in page["wip_lots"] if lot["Action"] == "" and lot["Status"] == ""}
+        to_save = []
+        pending_lots = []
+
+        for lot_plan in plan["lots"]:
+            lot_label = (
+                f"Product-Type: {plan['product']} Base-Part-Number: {plan['base_part_num']} "
+                f"Lot-Number: {lot_plan['lot_number']}"
+            )
+            if "error" in lot_plan or lot_plan["lot_number"] not in open_lots:
+                logging.info(f"{lot_label} {lot_plan.get('error', '(Already allocated)')}")
+                if "error" in lot_plan:
+                    pending_lots.append(lot_plan["lot_number"])
+                continue
+            if self.journal.has_lot(plan["product"], plan["base_part_num"], lot_plan["lot_number"]):
+                logging.info(f"{lot_label} (Already allocated)")
+                continue
+
+            try:
+                logging.info(f"Base Part #: {plan['base_part_num']}")
+                with self.metrics.span("form_fill"):
+                    self.apply_lot_plan(lot_plan)
+            except Exception as e_dropdown:
+                logging.warning(
+                    f"{lot_label} An error occurred while interacting with the dropdown: {str(e_dropdown)}"
+                )
+                pending_lots.append(lot_plan["lot_number"])
+                continue
+
+            if plan["save_per_lot"]:
+                # ~ ONLY A SAVE CONFIRMED BY THE RELOADED PAGE GOES INTO THE JOURNAL
+                try:
+                    self.save_allocation()
+                except TimeoutException as error:
+                    logging.warning(f"{lot_label} Save was not confirmed: {error}")
+                    pending_lots.append(lot_plan["lot_number"])
+                    continue
+                self.journal.record_lot(plan["product"], plan["base_part_num"], lot_plan["lot_number"])
+                logging.info(f"{lot_label} (Allocated Successfull)")
+            else:
+                to_save.append(lot_plan["lot_number"])
+
+        if to_save:
+            try:
+                self.save_allocation()
+            except TimeoutException as error:
+                logging.warning(
+                    f"Product-Type: {plan['product']} Base-Part-Number: {plan['base_part_num']} "
+                    f"Save of lots {', '.join(to_save)} was not confirmed: {error}"
+                )
+                return pending_lots + to_save
+            for lot_number in to_save:
+                self.journal.record_lot(plan["product"], plan["base_part_num"], lot_number)
+            logging.info(
+                f"Product-Type: {plan['product']} Base-Part-Number: {plan['base_part_num']} "
+                f"Lot-Numbers: {', '.join(to_save)} (Allocated Successfull)"
+            )
+        return pending_lots
+
+    def perform_allocation(self, link, base_part_num, product, return_after=True):
+        """
+        Allocates the WIP lots of one base part number on its demand page.
+
+        The page is read once and planned with plan_allocation, then apply_plan performs
+        the form writes. With config.DRY_RUN the plan is only logged.
+
+        Args:
+            link (str): URL of the base part demand page.
+            base_part_num (str): The base part number.
+            product (str): "COMETS" or "MAXCIM".
+            return_after (bool): Click the return button to go back to the summary page
+                when done. Callers that open the next link directly pass False.
+
+        Returns:
+            dict: The plan of the base part, with "pending_lots" listing the lots left
+                unallocated (every planned lot in a dry run).
+        """
+        logging.info(f"Processing links with product type: {self.product}")
+
+        with self.metrics.span("perform_allocation"):
+            # ~ CAREFULLY GO TO THE LINK. SCAN BASEPART# DEMANDS TABLE
+            page = self.load_part_page(link)
+            plan = self.plan_allocation(page, base_part_num, product)
+            plan["link"] = link
+
+            if config.DRY_RUN:
+                logging.info(f"Dry run plan: {json.dumps(plan)}")
+                plan["pending_lots"] = [lot_plan["lot_number"] for lot_plan in plan["lots"]]
+            else:
+                plan["pending_lots"] = self.apply_plan(plan, page)
+                # ~ A BASE PART WITH UNSAVED LOTS IS VISITED AGAIN ON RESUME
+                if not plan["pending_lots"]:
+                    self.journal.record_base_part(product, base_part_num)
+            self.fingerprints.record(product, base_part_num, bool(plan["pending_lots"]))
+
+            if return_after:
+                self.return_to_summary()
+        return plan
+
+    def plan_run(self, links):
+        """
+        Plans every base part link without any form writes.
+
+        Pages are loaded one after the other while the previous page is planned on a
+        worker thread, so planning overlaps with scraping.
+
+        Args:
+            links (list): Dicts with "product", "base_part_num" and "link" keys.
+
+        Returns:
+            list: One plan per link. Links whose page could not be loaded or planned
+                get a plan with an "error" and no lots.
+        """
+        plans = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futures = []
+            for demand in links:
+                try:
+                    page = self.retry_policy.run(
+                        lambda: self.load_part_page(demand["link"]),
+                        f"Page of {demand['base_part_num']}",
+                    )
+                except Exception as error:
+                    futures.append((demand, None, error))
+                    continue
+                future = executor.submit(
+                    self.plan_allocation, page, demand["base_part_num"], demand["product"]
+                )
+                futures.append((demand, future, None))
+
+            for demand, future, error in futures:
+                if future is not None:
+                    try:
+                        plan = future.result()
+                    except Exception as plan_error:
+                        error = plan_error
+                if error is not None:
+                    plan = {
+                        "product": demand["product"],
+                        "base_part_num": demand["base_part_num"],
+                        "save_per_lot": False,
+                        "lots": [],
+                        "error": f"{type(error).__name__}: {error}",
+                    }
+                plan["link"] = demand["link"]
+                plans.append(plan)
+        return plans
+
+    def run_planned(self):
+        """
+        Plans every base part number first, then applies the plans unless config.DRY_RUN is set.
+
+        The plans are written to config.PLAN_FILE as JSON when it is set.
+
+        Returns:
+            list: The plans of all base part links.
+        """
+        plans = self.plan_run(self.collect_demand_links())
+        if config.PLAN_FILE:
+            with open(config.PLAN_FILE, "w") as plan_file:
+                json.dump(plans, plan_file, indent=2)
+            logging.info(f"Wrote {len(plans)} base part plans to {config.PLAN_FILE}.")
+        if not config.DRY_RUN:
+            self.apply_run(plans)
+        return plans
+
+    def apply_run(self, plans):
+        """
+        Performs the form writes of previously computed plans, visiting only base parts with lots to write.
+        """
+        for plan in plans:
+            if not any("error" not in lot_plan for lot_plan in plan["lots"]):
+                continue
+            try:
+                self.apply_planned_part(plan)
+            except Exception as error:
+                logging.info(f"Applying the plan of {plan['base_part_num']} failed: {error}")
+                if classify_error(error) in TRANSIENT_ERRORS:
+                    self.retry_queue.append(
+                        {"product": plan["product"], "base_part_num": plan["base_part_num"], "link": plan["link"]}
+                    )
+
+    def apply_planned_part(self, plan):
+        """
+        Opens the page of a planned base part, performs its form writes and journals it if nothing is left pending.
+        """
+        self.product = plan["product"]
+        page = self.load_part_page(plan["link"])
+        pending_lots = self.apply_plan(plan, page)
+        if not pending_lots:
+            self.journal.record_base_part(plan["product"], plan["base_part_num"])
+        self.fingerprints.record(plan["product"], plan["base_part_num"], bool(pending_lots))
+
+    def cleanup(self):
+        """
+        Closes the browser and properly ends the WebDriver session.
+
+        Saves and page returns already wait for the next page to be ready, so no
+        action is still in flight when quit() is called to terminate the session.
+        """
+        logging.info(f"{self.__class__.__name__}.cleanup method called")
+        self.driver.quit()
+        self.fingerprints.save()
+        self.report_metrics()
+        close_default_cache()
+
+    def report_metrics(self):
+        """
+        Logs the per-step timing summary and writes it to metrics_file if set.
+        """
+        self.metrics.log_summary()
+        if self.metrics_file:
+            self.metrics.export(self.metrics_file)
+
+
+def run_session(web_actions):
+    """
+    Logs in, opens the demand summary and allocates every base part number.
+
+    The journal is cleared once a run that is not a dry run left no base part number
+    on the retry queue; otherwise the next run resumes from it.
+    """
+    # ~ A WARM SESSION REVISITS EARLIER FAILURES FROM THE SUMMARY, NOT FROM THE QUEUE
+    web_actions.retry_queue = []
+    with web_actions.metrics.span("login"):
+        web_actions.ensure_login()
+    # Add more actions here
+    with web_actions.metrics.span("navigate_summary"):
+        web_actions.navigate_to_demand_summary_page()
+    if config.PLAN_FIRST or config.DRY_RUN:
+        web_actions.run_planned()
+    else:
+        web_actions.navigate_each_customer_demand()
+    if config.DRY_RUN:
+        return
+    if web_actions.retry_queue:
+        logging.info(
+            f"{len(web_actions.retry_queue)} base part numbers failed, keeping the journal for the next run."
+        )
+        return
+    web_actions.journal.clear()
+
+
+def main():
+    """
+    Sequences of web actions to automate allocation.
+    """
+    if config.NUM_WORKERS > 1:
+        from worker_pool import run_allocation_pool
+
+        run_allocation_pool(config.NUM_WORKERS)
+        return
+
+    if config.BACKEND == "http":
+        from http_backend import HttpActions
+
+        web_actions = HttpActions()
+    else:
+        web_actions = WebActions()
+    try:
+        run_session(web_actions)
+    except Exception as error:
+        logging.exception(f"Allocation run failed: {error}")
+    finally:
+        web_actions.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import logging
+import multiprocessing
+import os
+import queue
+
+import config
+from fingerprints import FingerprintStore
+from retry import TRANSIENT_ERRORS, classify_error
+from webactions import WebActions
+
+# Seconds the coordinator waits for a result before checking that workers are still alive.
+RESULT_POLL_SECONDS = 5
+
+
+def worker_profile(worker_id):
+    """
+    Returns the persistent Chrome profile of a worker, if profiles are configured.
+
+    Chrome locks its profile directory, so every worker gets a directory of its own.
+    """
+    if not config.CHROME_USER_DATA_DIR:
+        return None
+    return f"{config.CHROME_USER_DATA_DIR}-worker{worker_id}"
+
+
+def allocation_worker(worker_id, task_queue, result_queue):
+    """
+    Runs in a worker process: logs in with its own Chrome session and allocates queued links.
+
+    Every task produces exactly one result dict on the result queue, with "error" set to
+    None on success or to the error text on failure, "transient" telling whether that
+    error may pass on a later try, and "pending" telling whether lots were left
+    unallocated. A None task stops the worker. The session is checked again
+    whenever the tasks of a new cycle start, so a worker kept warm between cycles logs in
+    again once its session expired.
+    """
+    web_actions = WebActions(user_data_dir=worker_profile(worker_id))
+    # ~ THE COORDINATOR READ THE SUMMARY ROWS, SO IT KEEPS THE FINGERPRINTS
+    web_actions.fingerprints = FingerprintStore(None)
+    if config.METRICS_FILE:
+        # ~ ONE METRICS FILE PER WORKER, THEY WOULD OVERWRITE EACH OTHER
+        root, extension = os.path.splitext(config.METRICS_FILE)
+        web_actions.metrics_file = f"{root}-worker{worker_id}{extension}"
+    try:
+        web_actions.ensure_login()
+        logging.info(f"Worker {worker_id} logged in.")
+        cycle = None
+
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            if cycle is not None and task.get("cycle") != cycle:
+                web_actions.ensure_login()
+            cycle = task.get("cycle")
+            web_actions.product = task["product"]
+            pending = True
+            transient = False
+            try:
+                plan = web_actions.retry_policy.run(
+                    lambda: web_actions.perform_allocation(
+                        task["link"],
+                        task["base_part_num"],
+                        task["product"],
+                        return_after=False,
+                    ),
+                    f"Allocation of {task['product']} {task['base_part_num']}",
+                )
+                pending = bool(plan["pending_lots"])
+                error = None
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                transient = classify_error(exc) in TRANSIENT_ERRORS
+            result_queue.put(
+                dict(task, worker=worker_id, error=error, transient=transient, pending=pending)
+            )
+    finally:
+        web_actions.cleanup()
+
+
+class AllocationPool:
+    """
+    Shards base part links across worker processes, each driving its own browser session.
+
+    run() starts the workers for one batch of links and stops them afterwards. A pool that
+    is kept warm between cycles is started once, fed with allocate() every cycle and
+    stopped at shutdown.
+
+    Attributes:
+        num_workers (int): Number of worker processes (and Chrome sessions) to start.
+        context: The multiprocessing context used to start the workers.
+        workers (list): The started worker processes.
+        cycle (int): Number of batches handed to the workers so far.
+    """
+
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        # ~ SPAWN ON EVERY PLATFORM SO NO WEBDRIVER STATE LEAKS INTO A FORKED CHILD
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.cycle = 0
+        self.task_queue = None
+        self.result_queue = None
+
+    def start(self, num_workers=None):
+        """
+        Starts the worker processes; each one logs in before taking its first task.
+        """
+        if num_workers is None:
+            num_workers = self.num_workers
+        self.task_queue = self.context.Queue()
+        self.result_queue = self.context.Queue()
+        self.workers = [
+            self.context.Process(
+                target=allocation_worker,
+                args=(worker_id, self.task_queue, self.result_queue),
+                daemon=True,
+            )
+            for worker_id in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        logging.info(f"Started {num_workers} allocation workers.")
+
+    def alive(self):
+        return any(worker.is_alive() for worker in self.workers)
+
+    def allocate(self, links):
+        """
+        Hands every link to the running workers and returns one result per link.
+
+        Links that still failed with a transient error are handed out once more after
+        every other link is done, like the retry queue of a single session.
+
+        Args:
+            links (list): Dicts with "product", "base_part_num" and "link" keys.
+
+        Returns:
+            list: The link dicts with "worker" and "error" added. Links that were left
+                unprocessed because every worker died report the error "no live worker".
+        """
+        results = self.dispatch(links)
+        failed = {
+            (result["product"], result["base_part_num"]) for result in results if result.get("transient")
+        }
+        if not failed:
+            return results
+
+        logging.info(f"Retrying {len(failed)} base part links that failed earlier in the cycle.")
+        retry = [link for link in links if (link["product"], link["base_part_num"]) in failed]
+        retried = {
+            (result["product"], result["base_part_num"]): result for result in self.dispatch(retry)
+        }
+        results = [retried.get((result["product"], result["base_part_num"]), result) for result in results]
+        failed_again = sum(result["error"] is not None for result in retried.values())
+        logging.info(f"Retried {len(retry)} base part links, {failed_again} failed again.")
+        return results
+
+    def dispatch(self, links):
+        """
+        Queues links as a new batch and collects one result per link.
+        """
+        self.cycle += 1
+        for link in links:
+            self.task_queue.put(dict(link, cycle=self.cycle))
+        logging.info(f"Queued {len(links)} links for {len(self.workers)} allocation workers.")
+
+        results = []
+        while len(results) < len(links):
+            try:
+                result = self.result_queue.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                if not self.alive():
+                    break
+                continue
+            # ~ A LATE RESULT OF AN EARLIER, ABANDONED BATCH
+            if result["cycle"] == self.cycle:
+                results.append(result)
+
+        done = {(result["product"], result["base_part_num"]) for result in results}
+        for link in links:
+            if (link["product"], link["base_part_num"]) not in done:
+                results.append(dict(link, worker=None, error="no live worker"))
+        return results
+
+    def stop(self):
+        """
+        Lets every worker finish its task, close its browser and exit.
+
+        Links still queued are dropped; the journal keeps them for the next run.
+        """
+        try:
+            while True:
+                self.task_queue.get_nowait()
+        except queue.Empty:
+            pass
+        for worker in self.workers:
+            if worker.is_alive():
+                self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=RESULT_POLL_SECONDS)
+        self.workers = []
+
+    def run(self, links):
+        """
+        Starts workers for a batch of links, allocates them and stops the workers.
+
+        Returns:
+            list: The results of allocate().
+        """
+        self.start(min(self.num_workers, len(links)))
+        try:
+            return self.allocate(links)
+        finally:
+            self.stop()
+
+
+def collect_links(coordinator):
+    """
+    Logs the coordinator session in and collects the base part links to allocate.
+    """
+    coordinator.ensure_login()
+    coordinator.navigate_to_demand_summary_page()
+    return coordinator.collect_demand_links()
+
+
+def run_allocation_pool(num_workers):
+    """
+    Collects the base part links with one session, then allocates them in parallel.
+
+    Returns:
+        list: The per-link results of AllocationPool.run.
+    """
+    coordinator = WebActions()
+    try:
+        links = collect_links(coordinator)
+    finally:
+        coordinator.cleanup()
+
+    results = AllocationPool(num_workers).run(links)
+    return record_results(coordinator, results)
+
+
+def record_results(coordinator, results):
+    """
+    Stores the fingerprints of the allocated base parts, clears a finished journal and logs failures.
+
+    Like run_session, the journal is kept after a dry run and after a batch that left
+    links unprocessed or failed transiently, so the next run resumes from it.
+
+    Returns:
+        list: The results, unchanged.
+    """
+    unfinished = [
+        result for result in results if result["error"] == "no live worker" or result.get("transient")
+    ]
+    if unfinished:
+        logging.info(f"{len(unfinished)} base part links failed, keeping the journal for the next run.")
+    elif not config.DRY_RUN:
+        coordinator.journal.clear()
+    for result in results:
+        if result["error"] is None:
+            coordinator.fingerprints.record(result["product"], result["base_part_num"], result["pending"])
+    coordinator.fingerprints.save()
+
+    failed = [result for result in results if result["error"] is not None]
+    for result in failed:
+        logging.info(
+            f"Allocation of {result['product']} {result['base_part_num']} failed: {result['error']}"
+        )
+    logging.info(f"Allocated {len(results) - len(failed)} of {len(results)} base part links.")
+    return results
+
+
+if __name__ == "__main__":
+    run_allocation_pool(config.NUM_WORKERS)